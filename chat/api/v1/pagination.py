@@ -1,7 +1,185 @@
-from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
 
+from django.core.exceptions import ValidationError
+from django.db.models import Q
 
-class MessageCursorPagination(CursorPagination):
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination over a unique, multi-column ordering.
+
+    DRF only keys cursors on the first ordering field and falls back to an
+    offset for ties, so rows sharing a timestamp can be skipped or repeated
+    and deep offsets turn into scans. Here the cursor holds every ordering
+    field and pages are fetched with a row comparison the matching composite
+    index can seek to, so page N costs the same as page 1.
+    """
+
+    position_separator = "|"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async version of `paginate_queryset`. The page is fetched in a single
+        chunk, so in one trip to the database thread.
+        """
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        # A chunk larger than the page plus one row, so the first chunk is
+        # known to be the last without a second trip
+        chunk_size = self.page_size + 2
+        return self.set_page(
+            [row async for row in queryset.aiterator(chunk_size=chunk_size)]
+        )
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the queryset of the requested page, plus one row.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.reverse, self.current_position = False, None
+        else:
+            self.reverse, self.current_position = (
+                self.cursor.reverse,
+                self.cursor.position,
+            )
+
+        ordering = _reverse_ordering(self.ordering) if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.current_position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(queryset, ordering, self.current_position)
+            )
+
+        # Fetch an extra row to find out whether another page follows
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        self.page = results[: self.page_size]
+        has_following_page = len(results) > len(self.page)
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.current_position is not None
+            self.has_previous = has_following_page
+        else:
+            self.has_next = has_following_page
+            self.has_previous = self.current_position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_position(self.page[-1] if self.page else None, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_position(self.page[0] if self.page else None, True)
+
+    def encode_position(self, instance, reverse):
+        # Positions are unique, so a cursor never needs an offset
+        if instance is None:
+            position = self.cursor.position
+        else:
+            position = self._get_position_from_instance(instance, self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=reverse, position=position))
+
+    def get_position_filter(self, queryset, ordering, position):
+        """
+        Return a filter matching the rows that come after `position` in
+        `ordering`, i.e. the row comparison `(a, b) < (x, y)` spelled out as
+        `a <= x AND (a < x OR b < y)` so the leading column bounds the range.
+        """
+        values = self.decode_position(queryset, position)
+        fields = [
+            (order.lstrip("-"), order.startswith("-"), value)
+            for order, value in zip(ordering, values)
+        ]
+
+        position_filter = None
+        for field_name, descending, value in reversed(fields):
+            after = Q(**{f"{field_name}__{'lt' if descending else 'gt'}": value})
+            if position_filter is None:
+                position_filter = after
+            else:
+                position_filter = after | (Q(**{field_name: value}) & position_filter)
+
+        field_name, descending, value = fields[0]
+        bound = Q(**{f"{field_name}__{'lte' if descending else 'gte'}": value})
+        return bound & position_filter
+
+    def decode_position(self, queryset, position):
+        values = position.split(self.position_separator)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            return [
+                queryset.model._meta.get_field(order.lstrip("-")).to_python(value)
+                for order, value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip("-")
+            if isinstance(instance, dict):
+                attr = instance[field_name]
+            else:
+                attr = getattr(instance, field_name)
+            values.append(attr.isoformat() if hasattr(attr, "isoformat") else str(attr))
+        return self.position_separator.join(values)
+
+
+class MessageCursorPagination(KeysetCursorPagination):
+    page_size = 25
+    # `id` breaks ties between messages created in the same instant
+    ordering = ("-created", "-id")
+    cursor_query_param = "cursor"
+    # `format` is taken by DRF's content negotiation
+    shape_query_param = "shape"
+
+    def is_normalized(self, request) -> bool:
+        """
+        Whether the client asked for senders listed once per page rather
+        than embedded in every message.
+        """
+        return request.query_params.get(self.shape_query_param) == "normalized"
+
+    def get_normalized_data(self, messages, users) -> dict:
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "messages": messages,
+            "users": users,
+        }
+
+
+class ChatRoomCursorPagination(KeysetCursorPagination):
     page_size = 25
-    ordering = "-created"
+    # Most recently active rooms first
+    ordering = ("-last_message_at", "-id")
     cursor_query_param = "cursor"
@@ -1,6 +1,6 @@
 from rest_framework.permissions import BasePermission
 
-from chat.models import ChatRoom
+from chat.membership import is_member
 
 
 class CanViewChatRoom(BasePermission):
@@ -8,7 +8,7 @@ class CanViewChatRoom(BasePermission):
         user = request.user
         chatroom = obj
 
-        if chatroom.users.filter(id=user.id).exists():
+        if is_member(chatroom.id, user.id):
             return True
 
         if user.is_staff or user.has_perm("chat.view_all_chatrooms"):
@@ -22,7 +22,10 @@ class CanViewMessage(BasePermission):
     def has_permission(self, request, view):
         chatroom_id = view.kwargs.get("parent_lookup_room")
         if chatroom_id:
-            return ChatRoom.objects.filter(id=chatroom_id, users=request.user).exists()
+            try:
+                return is_member(int(chatroom_id), request.user.id)
+            except ValueError:
+                return False
 
         return False
 
@@ -30,7 +33,7 @@ class CanViewMessage(BasePermission):
         user = request.user
         message = obj
 
-        if message.room.users.filter(id=user.id).exists():
+        if is_member(message.room_id, user.id):
             return True
 
         if user.is_staff or user.has_perm("chat.view_all_messages"):
@@ -2,11 +2,25 @@ from django_restql.fields import DynamicSerializerMethodField
 from django_restql.mixins import DynamicFieldsMixin
 from rest_framework import serializers
 
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db.models import (
+    BooleanField,
+    Exists,
+    ExpressionWrapper,
+    OuterRef,
+    Prefetch,
+    Q,
+)
+
 from chat.models import ChatRoom, Message
+from core.api.v1.mixins import OptimizedQuerySetMixin
 from users.api.v1.serializers import UserDetailSerializer
 
 
-class MessageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+class MessageSerializer(
+    OptimizedQuerySetMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     user = UserDetailSerializer(read_only=True)
 
     class Meta:
@@ -20,8 +34,42 @@ class MessageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
             "parent",
         ]
 
+    def get_field_lookups(self, field_name, parsed_query, prefix=""):
+        if field_name != "user":
+            return super().get_field_lookups(field_name, parsed_query, prefix)
+        users = self.fields["user"].optimize_queryset(
+            get_user_model().objects.all(), parsed_query
+        )
+        return [f"{prefix}user"], [], [Prefetch(f"{prefix}user", queryset=users)]
+
+
+class NormalizedMessageSerializer(MessageSerializer):
+    """
+    A message referring to its sender by id, for pages that list each
+    sender once.
+    """
+
+    user_id = serializers.IntegerField(read_only=True)
+    query_columns = {"user_id": ["user"]}
+
+    class Meta(MessageSerializer.Meta):
+        fields = [
+            "id",
+            "user_id",
+            "content",
+            "message_type",
+            "file",
+            "parent",
+        ]
+
+    def optimize_queryset(self, queryset, parsed_query=None, columns=()):
+        # The page lists the senders of its messages whatever the query
+        return super().optimize_queryset(queryset, parsed_query, [*columns, "user"])
+
 
-class ChatRoomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+class ChatRoomSerializer(
+    OptimizedQuerySetMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     latest_message = DynamicSerializerMethodField()
     users = UserDetailSerializer(many=True, read_only=True)
 
@@ -34,9 +82,134 @@ class ChatRoomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
             "latest_message",
         ]
 
+    def get_field_lookups(self, field_name, parsed_query, prefix=""):
+        if field_name == "users":
+            users = self.fields["users"].child.optimize_queryset(
+                get_user_model().objects.all(), parsed_query
+            )
+            return [], [], [Prefetch(f"{prefix}users", queryset=users)]
+        if field_name == "latest_message":
+            last_message = f"{prefix}last_message"
+            (
+                only,
+                select_related,
+                prefetch_related,
+            ) = MessageSerializer().get_query_lookups(
+                parsed_query, prefix=f"{last_message}__"
+            )
+            return (
+                [last_message, *only],
+                [last_message, *select_related],
+                prefetch_related,
+            )
+        return super().get_field_lookups(field_name, parsed_query, prefix)
+
     def get_latest_message(self, obj, parsed_query):
         return (
-            MessageSerializer(obj.latest_message[0], parsed_query=parsed_query).data
-            if obj.latest_message
+            MessageSerializer(obj.last_message, parsed_query=parsed_query).data
+            if obj.last_message_id
             else None
         )
+
+
+# Columns read by `message_row_to_dict`. `created` only feeds the cursor.
+MESSAGE_ROW_FIELDS = (
+    "id",
+    "created",
+    "content",
+    "message_type",
+    "file",
+    "parent_id",
+    "user_id",
+    "user__username",
+    "user__email",
+    "user__first_name",
+    "user__last_name",
+    "user__phone_number",
+    "user__birthday",
+    "user__profile_picture",
+    "user_has_usable_password",
+    "user_email_verified",
+)
+
+
+def get_message_rows(queryset):
+    """
+    Return `queryset` as named rows holding what `MessageSerializer` outputs,
+    fetched in a single query.
+    """
+    from allauth.account.models import EmailAddress
+
+    return queryset.annotate(
+        user_has_usable_password=ExpressionWrapper(
+            ~Q(user__password__startswith=UNUSABLE_PASSWORD_PREFIX),
+            output_field=BooleanField(),
+        ),
+        user_email_verified=Exists(
+            EmailAddress.objects.filter(user=OuterRef("user_id"), verified=True)
+        ),
+    ).values_list(*MESSAGE_ROW_FIELDS, named=True)
+
+
+def get_file_url(storage, name, request):
+    # Same as DRF's FileField
+    if not name:
+        return None
+    return request.build_absolute_uri(storage.url(name))
+
+
+def user_row_to_dict(row, request) -> dict:
+    """
+    Build the `UserDetailSerializer` representation of the sender in a row
+    from `get_message_rows`.
+    """
+    return {
+        "username": row.user__username,
+        "email": row.user__email,
+        "first_name": row.user__first_name,
+        "last_name": row.user__last_name,
+        "phone_number": (
+            None if row.user__phone_number is None else str(row.user__phone_number)
+        ),
+        "birthday": row.user__birthday and row.user__birthday.isoformat(),
+        "profile_picture": get_file_url(
+            get_user_model()._meta.get_field("profile_picture").storage,
+            row.user__profile_picture,
+            request,
+        ),
+        "has_usable_password": row.user_has_usable_password,
+        "email_verified": row.user_email_verified,
+    }
+
+
+def message_row_to_dict(row, request, normalized=False) -> dict:
+    """
+    Build the `MessageSerializer` representation of a row from
+    `get_message_rows`, without instantiating any model or serializer field.
+    `normalized` builds the `NormalizedMessageSerializer` one instead.
+    """
+    message = {"id": row.id}
+    if normalized:
+        message["user_id"] = row.user_id
+    else:
+        message["user"] = user_row_to_dict(row, request)
+    message["content"] = row.content
+    message["message_type"] = row.message_type
+    message["file"] = get_file_url(
+        Message._meta.get_field("file").storage, row.file, request
+    )
+    message["parent"] = row.parent_id
+    return message
+
+
+def normalize_message_rows(rows, request) -> tuple[list[dict], dict[str, dict]]:
+    """
+    Return the normalized messages of the rows and their senders by id,
+    each sender built once.
+    """
+    users = {}
+    for row in rows:
+        if row.user_id not in users:
+            users[row.user_id] = user_row_to_dict(row, request)
+    messages = [message_row_to_dict(row, request, normalized=True) for row in rows]
+    return messages, {str(user_id): user for user_id, user in users.items()}
@@ -0,0 +1,254 @@
+from unittest import mock
+
+import pytest
+from allauth.account.models import EmailAddress
+from dj_rest_auth.app_settings import api_settings as jwt_auth_settings
+from asgiref.sync import SyncToAsync, sync_to_async
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from django.test import AsyncClient, AsyncRequestFactory
+from django.urls import reverse
+
+from chat.api.v1.tests.factories import ChatRoomFactory, MessageFactory, UserFactory
+from chat import middleware
+from chat.api.v1.views import message_history
+from chat.middleware import user_cache_key
+from core.cache import MISSING, get_local
+from core.tests.helpers import wait_for
+from users.tokens import RefreshToken
+
+
+def create_room(messages):
+    user, other_user = UserFactory(), UserFactory()
+    other_user.phone_number = "+639171234567"
+    other_user.birthday = "1990-01-02"
+    other_user.set_unusable_password()
+    other_user.save()
+    EmailAddress.objects.create(
+        user=other_user, email=other_user.email, verified=True, primary=True
+    )
+    chat_room = ChatRoomFactory()
+    chat_room.users.add(user, other_user)
+    parent = MessageFactory(room=chat_room, user=user)
+    for i in range(messages - 1):
+        MessageFactory(
+            room=chat_room, user=other_user if i % 2 else user, parent=parent
+        )
+    return chat_room, user
+
+
+def bearer(user):
+    return {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+
+async def get(url, headers=None, **kwargs):
+    return await AsyncClient().get(url, headers=headers, **kwargs)
+
+
+def history_url(chat_room):
+    return reverse(
+        "v1:chat:messages-history", kwargs={"parent_lookup_room": chat_room.id}
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+class TestMessageHistory:
+    async def test_matches_message_viewset(self):
+        """
+        Test that history pages hold exactly what `MessageViewSet` returns.
+        """
+        chat_room, user = await sync_to_async(create_room)(30)
+        api_client = APIClient()
+        api_client.force_authenticate(user)
+        headers = await sync_to_async(bearer)(user)
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        history_url_ = history_url(chat_room)
+        pages = 0
+        while url:
+            expected = (await sync_to_async(api_client.get)(url)).json()
+            response = await get(history_url_, headers)
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            assert data["results"] == expected["results"]
+
+            # Cursors are interchangeable between the two endpoints
+            url = expected["next"]
+            history_url_ = data["next"]
+            assert (url is None) == (history_url_ is None)
+            pages += 1
+        assert pages == 2
+
+    async def test_normalized_shape_matches_message_viewset(self):
+        chat_room, user = await sync_to_async(create_room)(30)
+        api_client = APIClient()
+        api_client.force_authenticate(user)
+        headers = await sync_to_async(bearer)(user)
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        expected = (
+            await sync_to_async(api_client.get)(url, {"shape": "normalized"})
+        ).json()
+        response = await get(
+            history_url(chat_room), headers, data={"shape": "normalized"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert data["messages"] == expected["messages"]
+        assert data["users"] == expected["users"]
+        assert len(data["users"]) == 2
+
+    async def test_previous_page(self):
+        chat_room, user = await sync_to_async(create_room)(30)
+        headers = await sync_to_async(bearer)(user)
+
+        first = (await get(history_url(chat_room), headers)).json()
+        second = (await get(first["next"], headers)).json()
+        back = (await get(second["previous"], headers)).json()
+
+        assert len(second["results"]) == 5
+        assert back["results"] == first["results"]
+
+    async def test_warm_request_makes_one_database_trip(self):
+        """
+        Test that with the user and membership cached, only the page fetch
+        leaves the event loop.
+        """
+        chat_room, user = await sync_to_async(create_room)(30)
+        headers = await sync_to_async(bearer)(user)
+        factory = AsyncRequestFactory()
+        await message_history(
+            factory.get(history_url(chat_room), headers=headers), chat_room.id
+        )
+
+        with mock.patch.object(
+            SyncToAsync, "__call__", autospec=True, side_effect=SyncToAsync.__call__
+        ) as hops:
+            response = await message_history(
+                factory.get(history_url(chat_room), headers=headers), chat_room.id
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert hops.call_count == 1
+
+    async def test_requires_token(self):
+        chat_room, user = await sync_to_async(create_room)(1)
+
+        response = await get(history_url(chat_room))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.headers["WWW-Authenticate"] == 'Bearer realm="api"'
+
+        response = await get(
+            history_url(chat_room), {"Authorization": "Bearer not-a-token"}
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_revoked_token(self):
+        chat_room, user = await sync_to_async(create_room)(1)
+        headers = await sync_to_async(bearer)(user)
+        await sync_to_async(user.revoke_tokens)()
+
+        response = await get(history_url(chat_room), headers)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_token_revoked_while_cached(self):
+        """
+        Test that revoking tokens takes effect although the user is cached.
+        """
+        chat_room, user = await sync_to_async(create_room)(1)
+        headers = await sync_to_async(bearer)(user)
+        response = await get(history_url(chat_room), headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        await sync_to_async(user.revoke_tokens)()
+
+        response = await get(history_url(chat_room), headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_token_revoked_without_chat_signals(self):
+        """
+        Test that a revocation the chat cache never heard of still applies,
+        through the token version shared by every process.
+        """
+        chat_room, user = await sync_to_async(create_room)(1)
+        headers = await sync_to_async(bearer)(user)
+        response = await get(history_url(chat_room), headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        # What another process's revoke_tokens leaves in the shared cache
+        with mock.patch("chat.signals.forget_user"):
+            await sync_to_async(user.revoke_tokens)()
+
+        response = await get(history_url(chat_room), headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_revocation_reaches_other_processes(self, make_cache):
+        """
+        Test that a revocation in one process rejects the user in another
+        process that had them cached.
+        """
+        chat_room, user = await sync_to_async(create_room)(1)
+        headers = await sync_to_async(bearer)(user)
+        this_process, other_process = make_cache(), make_cache()
+
+        with mock.patch.object(middleware, "cache", other_process):
+            response = await get(history_url(chat_room), headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        with (
+            mock.patch.object(middleware, "cache", this_process),
+            mock.patch("users.authentication.cache", this_process),
+        ):
+            await sync_to_async(user.revoke_tokens)()
+
+        wait_for(lambda: get_local(other_process, user_cache_key(user.id)) is MISSING)
+        with mock.patch.object(middleware, "cache", other_process):
+            response = await get(history_url(chat_room), headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_cookie_token(self):
+        """
+        Test that the JWT cookie authenticates like it does for the REST API.
+        """
+        chat_room, user = await sync_to_async(create_room)(1)
+        refresh = await sync_to_async(RefreshToken.for_user)(user)
+        token = str(refresh.access_token)
+        client = AsyncClient()
+        client.cookies[jwt_auth_settings.JWT_AUTH_COOKIE] = token
+
+        response = await client.get(history_url(chat_room))
+        assert response.status_code == status.HTTP_200_OK
+
+        client.cookies[jwt_auth_settings.JWT_AUTH_COOKIE] = "not-a-token"
+        response = await client.get(history_url(chat_room))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_non_member(self):
+        chat_room, _ = await sync_to_async(create_room)(1)
+        outsider = await sync_to_async(UserFactory.create)()
+
+        headers = await sync_to_async(bearer)(outsider)
+
+        response = await get(history_url(chat_room), headers)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_invalid_cursor(self):
+        chat_room, user = await sync_to_async(create_room)(1)
+
+        headers = await sync_to_async(bearer)(user)
+
+        response = await get(
+            history_url(chat_room), headers, data={"cursor": "invalid"}
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json() == {"detail": "Invalid cursor"}
@@ -1,9 +1,14 @@
+from datetime import timedelta
+
 import pytest
 from rest_framework import status
 
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 
 from chat.api.v1.tests.factories import ChatRoomFactory, MessageFactory, UserFactory
+from chat.models import ChatRoom, Message
 
 
 @pytest.mark.django_db
@@ -48,6 +53,54 @@ class TestMessageViewSet:
         assert len(response.data["results"]) == 10
         assert response.data["next"] is not None
 
+    def test_paginate_messages_sharing_a_timestamp(
+        self, authenticated_api_client, user
+    ):
+        """
+        Test that cursors neither skip nor repeat messages created in the same
+        instant, in either direction.
+        """
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+        MessageFactory.create_batch(60, room=chat_room, user=user)
+        Message.objects.filter(room=chat_room).update(created=timezone.now())
+        expected_ids = list(
+            Message.objects.filter(room=chat_room)
+            .order_by("-id")
+            .values_list("id", flat=True)
+        )
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        pages = []
+        while url:
+            response = authenticated_api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            pages.append([message["id"] for message in response.data["results"]])
+            previous_url, url = response.data["previous"], response.data["next"]
+
+        assert [len(page) for page in pages] == [25, 25, 10]
+        assert sum(pages, []) == expected_ids
+
+        response = authenticated_api_client.get(previous_url)
+        assert [message["id"] for message in response.data["results"]] == pages[1]
+
+    def test_invalid_cursor(self, authenticated_api_client, user):
+        """
+        Test that a malformed cursor position is rejected.
+        """
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        response = authenticated_api_client.get(
+            url, {"cursor": "cD1ub3QtYS1kYXRlJTdDMQ=="}
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
     def test_unauthenticated_user(self, api_client):
         """
         Test that an unauthenticated user cannot access messages.
@@ -99,3 +152,385 @@ class TestMessageViewSet:
         assert len(response.data["results"]) == 2
         assert response.data["results"][0]["content"] == message2.content
         assert response.data["results"][1]["content"] == message1.content
+
+    def test_normalized_shape(self, authenticated_api_client, user):
+        """
+        Test that `?shape=normalized` lists each sender once and holds the
+        same messages as the default shape.
+        """
+        chat_room = ChatRoomFactory()
+        another_user = UserFactory()
+        chat_room.users.add(user, another_user)
+        for i in range(30):
+            MessageFactory(room=chat_room, user=another_user if i % 2 else user)
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        expected = authenticated_api_client.get(url).json()
+        response = authenticated_api_client.get(url, {"shape": "normalized"})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+
+        assert set(data) == {"next", "previous", "messages", "users"}
+        assert set(data["users"]) == {str(user.id), str(another_user.id)}
+        for message in data["messages"]:
+            message["user"] = data["users"][str(message.pop("user_id"))]
+        assert data["messages"] == expected["results"]
+
+        # Cursors keep the shape
+        response = authenticated_api_client.get(data["next"])
+        assert len(response.json()["messages"]) == 5
+
+
+@pytest.mark.django_db
+class TestChatRoomViewSet:
+    def test_rooms_are_ordered_by_activity(self, authenticated_api_client, user):
+        """
+        Test that the room list puts the most recently active rooms first.
+        """
+        quiet_room, busy_room, new_room = ChatRoomFactory.create_batch(3)
+        for chat_room in (quiet_room, busy_room, new_room):
+            chat_room.users.add(user)
+        MessageFactory(room=quiet_room, user=user)
+        message = MessageFactory(room=busy_room, user=user)
+        ChatRoomFactory().users.add(UserFactory())
+
+        response = authenticated_api_client.get(reverse("v1:chat:rooms-list"))
+        assert response.status_code == status.HTTP_200_OK
+        assert [room["id"] for room in response.data["results"]] == [
+            busy_room.id,
+            quiet_room.id,
+            new_room.id,
+        ]
+        assert response.data["results"][0]["latest_message"]["id"] == message.id
+        assert response.data["results"][2]["latest_message"] is None
+
+    def test_paginate_rooms(self, authenticated_api_client, user):
+        """
+        Test that every room is listed exactly once across pages.
+        """
+        chat_rooms = ChatRoomFactory.create_batch(30)
+        for chat_room in chat_rooms:
+            chat_room.users.add(user)
+            MessageFactory(room=chat_room, user=user)
+
+        response = authenticated_api_client.get(reverse("v1:chat:rooms-list"))
+        first_page = [room["id"] for room in response.data["results"]]
+        response = authenticated_api_client.get(response.data["next"])
+        second_page = [room["id"] for room in response.data["results"]]
+
+        assert len(first_page) == 25
+        assert response.data["next"] is None
+        assert first_page + second_page == [room.id for room in reversed(chat_rooms)]
+
+
+@pytest.mark.django_db
+class TestQueryCounts:
+    @pytest.mark.parametrize("members", [2, 10])
+    def test_room_list(
+        self, authenticated_api_client, user, members, django_assert_num_queries
+    ):
+        """
+        Test that listing rooms costs the same number of queries however many
+        rooms, members and messages are listed.
+        """
+        for chat_room in ChatRoomFactory.create_batch(members):
+            chat_room.users.add(user, *UserFactory.create_batch(members - 1))
+            MessageFactory(room=chat_room, user=user)
+
+        # Rooms with their last message, then members and senders; the
+        # validator is a cache lookup
+        with django_assert_num_queries(3):
+            response = authenticated_api_client.get(reverse("v1:chat:rooms-list"))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == members
+
+    @pytest.mark.parametrize("senders", [2, 25])
+    def test_message_page(
+        self, authenticated_api_client, user, senders, django_assert_num_queries
+    ):
+        """
+        Test that a message page costs the same number of queries however many
+        messages and senders it holds.
+        """
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+        for sender in UserFactory.create_batch(senders):
+            MessageFactory(room=chat_room, user=sender)
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        # The membership check warms its cache on the first request
+        authenticated_api_client.get(url)
+        # Validators, messages, then senders
+        with django_assert_num_queries(3):
+            response = authenticated_api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == senders
+
+        with django_assert_num_queries(3):
+            response = authenticated_api_client.get(url, {"shape": "normalized"})
+        assert set(response.data["users"]) == {
+            str(message["user_id"]) for message in response.data["messages"]
+        }
+
+    def test_sparse_message_query(
+        self, authenticated_api_client, user, django_assert_num_queries
+    ):
+        """
+        Test that a `?query=` without the sender neither fetches senders nor
+        loads unselected columns.
+        """
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+        MessageFactory.create_batch(3, room=chat_room, user=user)
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        authenticated_api_client.get(url)
+        with django_assert_num_queries(2) as queries:
+            response = authenticated_api_client.get(url, {"query": "{id, content}"})
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data["results"][0]) == {"id", "content"}
+        assert '"message_type"' not in queries.captured_queries[1]["sql"]
+
+    def test_nested_message_query(self, authenticated_api_client, user):
+        """
+        Test that nested selections load exactly what they output.
+        """
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+        MessageFactory(room=chat_room, user=user)
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        response = authenticated_api_client.get(
+            url, {"query": "{id, user {username, email_verified}}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"][0]["user"] == {
+            "username": user.username,
+            "email_verified": False,
+        }
+
+    def test_invalid_query(self, authenticated_api_client, user):
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+        MessageFactory(room=chat_room, user=user)
+
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+        response = authenticated_api_client.get(url, {"query": "{id, missing}"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_sparse_room_query(
+        self, authenticated_api_client, user, django_assert_num_queries
+    ):
+        """
+        Test that rooms listed without members or latest message cost one
+        query.
+        """
+        for chat_room in ChatRoomFactory.create_batch(3):
+            chat_room.users.add(user, UserFactory())
+            MessageFactory(room=chat_room, user=user)
+
+        with django_assert_num_queries(1) as queries:
+            response = authenticated_api_client.get(
+                reverse("v1:chat:rooms-list"), {"query": "{id, name}"}
+            )
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 3
+        assert "chat_message" not in queries.captured_queries[0]["sql"]
+
+    def test_room_latest_message_query(
+        self, authenticated_api_client, user, django_assert_num_queries
+    ):
+        """
+        Test that selecting only the latest message's content joins it
+        without fetching members or senders.
+        """
+        for chat_room in ChatRoomFactory.create_batch(3):
+            chat_room.users.add(user)
+            MessageFactory(room=chat_room, user=user, content="hello")
+
+        with django_assert_num_queries(1):
+            response = authenticated_api_client.get(
+                reverse("v1:chat:rooms-list"),
+                {"query": "{id, latest_message {content}}"},
+            )
+        assert [room["latest_message"] for room in response.data["results"]] == [
+            {"content": "hello"}
+        ] * 3
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    def test_room_list(self, authenticated_api_client, user, django_assert_num_queries):
+        """
+        Test that an unchanged room list is answered with 304 without a
+        query, and that messages, room edits and memberships change its ETag.
+        """
+        chat_room = ChatRoomFactory()
+        another_user = UserFactory()
+        chat_room.users.add(user, another_user)
+        url = reverse("v1:chat:rooms-list")
+
+        response = authenticated_api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response["ETag"]
+        assert "Last-Modified" not in response
+
+        with django_assert_num_queries(0):
+            response = authenticated_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+
+        # Another representation of the same rooms
+        response = authenticated_api_client.get(
+            url, {"query": "{id}"}, HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        for change in [
+            lambda: MessageFactory(room=chat_room, user=another_user),
+            lambda: ChatRoom.objects.get(pk=chat_room.pk).save(),
+            lambda: chat_room.users.remove(another_user),
+            lambda: ChatRoomFactory().users.add(user),
+            lambda: chat_room.users.remove(user),
+        ]:
+            change()
+            response = authenticated_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_200_OK
+            assert response["ETag"] != etag
+            etag = response["ETag"]
+
+    def test_room_list_version_is_per_user(self, authenticated_api_client, user):
+        """
+        Test that changes to rooms the user is not in keep their ETag.
+        """
+        ChatRoomFactory().users.add(user)
+        url = reverse("v1:chat:rooms-list")
+        etag = authenticated_api_client.get(url)["ETag"]
+
+        other_room = ChatRoomFactory()
+        other_room.users.add(UserFactory())
+        MessageFactory(room=other_room)
+
+        response = authenticated_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_member_profile_change(self, authenticated_api_client, user):
+        chat_room = ChatRoomFactory()
+        another_user = UserFactory()
+        chat_room.users.add(user, another_user)
+        url = reverse("v1:chat:rooms-list")
+        etag = authenticated_api_client.get(url)["ETag"]
+
+        another_user.first_name = "Renamed"
+        another_user.save()
+
+        response = authenticated_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_message_page(
+        self, authenticated_api_client, user, django_assert_num_queries
+    ):
+        """
+        Test that an unchanged first message page is answered with 304 after
+        a single query, and that new, edited and deleted messages change its
+        validators.
+        """
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+        message = MessageFactory(room=chat_room, user=user)
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+
+        response = authenticated_api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response["ETag"]
+
+        with django_assert_num_queries(1):
+            response = authenticated_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        for change in [
+            lambda: MessageFactory(room=chat_room, user=user),
+            lambda: Message.objects.filter(pk=message.pk).get().save(),
+            lambda: message.delete(),
+        ]:
+            change()
+            response = authenticated_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_200_OK
+            assert response["ETag"] != etag
+            etag = response["ETag"]
+
+    def test_message_page_last_modified(self, authenticated_api_client, user):
+        """
+        Test that Last-Modified is only sent once its second has passed, so
+        a later message in the same second cannot be hidden by a 304.
+        """
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+        MessageFactory(room=chat_room, user=user)
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+
+        response = authenticated_api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert "Last-Modified" not in response
+
+        past = timezone.now() - timedelta(minutes=1)
+        ChatRoom.objects.filter(pk=chat_room.pk).update(
+            last_message_at=past, modified=past
+        )
+        response = authenticated_api_client.get(url)
+        last_modified = response["Last-Modified"]
+        assert last_modified == http_date(int(past.timestamp()))
+
+        response = authenticated_api_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        MessageFactory(room=chat_room, user=user)
+        response = authenticated_api_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_later_message_pages_are_not_conditional(
+        self, authenticated_api_client, user
+    ):
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(user)
+        MessageFactory.create_batch(30, room=chat_room, user=user)
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+
+        response = authenticated_api_client.get(
+            authenticated_api_client.get(url).data["next"]
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert "ETag" not in response
+
+    def test_non_member(self, authenticated_api_client):
+        """
+        Test that validators are not checked before permissions.
+        """
+        chat_room = ChatRoomFactory()
+        chat_room.users.add(UserFactory())
+        url = reverse(
+            "v1:chat:messages-list", kwargs={"parent_lookup_room": chat_room.id}
+        )
+
+        response = authenticated_api_client.get(url, HTTP_IF_NONE_MATCH="*")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
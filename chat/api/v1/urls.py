@@ -3,6 +3,7 @@ from rest_framework_extensions.routers import ExtendedDefaultRouter as DefaultRo
 
 from django.urls import include, path
 
+from chat.api.v1.views import message_history
 from chat.api.v1.viewsets import ChatRoomViewSet, MessageViewSet
 
 
@@ -18,5 +19,11 @@ room_router.register(
 )
 
 urlpatterns = [
+    # Ahead of the router, whose message detail route would match "history"
+    path(
+        "rooms/<int:parent_lookup_room>/messages/history/",
+        message_history,
+        name="messages-history",
+    ),
     path("", include(router.urls)),
 ]
@@ -0,0 +1,98 @@
+from dj_rest_auth.app_settings import api_settings as jwt_auth_settings
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+
+from chat.api.v1.pagination import MessageCursorPagination
+from chat.api.v1.serializers import (
+    get_message_rows,
+    message_row_to_dict,
+    normalize_message_rows,
+)
+from chat.membership import ais_member
+from chat.middleware import get_user_from_token
+from chat.models import Message
+from chat.utils import encode_json
+
+
+def json_response(data, status=status.HTTP_200_OK, **kwargs):
+    return HttpResponse(
+        encode_json(data), status=status, content_type="application/json", **kwargs
+    )
+
+
+def get_raw_token(request):
+    """
+    Return the request's bearer token, falling back to the JWT cookie like
+    `ClaimsJWTCookieAuthentication`. Only safe methods are served, so the
+    cookie needs no CSRF check.
+    """
+    header = request.headers.get("Authorization")
+    if header is None:
+        cookie_name = jwt_auth_settings.JWT_AUTH_COOKIE
+        return request.COOKIES.get(cookie_name) if cookie_name else None
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return token
+
+
+async def authenticate(request):
+    """
+    Return the user of the request's bearer token or JWT cookie, or None.
+    """
+    token = get_raw_token(request)
+    if not token:
+        return None
+    user = await get_user_from_token(token)
+    return user if user.is_authenticated else None
+
+
+@require_safe
+async def message_history(request, parent_lookup_room):
+    """
+    The room's messages, newest first, in the pages and representation of
+    `MessageViewSet.list`.
+
+    Runs on the event loop: the user, their token version and the
+    membership are read from the shared cache without leaving the process
+    when it can (see `core.cache.get_local`), so a revocation or removal in
+    any process applies on the next request. The page is fetched with one
+    `aiterator` chunk and turned into dicts straight from the rows.
+    """
+    user = await authenticate(request)
+    if user is None:
+        return json_response(
+            {"detail": "Authentication credentials were not provided."},
+            status=status.HTTP_401_UNAUTHORIZED,
+            headers={"WWW-Authenticate": 'Bearer realm="api"'},
+        )
+    if not await ais_member(parent_lookup_room, user.id):
+        return json_response(
+            {"detail": "You do not have permission to perform this action."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    paginator = MessageCursorPagination()
+    try:
+        rows = await paginator.apaginate_queryset(
+            get_message_rows(Message.objects.filter(room_id=parent_lookup_room)),
+            Request(request),
+        )
+    except NotFound as e:
+        return json_response({"detail": e.detail}, status=e.status_code)
+
+    if paginator.is_normalized(paginator.request):
+        return json_response(
+            paginator.get_normalized_data(*normalize_message_rows(rows, request))
+        )
+    return json_response(
+        {
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "results": [message_row_to_dict(row, request) for row in rows],
+        }
+    )
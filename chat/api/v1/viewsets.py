@@ -1,31 +1,98 @@
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_extensions.mixins import NestedViewSetMixin
 
-from chat.api.v1.pagination import MessageCursorPagination
+from django.contrib.auth import get_user_model
+
+from chat.api.v1.pagination import ChatRoomCursorPagination, MessageCursorPagination
 from chat.api.v1.permissions import CanViewChatRoom, CanViewMessage
-from chat.api.v1.serializers import ChatRoomSerializer, MessageSerializer
+from chat.api.v1.serializers import (
+    ChatRoomSerializer,
+    MessageSerializer,
+    NormalizedMessageSerializer,
+)
+from chat.listings import get_room_list_version
 from chat.models import ChatRoom, Message
+from core.api.v1.mixins import ConditionalListMixin, OptimizedQuerySetViewMixin
+from users.api.v1.serializers import UserDetailSerializer
 
 
-class ChatRoomViewSet(ModelViewSet):
+class ChatRoomViewSet(ConditionalListMixin, OptimizedQuerySetViewMixin, ModelViewSet):
     serializer_class = ChatRoomSerializer
     permission_classes = [IsAuthenticated, CanViewChatRoom]
     queryset = ChatRoom.objects.all()
-    pagination_class = LimitOffsetPagination
+    pagination_class = ChatRoomCursorPagination
+
+    def get_list_validators(self):
+        # One cache lookup; `chat.listings` expires the version on any change
+        # to the user's rooms. There is no reliable Last-Modified: leaving a
+        # room changes the listing without a timestamp to show for it.
+        return get_room_list_version(self.request.user.pk), None
 
     def get_queryset(self):
-        return (
-            ChatRoom.objects.filter(users=self.request.user)
-            .order_by("-created")
-            .latest_message()
+        return self.optimize_queryset(
+            ChatRoom.objects.filter(users=self.request.user).by_activity()
         )
 
 
 # Use NestedViewSetMixin to automatically filter Messages according to the chatroom
-class MessageViewSet(NestedViewSetMixin, ModelViewSet):
+class MessageViewSet(
+    ConditionalListMixin,
+    OptimizedQuerySetViewMixin,
+    NestedViewSetMixin,
+    ModelViewSet,
+):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated, CanViewMessage]
     pagination_class = MessageCursorPagination
     queryset = Message.objects.all()
+    # Read by CanViewMessage
+    query_columns = ["room"]
+
+    def get_list_validators(self):
+        # Only the first page is polled for new messages
+        if self.paginator.cursor_query_param in self.request.query_params:
+            return None
+        room = (
+            ChatRoom.objects.filter(pk=self.kwargs["parent_lookup_room"])
+            .values("last_seq", "last_message_at", "modified")
+            .first()
+        )
+        if room is None:
+            return None
+        return (
+            ":".join(str(value) for value in room.values()),
+            max(room["last_message_at"], room["modified"]),
+        )
+
+    def get_serializer_class(self):
+        if self.action == "list" and self.paginator.is_normalized(self.request):
+            return NormalizedMessageSerializer
+        return super().get_serializer_class()
+
+    def get_paginated_response(self, data):
+        if not self.paginator.is_normalized(self.request):
+            return super().get_paginated_response(data)
+
+        # Each sender is serialized once, however many messages they sent.
+        # `?query=` selects message fields, so senders are always complete.
+        senders = list(
+            UserDetailSerializer().optimize_queryset(
+                get_user_model().objects.filter(
+                    id__in={message.user_id for message in self.paginator.page}
+                )
+            )
+        )
+        users = UserDetailSerializer(
+            senders,
+            many=True,
+            context=self.get_serializer_context(),
+            disable_dynamic_fields=True,
+        ).data
+        return Response(
+            self.paginator.get_normalized_data(
+                data,
+                {str(sender.id): user for sender, user in zip(senders, users)},
+            )
+        )
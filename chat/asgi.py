@@ -2,10 +2,10 @@ import os
 
 from channels.routing import ProtocolTypeRouter, URLRouter
 
-from django.core.asgi import get_asgi_application
-
+from chat.buffers import lifespan
 from chat.middleware import JWTAuthMiddleware
 from chat.routing import websocket_urlpatterns
+from core.handlers import get_asgi_application
 
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", os.getenv("DJANGO_SETTINGS_MODULE", ""))
@@ -14,5 +14,7 @@ application = ProtocolTypeRouter(
     {
         "http": get_asgi_application(),
         "websocket": JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+        # Saves queued write-behind messages when the server shuts down
+        "lifespan": lifespan,
     }
 )
@@ -0,0 +1,81 @@
+"""
+Compare polls answered with 304 Not Modified with full responses.
+
+    python -m chat.benchmarks.bench_conditional_get [requests]
+
+A user in 25 rooms of two members polls the room list and the first
+message page of one room, through the ASGI handler uvicorn runs, without
+and with the ETag of the previous response.
+"""
+
+import asyncio
+import sys
+
+from core.benchmarks import asgi_get, setup_django, test_database, timer
+
+
+ROOMS = 25
+MESSAGES = 100
+
+
+def bench(label, handler, path, headers, requests, expected_status):
+    async def run():
+        for _ in range(requests):
+            status, _ = await asgi_get(handler, path, headers=headers)
+            assert status == expected_status, status
+
+    with timer(label, requests):
+        asyncio.run(run())
+
+
+def main(requests: int):
+    from rest_framework.test import APIClient
+
+    from django.urls import reverse
+
+    from chat.models import ChatRoom, Message
+    from core.handlers import PathDispatchASGIHandler
+    from users.models import User
+    from users.tokens import RefreshToken
+
+    with test_database():
+        users = [
+            User.objects.create_user(username=f"bench{i}", email=f"bench{i}@x.com")
+            for i in range(2)
+        ]
+        rooms = [ChatRoom.objects.create(name=f"Room {i}") for i in range(ROOMS)]
+        for room in rooms:
+            room.users.add(*users)
+            for seq in range(MESSAGES):
+                Message.objects.create(
+                    room=room, user=users[seq % 2], content=f"message {seq}"
+                )
+
+        token = RefreshToken.for_user(users[0]).access_token
+        headers = [(b"authorization", f"Bearer {token}".encode())]
+        handler = PathDispatchASGIHandler()
+        # Only used to read the ETag to poll with
+        client = APIClient()
+        client.force_authenticate(users[0])
+
+        print(f"{requests:,} sequential requests per row")
+        for name, path in [
+            ("room list", reverse("v1:chat:rooms-list")),
+            ("message page", reverse("v1:chat:messages-list", args=[rooms[0].id])),
+        ]:
+            asyncio.run(asgi_get(handler, path, headers=headers))
+            etag = client.get(path)["ETag"].encode()
+            bench(f"{name}, 200", handler, path, headers, requests, 200)
+            bench(
+                f"{name}, 304",
+                handler,
+                path,
+                [*headers, (b"if-none-match", etag)],
+                requests,
+                304,
+            )
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
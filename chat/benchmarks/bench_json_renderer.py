@@ -0,0 +1,117 @@
+"""
+Compare DRF's JSON renderer and parser with the orjson ones.
+
+    python -m chat.benchmarks.bench_json_renderer [repeat]
+
+Renders the data of real `MessageViewSet` and `ChatRoomViewSet` pages, in
+the embedded and normalized shapes, and parses a message page and a
+message body, `repeat` times each. The data is serialized once up front so
+only encoding and decoding are timed.
+"""
+
+import io
+import sys
+
+from core.benchmarks import setup_django, test_database, timer
+
+
+MESSAGES = 200
+ROOMS = 25
+
+
+def fill(users):
+    from chat.models import ChatRoom, Message
+
+    rooms = [ChatRoom.objects.create(name=f"Room {i}") for i in range(ROOMS)]
+    for room in rooms:
+        room.users.add(*users)
+        Message.objects.bulk_create(
+            Message(
+                room=room,
+                user=users[seq % 2],
+                content=f"Message {seq}: see you at the café at 6, bring the notes 🙂",
+                seq=seq,
+            )
+            for seq in range(1, MESSAGES + 1)
+        )
+        ChatRoom.objects.filter(id=room.id).update(last_seq=MESSAGES)
+        ChatRoom.objects.refresh_last_message(room.id)
+    return rooms[0]
+
+
+def get_page_data(user, path, query=None):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.get(path, query)
+    assert response.status_code == 200, response.status_code
+    return response.data
+
+
+def bench_render(label, renderer, data, repeat):
+    with timer(label, repeat):
+        for _ in range(repeat):
+            content = renderer.render(data, "application/json", {})
+    print(f"{'':<4}{len(content):,} bytes")
+
+
+def bench_parse(label, parser, content, repeat):
+    with timer(label, repeat):
+        for _ in range(repeat):
+            parser.parse(io.BytesIO(content), "application/json", {})
+
+
+def main(repeat: int):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from django.urls import reverse
+
+    from core.api.parsers import ORJSONParser
+    from core.api.renderers import ORJSONRenderer
+    from users.models import User
+
+    with test_database():
+        users = [
+            User.objects.create_user(
+                username=f"bench{i}",
+                email=f"bench{i}@x.com",
+                first_name="Bench",
+                last_name=f"User {i}",
+                phone_number="+639171234567",
+                birthday="1990-01-02",
+            )
+            for i in range(2)
+        ]
+        room = fill(users)
+        messages = reverse("v1:chat:messages-list", args=[room.id])
+        pages = [
+            ("message page", get_page_data(users[0], messages)),
+            (
+                "normalized message page",
+                get_page_data(users[0], messages, {"shape": "normalized"}),
+            ),
+            ("room page", get_page_data(users[0], reverse("v1:chat:rooms-list"))),
+        ]
+
+        print(f"{repeat:,} renders per row")
+        for name, data in pages:
+            for renderer in (JSONRenderer(), ORJSONRenderer()):
+                bench_render(
+                    f"{name}, {type(renderer).__name__}", renderer, data, repeat
+                )
+
+        print(f"{repeat:,} parses per row")
+        bodies = [
+            ("message page", JSONRenderer().render(pages[0][1])),
+            ("message body", b'{"content": "see you at the caf\\u00e9", "parent": 1}'),
+        ]
+        for name, content in bodies:
+            for parser in (JSONParser(), ORJSONParser()):
+                bench_parse(f"{name}, {type(parser).__name__}", parser, content, repeat)
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
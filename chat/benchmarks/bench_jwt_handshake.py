@@ -0,0 +1,62 @@
+"""
+Measure websocket handshakes per second through `JWTAuthMiddleware`.
+
+    python -m chat.benchmarks.bench_jwt_handshake [handshakes]
+
+Simulates a reconnect storm: every handshake presents the same access token
+and runs concurrently. "uncached" clears the token and user caches before
+each handshake, which is what every handshake cost before they existed.
+"""
+
+import asyncio
+import sys
+
+from core.benchmarks import setup_django, test_database, timer
+
+
+async def accept(scope, receive, send):
+    pass
+
+
+async def handshake(middleware, headers, clear_caches):
+    from django.core.cache import cache
+
+    from chat.middleware import token_claims
+
+    if clear_caches:
+        token_claims.clear()
+        cache.clear()
+
+    scope = {"type": "websocket", "headers": headers}
+    await middleware(scope, None, None)
+    assert scope["user"].is_authenticated
+
+
+async def storm(label, token, count, clear_caches):
+    from chat.middleware import JWTAuthMiddleware
+
+    middleware = JWTAuthMiddleware(accept)
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    with timer(label, count):
+        await asyncio.gather(
+            *(handshake(middleware, headers, clear_caches) for _ in range(count))
+        )
+
+
+def main(count: int):
+    from asgiref.sync import async_to_sync
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from users.models import User
+
+    with test_database():
+        user = User.objects.create_user(username="bench", password="bench")
+        token = str(AccessToken.for_user(user))
+
+        async_to_sync(storm)("uncached handshakes", token, count, True)
+        async_to_sync(storm)("cached handshakes", token, count, False)
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
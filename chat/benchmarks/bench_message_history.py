@@ -0,0 +1,97 @@
+"""
+Compare the async message history view with `MessageViewSet.list`.
+
+    python -m chat.benchmarks.bench_message_history [requests] [concurrency]
+
+Both endpoints serve the same first page of 25 messages, sent by two users,
+through the ASGI handler uvicorn runs. Each is timed with one request at a
+time and with `concurrency` clients at once. "hops" counts the calls that
+left the event loop for a thread per request, including the handler's own
+(request signals, closing the response).
+"""
+
+import asyncio
+import sys
+from unittest import mock
+
+from core.benchmarks import asgi_get, setup_django, test_database, timer
+
+
+MESSAGES = 2_000
+
+
+def fill_room(room, users):
+    from chat.models import ChatRoom, Message
+
+    Message.objects.bulk_create(
+        Message(room=room, user=users[seq % 2], content=f"message {seq}", seq=seq)
+        for seq in range(1, MESSAGES + 1)
+    )
+    ChatRoom.objects.filter(id=room.id).update(last_seq=MESSAGES)
+
+
+def bench(label, handler, path, headers, requests, concurrency):
+    from asgiref.sync import SyncToAsync
+
+    statuses = set()
+
+    async def client(count):
+        for _ in range(count):
+            status, _ = await asgi_get(handler, path, headers=headers)
+            statuses.add(status)
+
+    async def run():
+        per_client, rest = divmod(requests, concurrency)
+        await asyncio.gather(
+            *(client(per_client + (i < rest)) for i in range(concurrency))
+        )
+
+    with mock.patch.object(
+        SyncToAsync, "__call__", autospec=True, side_effect=SyncToAsync.__call__
+    ) as hops:
+        with timer(label, requests):
+            asyncio.run(run())
+    assert statuses == {200}, statuses
+    print(f"{'':<4}{hops.call_count / requests:.1f} hops per request")
+
+
+def main(requests: int, concurrency: int):
+    from django.urls import reverse
+
+    from chat.models import ChatRoom
+    from core.handlers import PathDispatchASGIHandler
+    from users.models import User
+    from users.tokens import RefreshToken
+
+    with test_database():
+        users = [
+            User.objects.create_user(username=f"bench{i}", email=f"bench{i}@x.com")
+            for i in range(2)
+        ]
+        room = ChatRoom.objects.create(name="Benchmark")
+        room.users.add(*users)
+        fill_room(room, users)
+
+        token = RefreshToken.for_user(users[0]).access_token
+        headers = [(b"authorization", f"Bearer {token}".encode())]
+        handler = PathDispatchASGIHandler()
+        endpoints = [
+            ("viewset", reverse("v1:chat:messages-list", args=[room.id])),
+            ("history", reverse("v1:chat:messages-history", args=[room.id])),
+        ]
+        # Warm up the membership and user caches
+        for _, path in endpoints:
+            asyncio.run(asgi_get(handler, path, headers=headers))
+
+        for clients in [1, concurrency]:
+            print(f"{requests:,} requests, {clients} at a time")
+            for name, path in endpoints:
+                bench(name, handler, path, headers, requests, clients)
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 32,
+    )
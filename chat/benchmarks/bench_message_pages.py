@@ -0,0 +1,92 @@
+"""
+Compare the cost of deep message history pages with the first page.
+
+    python -m chat.benchmarks.bench_message_pages [messages]
+
+Fills one room with `messages` rows (200,000 by default; pass 10000000 for
+the 10M-row case), then fetches a page at increasing depths through
+`MessageCursorPagination` and, for comparison, with an OFFSET. Keyset pages
+should cost the same at every depth while OFFSET grows with it.
+"""
+
+import sys
+
+from core.benchmarks import setup_django, test_database, timer
+
+
+BATCH_SIZE = 10_000
+REPEAT = 50
+
+
+def fill_room(room, user, count):
+    from chat.models import ChatRoom, Message
+
+    for start in range(0, count, BATCH_SIZE):
+        Message.objects.bulk_create(
+            Message(room=room, user=user, content=f"m{seq}", seq=seq)
+            for seq in range(start + 1, min(start + BATCH_SIZE, count) + 1)
+        )
+    ChatRoom.objects.filter(id=room.id).update(last_seq=count)
+
+
+def keyset_page(room, depth):
+    from rest_framework.pagination import Cursor
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from chat.api.v1.pagination import MessageCursorPagination
+    from chat.models import Message
+
+    queryset = Message.objects.filter(room=room)
+    paginator = MessageCursorPagination()
+    paginator.base_url = "http://testserver/"
+    url = paginator.base_url
+    if depth:
+        anchor = queryset.order_by(*paginator.ordering)[depth - 1]
+        position = paginator._get_position_from_instance(anchor, paginator.ordering)
+        url = paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+    request = Request(APIRequestFactory().get(url))
+
+    with timer(f"keyset page at depth {depth:,}", REPEAT):
+        for _ in range(REPEAT):
+            page = paginator.paginate_queryset(queryset, request)
+    assert len(page) == paginator.page_size
+
+
+def offset_page(room, depth):
+    from chat.api.v1.pagination import MessageCursorPagination
+    from chat.models import Message
+
+    ordering = MessageCursorPagination.ordering
+    page_size = MessageCursorPagination.page_size
+    queryset = Message.objects.filter(room=room).order_by(*ordering)
+
+    end = depth + page_size
+    with timer(f"offset page at depth {depth:,}", REPEAT):
+        for _ in range(REPEAT):
+            page = list(queryset[depth:end])
+    assert len(page) == page_size
+
+
+def main(count: int):
+    from chat.models import ChatRoom
+    from users.models import User
+
+    with test_database():
+        user = User.objects.create_user(username="bench", password="bench")
+        room = ChatRoom.objects.create(name="Benchmark")
+        room.users.add(user)
+        fill_room(room, user, count)
+
+        depths = [0, count // 100, count // 2, count - 100]
+        for depth in depths:
+            keyset_page(room, depth)
+        for depth in depths:
+            offset_page(room, depth)
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
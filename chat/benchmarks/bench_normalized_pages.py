@@ -0,0 +1,86 @@
+"""
+Compare the embedded and normalized shapes of a message page.
+
+    python -m chat.benchmarks.bench_normalized_pages [requests]
+
+Serves the first page of 25 messages of a two-person room from
+`MessageViewSet.list` and the async history view, each with and without
+`?shape=normalized`, and prints the body size of each next to its timing.
+"""
+
+import asyncio
+import sys
+
+from core.benchmarks import asgi_get, setup_django, test_database, timer
+
+
+MESSAGES = 200
+
+
+def bench(label, handler, path, query_string, headers, requests):
+    sizes = set()
+
+    async def run():
+        for _ in range(requests):
+            status, body = await asgi_get(
+                handler, path, query_string=query_string, headers=headers
+            )
+            assert status == 200, status
+            sizes.add(len(body))
+
+    with timer(label, requests):
+        asyncio.run(run())
+    print(f"{'':<4}{max(sizes):,} bytes")
+
+
+def main(requests: int):
+    from django.urls import reverse
+
+    from chat.models import ChatRoom, Message
+    from core.handlers import PathDispatchASGIHandler
+    from users.models import User
+    from users.tokens import RefreshToken
+
+    with test_database():
+        users = [
+            User.objects.create_user(
+                username=f"bench{i}",
+                email=f"bench{i}@x.com",
+                first_name="Bench",
+                last_name=f"User {i}",
+            )
+            for i in range(2)
+        ]
+        room = ChatRoom.objects.create(name="Benchmark")
+        room.users.add(*users)
+        Message.objects.bulk_create(
+            Message(room=room, user=users[seq % 2], content=f"message {seq}", seq=seq)
+            for seq in range(1, MESSAGES + 1)
+        )
+        ChatRoom.objects.filter(id=room.id).update(last_seq=MESSAGES)
+
+        token = RefreshToken.for_user(users[0]).access_token
+        headers = [(b"authorization", f"Bearer {token}".encode())]
+        handler = PathDispatchASGIHandler()
+        endpoints = [
+            ("viewset", reverse("v1:chat:messages-list", args=[room.id])),
+            ("history", reverse("v1:chat:messages-history", args=[room.id])),
+        ]
+        # Warm up the membership and user caches
+        for _, path in endpoints:
+            asyncio.run(asgi_get(handler, path, headers=headers))
+
+        print(f"{requests:,} sequential requests per row")
+        for name, path in endpoints:
+            for shape, query_string in [
+                ("embedded", b""),
+                ("normalized", b"shape=normalized"),
+            ]:
+                bench(
+                    f"{name}, {shape}", handler, path, query_string, headers, requests
+                )
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,56 @@
+"""
+Compare per-message inserts with the write-behind buffer.
+
+    python -m chat.benchmarks.bench_write_behind [messages]
+
+"Sender latency" is the time the consumer spends before it can take the next
+message, "total" includes waiting for every message to be persisted.
+"""
+
+import asyncio
+import sys
+
+from core.benchmarks import setup_django, test_database, timer
+
+
+async def per_message(room, user, count):
+    from chat.models import Message
+
+    with timer("per-message acreate (sender latency = total)", count):
+        for i in range(count):
+            await Message.objects.acreate(room=room, user=user, content=f"m{i}")
+
+
+async def write_behind(room, user, count):
+    from chat.buffers import MessageWriteBuffer
+    from chat.models import Message
+
+    buffer = MessageWriteBuffer()
+    futures = []
+    with timer("write-behind (total)", count):
+        with timer("write-behind (sender latency)", count):
+            for i in range(count):
+                message = Message(room=room, user=user, content=f"m{i}")
+                futures.append(buffer.add(message))
+        await buffer.close()
+        await asyncio.gather(*futures)
+
+
+def main(count: int):
+    from asgiref.sync import async_to_sync
+
+    from chat.models import ChatRoom
+    from users.models import User
+
+    with test_database():
+        user = User.objects.create_user(username="bench", password="bench")
+        room = ChatRoom.objects.create(name="Benchmark")
+        room.users.add(user)
+
+        async_to_sync(per_message)(room, user, count)
+        async_to_sync(write_behind)(room, user, count)
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
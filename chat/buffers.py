@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import weakref
+from collections import defaultdict
+
+from channels.db import database_sync_to_async
+
+from django.conf import settings
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 200
+DEFAULT_MAX_DELAY = 0.02
+
+_buffers = weakref.WeakKeyDictionary()
+
+
+def get_write_behind_settings() -> dict:
+    return getattr(settings, "CHAT_WRITE_BEHIND", {})
+
+
+def write_behind_enabled() -> bool:
+    return get_write_behind_settings().get("ENABLED", False)
+
+
+def get_message_buffer() -> "MessageWriteBuffer":
+    """
+    Return the write-behind buffer bound to the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        options = get_write_behind_settings()
+        buffer = MessageWriteBuffer(
+            max_size=options.get("MAX_SIZE", DEFAULT_MAX_SIZE),
+            max_delay=options.get("MAX_DELAY", DEFAULT_MAX_DELAY),
+        )
+        _buffers[loop] = buffer
+    return buffer
+
+
+async def close_message_buffer():
+    """
+    Flush and discard the write-behind buffer bound to the running event loop.
+    """
+    buffer = _buffers.pop(asyncio.get_running_loop(), None)
+    if buffer is not None:
+        await buffer.close()
+
+
+async def lifespan(scope, receive, send):
+    """
+    ASGI lifespan application that saves queued messages on server shutdown.
+    """
+    while True:
+        event = await receive()
+        if event["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif event["type"] == "lifespan.shutdown":
+            try:
+                await close_message_buffer()
+            except Exception as e:
+                logger.exception("Flushing chat messages on shutdown failed")
+                await send({"type": "lifespan.shutdown.failed", "message": str(e)})
+            else:
+                await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+@database_sync_to_async
+def save_messages(messages):
+    """
+    Insert messages with one bulk_create, numbering those that do not have a
+    sequence number yet, and record the latest message of each room.
+    """
+    from chat.models import ChatRoom, Message
+
+    unnumbered = defaultdict(list)
+    for message in messages:
+        if message.seq is None:
+            unnumbered[message.room_id].append(message)
+
+    try:
+        with transaction.atomic():
+            for room_id, room_messages in unnumbered.items():
+                first_seq = ChatRoom.objects.allocate_seq(room_id, len(room_messages))
+                for offset, message in enumerate(room_messages):
+                    message.seq = first_seq + offset
+            Message.objects.bulk_create(messages)
+
+            latest = {}
+            for message in messages:
+                if message.seq > getattr(latest.get(message.room_id), "seq", 0):
+                    latest[message.room_id] = message
+            for message in latest.values():
+                ChatRoom.objects.record_last_message(message)
+    except Exception:
+        # The allocation was rolled back along with the insert
+        for room_messages in unnumbered.values():
+            for message in room_messages:
+                message.seq = None
+        raise
+
+
+class MessageWriteBuffer:
+    """
+    Queue unsaved messages and persist them with a single bulk_create once
+    `max_size` messages are pending or `max_delay` seconds have passed.
+    """
+
+    def __init__(
+        self, max_size: int = DEFAULT_MAX_SIZE, max_delay: float = DEFAULT_MAX_DELAY
+    ):
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, message) -> asyncio.Future:
+        """
+        Queue a message. The returned future resolves to the saved message, or
+        raises the error that prevented it from being saved.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, future))
+
+        if len(self._pending) >= self.max_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+        return future
+
+    def _start_flush(self):
+        task = asyncio.ensure_future(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """
+        Persist every pending message.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        try:
+            await save_messages([message for message, _ in batch])
+        except Exception:
+            logger.exception("Bulk insert of %d chat messages failed", len(batch))
+            # Save row by row so only the offending messages are reported
+            for message, future in batch:
+                try:
+                    await message.asave()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(message)
+            return
+
+        for message, future in batch:
+            if not future.done():
+                future.set_result(message)
+
+    async def close(self):
+        """
+        Flush pending messages and wait for in-flight flushes to finish.
+        """
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,21 @@
+import pytest
+
+from django.core.cache import cache
+
+from chat.middleware import token_claims
+
+
+def clear_caches():
+    cache.clear()
+    token_claims.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_chat_caches():
+    """
+    Test databases reuse primary keys, so cached memberships and users must
+    not leak between tests.
+    """
+    clear_caches()
+    yield
+    clear_caches()
@@ -1,83 +1,68 @@
-import json
+import asyncio
+from urllib.parse import parse_qs
 
-from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
+from chat.buffers import get_message_buffer, write_behind_enabled
+from chat.membership import ais_member, remember_membership
+from chat.utils import decode_json, encode_json
 
-class ChatConsumer(AsyncJsonWebsocketConsumer):
-    async def connect(self):
-        """
-        Handle WebSocket connection. Only authenticated users who are part of a valid one-to-one chat can connect.
-        """
-        user = self.scope["user"]
-        recipient = None
 
-        if user and user.is_authenticated:
-            # Extract recipient_id from query parameters
-            recipient_id = (
-                self.scope.get("query_string").decode().split("recipient_id=")[-1]
-                if "recipient_id=" in self.scope.get("query_string").decode()
-                else None
-            )
+def get_room_group_name(room_id: int) -> str:
+    return f"chat_{room_id}"
 
-            # Extract room id from query parameters
-            room_id = (
-                self.scope.get("query_string").decode().split("room_id=")[-1]
-                if "room_id=" in self.scope.get("query_string").decode()
-                else None
-            )
 
-            # Lazy import of User model
-            from django.contrib.auth import get_user_model
-
-            # If theres no room id passed then we verify the recipient_id if they exist
-            if room_id is None:
-                User = get_user_model()
-                try:
-                    recipient = await User.objects.aget(id=recipient_id)
-                except User.DoesNotExist:
-                    await self.close()
-                    return
-            # Ensure the room exists, create if it doesn't
-            self.chat_room = await self.get_or_create_chat_room(
-                user, recipient, room_id
-            )
+def serialize_message(message) -> dict:
+    return {
+        "room_id": message.room_id,
+        "seq": message.seq,
+        "message_type": message.message_type,
+        "message_content": message.content,
+        "sender_id": message.user_id,
+        "parent_id": message.parent_id,
+    }
+
+
+@database_sync_to_async
+def get_direct_chat_room(user, recipient_id):
+    from chat.models import ChatRoom
+
+    chat_room = ChatRoom.objects.get_for_member(user, recipient_id=recipient_id)
+    if chat_room is not None:
+        remember_membership(chat_room.id, user.id)
+    return chat_room
 
-            # Use the room's id as the channel layer group name
-            self.room_group_name = f"chat_{self.chat_room.id}"
-
-            # Verify user is a participant in the room
-            is_member = await sync_to_async(
-                self.chat_room.users.filter(id=user.id).exists
-            )()
-            if is_member:
-                # Add user to the channel layer group
-                await self.channel_layer.group_add(
-                    self.room_group_name, self.channel_name
-                )
-                await self.accept()
-            else:
-                await self.close()
-        else:
-            await self.close()
+
+class BaseChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Shared message handling for the chat consumers.
+    """
+
+    # Maximum number of missed messages replayed on (re)subscription
+    replay_limit = 500
+    # How long, in seconds, a replay waits for a missing seq to be committed
+    # before skipping past it (deleted messages leave permanent gaps)
+    replay_gap_timeout = 0.5
+    replay_gap_interval = 0.05
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending_messages = set()
 
     async def disconnect(self, close_code):
         """
         Handle WebSocket disconnection.
         """
-        if hasattr(self, "room_group_name") and hasattr(self, "channel_name"):
-            await self.channel_layer.group_discard(
-                self.room_group_name, self.channel_name
-            )
+        # Persist anything still queued before the connection goes away
+        if write_behind_enabled():
+            await get_message_buffer().flush()
 
-    async def receive_json(self, content):
+    async def send_chat_message(self, room_id: int, content: dict):
         """
-        Handle incoming WebSocket messages.
+        Save a message sent by the connected user and broadcast it to the room.
         """
         user = self.scope["user"]
-        if not user.is_authenticated:
-            await self.close()
-            return
 
         message_content = content.get("content", "")
         message_type = content.get("type", "TEXT")
@@ -94,61 +79,300 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             except Message.DoesNotExist:
                 return  # Invalid parent_id, don't send the message
 
-        # Save the message to the database
-        await Message.objects.acreate(
-            room=self.chat_room,
+        message = Message(
+            room_id=room_id,
             user=user,
             content=message_content,
             message_type=message_type,
             parent=parent_message,
         )
+        if write_behind_enabled():
+            # Queue the message; the buffer numbers it in the same transaction
+            # as the insert. The broadcast waits for that flush (at most
+            # MAX_DELAY) so it can carry the seq.
+            self.track_pending_message(
+                get_message_buffer().add(message), room_id, content.get("client_id")
+            )
+        else:
+            # Save the message to the database
+            await message.asave()
+            await self.broadcast_message(message)
+
+    async def broadcast_message(self, message):
+        """
+        Broadcast a saved message to its room.
+        """
+        # Encode the outbound frame once; every member receives the same text
+        text_data = await self.encode_json(serialize_message(message))
         # Broadcast the message to the room group
         await self.channel_layer.group_send(
-            self.room_group_name,
+            get_room_group_name(message.room_id),
             {
                 "type": "chat_message",
-                "message_type": message_type,
-                "message_content": message_content,
-                "sender_id": user.id,
-                "parent_id": parent_message.id if parent_message else None,
+                "text": text_data,
             },
         )
 
-    async def chat_message(self, event):
+    async def replay_messages(self, room_id: int, since_seq: int):
         """
-        Send message to WebSocket client.
+        Send the messages a reconnecting client missed, oldest first, and a
+        `replay_truncated` frame if more than `replay_limit` were missed.
         """
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "message_type": event["message_type"],
-                    "message_content": event["message_content"],
-                    "sender_id": event["sender_id"],
-                    "parent_id": event["parent_id"],
-                }
+        from chat.models import Message
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.replay_gap_timeout
+        next_seq = since_seq + 1
+        remaining = self.replay_limit
+        while remaining:
+            messages = (
+                Message.objects.filter(room_id=room_id, seq__gte=next_seq)
+                .only("room", "seq", "message_type", "content", "user", "parent")
+                .order_by("seq")[:remaining]
             )
-        )
+            async for message in messages:
+                if message.seq != next_seq and loop.time() < deadline:
+                    # An earlier message may still be committing; wait for
+                    # it rather than skipping past it
+                    break
+                await self.send(
+                    text_data=await self.encode_json(serialize_message(message))
+                )
+                next_seq = message.seq + 1
+                remaining -= 1
+            else:
+                break
+            await asyncio.sleep(self.replay_gap_interval)
 
-    async def get_or_create_chat_room(self, user, recipient=None, room_id: str = None):
+        # Tell the client it is not caught up, so it can page the rest from
+        # the REST API
+        if (
+            not remaining
+            and await Message.objects.filter(
+                room_id=room_id, seq__gte=next_seq
+            ).aexists()
+        ):
+            await self.send_json(
+                {"action": "replay_truncated", "room_id": room_id, "next_seq": next_seq}
+            )
+
+    def track_pending_message(self, future, room_id: int, client_id=None):
         """
-        Get or create a one-to-one chat room between two users.
+        Broadcast a queued message once it is saved, or report it back to the
+        sender if it fails to save.
         """
-        from chat.models import ChatRoom
 
-        if room_id:
+        async def broadcast_when_saved():
             try:
-                chat_room = await ChatRoom.objects.aget(id=room_id)
-                return chat_room
-            except ChatRoom.DoesNotExist:
-                return None
+                message = await future
+            except Exception:
+                await self.send_json(
+                    {
+                        "error": "Message could not be saved.",
+                        "room_id": room_id,
+                        "client_id": client_id,
+                    }
+                )
+            else:
+                await self.broadcast_message(message)
+
+        task = asyncio.ensure_future(broadcast_when_saved())
+        self.pending_messages.add(task)
+        task.add_done_callback(self.pending_messages.discard)
+
+    async def chat_message(self, event):
+        """
+        Send the pre-encoded message frame to WebSocket client.
+        """
+        await self.send(text_data=event["text"])
+
+    @classmethod
+    async def decode_json(cls, text_data):
+        return decode_json(text_data)
+
+    @classmethod
+    async def encode_json(cls, content):
+        return encode_json(content)
+
+
+class ChatConsumer(BaseChatConsumer):
+    async def connect(self):
+        """
+        Handle WebSocket connection. Only authenticated users who are part of a valid one-to-one chat can connect.
+        """
+        user = self.scope["user"]
+
+        if not (user and user.is_authenticated):
+            await self.close()
+            return
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            room_id = int(query["room_id"][0]) if "room_id" in query else None
+            recipient_id = (
+                int(query["recipient_id"][0]) if "recipient_id" in query else None
+            )
+            since_seq = int(query["since_seq"][0]) if "since_seq" in query else None
+        except ValueError:
+            await self.close()
+            return
+
+        if room_id is None and recipient_id is None:
+            await self.close()
+            return
+
+        if room_id is not None:
+            # Warm membership checks are served from cache without any query
+            if not await ais_member(room_id, user.id):
+                await self.close()
+                return
+            self.room_id = room_id
         else:
-            # Try to find existing room
-            chat_room = await ChatRoom.objects.filter(
-                users__in=[user, recipient]
-            ).afirst()
-            if not chat_room:
-                # Create new room if doesn't exist
-                chat_room = await ChatRoom.objects.acreate()
-                await sync_to_async(chat_room.users.add)(user, recipient)
-
-            return chat_room
+            # Resolve the room and verify membership in one query and one thread hop
+            chat_room = await get_direct_chat_room(user, recipient_id)
+            if chat_room is None:
+                await self.close()
+                return
+            self.room_id = chat_room.id
+
+        # Use the room's id as the channel layer group name
+        self.room_group_name = get_room_group_name(self.room_id)
+
+        # Add user to the channel layer group
+        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        await self.accept()
+
+        # Replay what the client missed; live delivery resumes right after
+        if since_seq is not None:
+            await self.replay_messages(self.room_id, since_seq)
+
+    async def disconnect(self, close_code):
+        """
+        Handle WebSocket disconnection.
+        """
+        if hasattr(self, "room_group_name") and hasattr(self, "channel_name"):
+            await self.channel_layer.group_discard(
+                self.room_group_name, self.channel_name
+            )
+
+        await super().disconnect(close_code)
+
+    async def receive_json(self, content):
+        """
+        Handle incoming WebSocket messages.
+        """
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            await self.close()
+            return
+
+        await self.send_chat_message(self.room_id, content)
+
+
+class MultiplexChatConsumer(BaseChatConsumer):
+    """
+    Serve many chat rooms over a single connection.
+
+    Clients manage their rooms with `{"action": "subscribe", "room_id": ...}`
+    (optionally with `"since_seq"` to replay missed messages) and
+    `{"action": "unsubscribe", "room_id": ...}` frames, and send messages
+    with `{"action": "send", "room_id": ..., "content": ...}`. Every outbound
+    frame carries the `room_id` it belongs to.
+    """
+
+    max_subscriptions = 100
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.room_ids = set()
+
+    async def connect(self):
+        """
+        Handle WebSocket connection. Only authenticated users can connect.
+        """
+        user = self.scope["user"]
+        if user and user.is_authenticated:
+            await self.accept()
+        else:
+            await self.close()
+
+    async def disconnect(self, close_code):
+        """
+        Handle WebSocket disconnection.
+        """
+        for room_id in self.room_ids:
+            await self.channel_layer.group_discard(
+                get_room_group_name(room_id), self.channel_name
+            )
+        self.room_ids.clear()
+
+        await super().disconnect(close_code)
+
+    async def receive_json(self, content):
+        """
+        Dispatch incoming frames on their `action`.
+        """
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            await self.close()
+            return
+
+        action = content.get("action")
+        try:
+            room_id = int(content.get("room_id"))
+        except (TypeError, ValueError):
+            await self.send_json({"error": "A valid room_id is required."})
+            return
+
+        if action == "subscribe":
+            since_seq = content.get("since_seq")
+            if since_seq is not None and not isinstance(since_seq, int):
+                await self.send_json(
+                    {"error": "since_seq must be an integer.", "room_id": room_id}
+                )
+                return
+            await self.subscribe(room_id, since_seq)
+        elif action == "unsubscribe":
+            await self.unsubscribe(room_id)
+        elif action == "send":
+            if room_id in self.room_ids:
+                await self.send_chat_message(room_id, content)
+            else:
+                await self.send_json(
+                    {"error": "Not subscribed to this room.", "room_id": room_id}
+                )
+        else:
+            await self.send_json({"error": "Unknown action.", "room_id": room_id})
+
+    async def subscribe(self, room_id: int, since_seq: int = None):
+        if room_id not in self.room_ids:
+            if len(self.room_ids) >= self.max_subscriptions:
+                await self.send_json(
+                    {"error": "Too many subscriptions.", "room_id": room_id}
+                )
+                return
+
+            if not await ais_member(room_id, self.scope["user"].id):
+                await self.send_json(
+                    {"error": "You are not a member of this room.", "room_id": room_id}
+                )
+                return
+
+            await self.channel_layer.group_add(
+                get_room_group_name(room_id), self.channel_name
+            )
+            self.room_ids.add(room_id)
+
+        await self.send_json({"action": "subscribed", "room_id": room_id})
+
+        if since_seq is not None:
+            await self.replay_messages(room_id, since_seq)
+
+    async def unsubscribe(self, room_id: int):
+        if room_id in self.room_ids:
+            await self.channel_layer.group_discard(
+                get_room_group_name(room_id), self.channel_name
+            )
+            self.room_ids.discard(room_id)
+
+        await self.send_json({"action": "unsubscribed", "room_id": room_id})
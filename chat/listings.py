@@ -0,0 +1,62 @@
+"""
+Per-user versions of the room list, the validator of `ChatRoomViewSet.list`.
+
+A version is an opaque token in the Django cache, so checking one is a
+single key lookup. Anything that changes a user's listing (a new message, an
+edited room, a member joining, leaving or editing their profile) deletes the
+versions of everyone in the affected rooms, and the next read stores a new
+one.
+"""
+
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+ROOM_LIST_VERSION_TIMEOUT = 60 * 60 * 24
+
+
+def room_list_version_key(user_id: int) -> str:
+    return f"chat:room_list_version:{user_id}"
+
+
+def get_room_list_version(user_id: int) -> str:
+    """
+    Return the current version of the user's room list.
+    """
+    key = room_list_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # Concurrent readers agree on whichever version is stored first
+        cache.add(key, version, ROOM_LIST_VERSION_TIMEOUT)
+        version = cache.get(key) or version
+    return version
+
+
+def expire_room_lists(user_ids):
+    """
+    Forget the room list versions of the given users.
+    """
+    keys = [room_list_version_key(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
+        # Again once committed, so a reader that still saw the old rows
+        # cannot leave a version behind for them
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def expire_room_lists_of_rooms(room_ids):
+    """
+    Forget the room list versions of every member of the given rooms.
+    """
+    from chat.models import ChatRoom
+
+    expire_room_lists(
+        set(
+            ChatRoom.users.through.objects.filter(chatroom_id__in=room_ids).values_list(
+                "user_id", flat=True
+            )
+        )
+    )
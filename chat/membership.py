@@ -0,0 +1,65 @@
+"""
+Cached chat room membership checks.
+
+Lookups go through the Django cache, then the database. Entries are
+invalidated from `chat.signals` whenever `ChatRoom.users` changes. Async
+checks read the cache on the event loop when it can answer without leaving
+the process (see `core.cache.get_local`): with `TwoTierRedisCache` that is
+its L1, which is invalidated in every process, so a removed member is
+turned away everywhere as soon as the change is published.
+"""
+
+from channels.db import database_sync_to_async
+
+from django.core.cache import cache
+
+from core.cache import MISSING, get_local
+
+
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def membership_cache_key(room_id: int, user_id: int) -> str:
+    return f"chat:membership:{room_id}:{user_id}"
+
+
+def is_member(room_id: int, user_id: int) -> bool:
+    """
+    Return whether the user belongs to the chat room.
+    """
+    key = membership_cache_key(room_id, user_id)
+    member = cache.get(key)
+    if member is None:
+        from chat.models import ChatRoom
+
+        member = ChatRoom.users.through.objects.filter(
+            chatroom_id=room_id, user_id=user_id
+        ).exists()
+        cache.set(key, member, MEMBERSHIP_CACHE_TIMEOUT)
+    return member
+
+
+async def ais_member(room_id: int, user_id: int) -> bool:
+    """
+    Async version of `is_member`. A warm check does not leave the event loop.
+    """
+    member = get_local(cache, membership_cache_key(room_id, user_id))
+    if member is not MISSING and member is not None:
+        return member
+    return await database_sync_to_async(is_member)(room_id, user_id)
+
+
+def remember_membership(room_id: int, user_id: int):
+    """
+    Record a membership already verified by another query.
+    """
+    cache.set(membership_cache_key(room_id, user_id), True, MEMBERSHIP_CACHE_TIMEOUT)
+
+
+def invalidate_memberships(pairs):
+    """
+    Forget cached memberships for the given (room_id, user_id) pairs.
+    """
+    keys = [membership_cache_key(room_id, user_id) for room_id, user_id in pairs]
+    if keys:
+        cache.delete_many(keys)
@@ -1,32 +1,135 @@
+import hmac
 import logging
+import time
 
+import jwt
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core.cache import MISSING, LRUCache, get_local
 
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on how long a verified token is trusted without re-checking it
+TOKEN_CACHE_TTL = 60 * 5
+# Users live in the Django cache and are dropped from it on save, deletion and
+# token revocation. `get_local` serves them on the event loop from the
+# two-tier cache's L1, which that drop invalidates in every process.
+USER_CACHE_TIMEOUT = 60 * 60
 
-@database_sync_to_async
-def get_user_from_token(token):
+# Enough of the user for the consumers and permission checks
+USER_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "token_version",
+)
+
+# jti -> (raw token, verified claims)
+token_claims = LRUCache(maxsize=10_000)
+
+
+def user_cache_key(user_id) -> str:
+    return f"chat:user:{user_id}"
+
+
+def get_token_claims(token):
+    """
+    Return the verified claims of an access token, or None if it is invalid.
+    Tokens seen before are matched by `jti` and not verified again.
+    """
     from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
     from rest_framework_simplejwt.tokens import AccessToken
 
-    from django.contrib.auth.models import AnonymousUser
+    try:
+        unverified = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError as e:
+        logger.debug("Malformed websocket token: %s", e)
+        return None
 
-    User = get_user_model()
+    jti = unverified.get(api_settings.JTI_CLAIM)
+    if jti is not None:
+        cached = token_claims.get(jti)
+        # The jti is unverified, so only the exact same token may be trusted
+        if cached is not None and hmac.compare_digest(cached[0], token):
+            return cached[1]
 
     try:
-        access_token = AccessToken(token)
-        return User.objects.get(id=access_token["user_id"])
+        claims = AccessToken(token).payload
     except TokenError as e:
-        logger.error(f"Invalid token: {e}")
+        logger.debug("Invalid websocket token: %s", e)
+        return None
+
+    ttl = min(claims["exp"] - time.time(), TOKEN_CACHE_TTL)
+    if jti is not None and ttl > 0:
+        token_claims.set(jti, (token, claims), ttl)
+    return claims
+
+
+@database_sync_to_async
+def get_user(user_id):
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = (
+            get_user_model()
+            .objects.filter(id=user_id, is_active=True)
+            .only(*USER_FIELDS)
+            .first()
+        )
+        if user is not None:
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+    return user
+
+
+async def get_user_from_token(token):
+    from django.contrib.auth.models import AnonymousUser
+
+    from users.authentication import token_version_cache_key
+
+    claims = get_token_claims(token)
+    if claims is None:
         return AnonymousUser()
-    except User.DoesNotExist as e:
-        logger.error(f"User not found: {e}")
+
+    user_id = claims["user_id"]
+    user = get_local(cache, user_cache_key(user_id))
+    if user is MISSING or user is None:
+        user = await get_user(user_id)
+        if user is None:
+            logger.debug("No active user %s for websocket token", user_id)
+            return AnonymousUser()
+
+    # Same revocation check as the REST API's `ClaimsUserMixin`, against the
+    # version `User.revoke_tokens` publishes to the shared cache; a revocation
+    # also drops the cached user, which carries its version otherwise
+    version = claims.get("token_version")
+    if version is not None:
+        current = get_local(cache, token_version_cache_key(user_id))
+        if current is MISSING or current is None:
+            current = user.token_version
+        if version != current:
+            logger.debug("Revoked token for user %s", user_id)
+            return AnonymousUser()
+    if not user.is_active:
         return AnonymousUser()
+    return user
+
+
+def forget_user(user_id):
+    """
+    Drop a cached user, in every process, so the next handshake reloads it.
+    """
+    cache.delete(user_cache_key(user_id))
 
 
 class JWTAuthMiddleware(BaseMiddleware):
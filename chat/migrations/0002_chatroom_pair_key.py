@@ -0,0 +1,52 @@
+# Generated by Django 5.1.3 on 2026-10-17 23:26
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_pair_keys(apps, schema_editor):
+    """
+    Give existing unnamed two-member rooms their pair key. When duplicate rooms
+    already exist for a pair, the oldest one becomes the canonical room.
+    """
+    ChatRoom = apps.get_model("chat", "ChatRoom")
+
+    rooms = (
+        ChatRoom.objects.filter(pair_key__isnull=True)
+        .filter(models.Q(name__isnull=True) | models.Q(name=""))
+        .annotate(user_count=Count("users"))
+        .filter(user_count=2)
+        .order_by("created", "id")
+    )
+    seen = set()
+    for room in rooms.iterator():
+        low, high = sorted(room.users.values_list("id", flat=True))
+        pair_key = f"{low}:{high}"
+        if pair_key in seen:
+            continue
+        seen.add(pair_key)
+        ChatRoom.objects.filter(id=room.id).update(pair_key=pair_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatroom",
+            name="pair_key",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Normalized user pair of a one-to-one chat room",
+                max_length=64,
+                null=True,
+                unique=True,
+                verbose_name="Pair Key",
+            ),
+        ),
+        migrations.RunPython(backfill_pair_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.3 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+def backfill_sequences(apps, schema_editor):
+    """
+    Number existing messages per room in (created, id) order.
+    """
+    ChatRoom = apps.get_model("chat", "ChatRoom")
+    Message = apps.get_model("chat", "Message")
+
+    for room in ChatRoom.objects.only("id").iterator():
+        messages = list(
+            Message.objects.filter(room_id=room.id).order_by("created", "id").only("id")
+        )
+        for seq, message in enumerate(messages, start=1):
+            message.seq = seq
+        Message.objects.bulk_update(messages, ["seq"], batch_size=1000)
+        ChatRoom.objects.filter(id=room.id).update(last_seq=len(messages))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0002_chatroom_pair_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_seq",
+            field=models.PositiveBigIntegerField(
+                default=0,
+                editable=False,
+                help_text="Sequence number of the latest message in the room",
+                verbose_name="Last Sequence",
+            ),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="seq",
+            field=models.PositiveBigIntegerField(
+                editable=False,
+                help_text="Monotonically increasing position of the message in its room",
+                null=True,
+                verbose_name="Sequence",
+            ),
+        ),
+        migrations.RunPython(backfill_sequences, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="message",
+            name="seq",
+            field=models.PositiveBigIntegerField(
+                editable=False,
+                help_text="Monotonically increasing position of the message in its room",
+                verbose_name="Sequence",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="message",
+            constraint=models.UniqueConstraint(
+                fields=("room", "seq"), name="chat_message_room_seq_unique"
+            ),
+        ),
+    ]
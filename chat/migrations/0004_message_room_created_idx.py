@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0003_message_seq"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["room", "created", "id"], name="chat_message_room_created_idx"
+            ),
+        ),
+    ]
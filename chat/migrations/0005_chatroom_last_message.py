@@ -0,0 +1,95 @@
+# Generated by Django 5.1.3 on 2026-10-18 00:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+PREVIEW_LENGTH = 255
+
+MESSAGE_TYPE_LABELS = {"TEXT": "Text", "FILE": "File", "IMAGE": "Image"}
+
+
+def backfill_last_messages(apps, schema_editor):
+    """
+    Record the latest message of every room. Rooms without messages take
+    their creation time as their last activity.
+    """
+    ChatRoom = apps.get_model("chat", "ChatRoom")
+    Message = apps.get_model("chat", "Message")
+
+    rooms = []
+    for room in ChatRoom.objects.only("id", "created").iterator():
+        message = (
+            Message.objects.filter(room_id=room.id)
+            .order_by("-created", "-id")
+            .only("id", "created", "content", "message_type")
+            .first()
+        )
+        if message is None:
+            room.last_message_at = room.created
+        else:
+            room.last_message_id = message.id
+            room.last_message_at = message.created
+            room.last_message_preview = message.content[:PREVIEW_LENGTH] or (
+                MESSAGE_TYPE_LABELS.get(message.message_type, message.message_type)
+            )
+        rooms.append(room)
+
+    ChatRoom.objects.bulk_update(
+        rooms,
+        ["last_message", "last_message_at", "last_message_preview"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0004_message_room_created_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_message",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="Latest message in the room",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="chat.message",
+                verbose_name="Last Message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_message_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                help_text="Time of the latest message, or of the room's creation",
+                verbose_name="Last Message At",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_message_preview",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Beginning of the latest message",
+                max_length=255,
+                verbose_name="Last Message Preview",
+            ),
+        ),
+        migrations.RunPython(backfill_last_messages, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="chatroom",
+            index=models.Index(
+                fields=["-last_message_at", "-id"], name="chat_room_activity_idx"
+            ),
+        ),
+    ]
@@ -1,28 +1,135 @@
 from django_extensions.db.models import TimeStampedModel
 
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from chat.listings import expire_room_lists_of_rooms
 from core.models import OPTIONAL
 from core.utils import get_upload_path
 
 
+def get_user_queryset():
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.with_email_verified()
+
+
 class ChatRoomQuerySet(models.QuerySet):
     def latest_message(self):
+        return self.select_related("last_message").prefetch_related(
+            models.Prefetch("last_message__user", queryset=get_user_queryset())
+        )
+
+    def with_users(self):
         return self.prefetch_related(
-            models.Prefetch(
-                "messages",
-                queryset=Message.objects.order_by("-created")[:1],
-                to_attr="latest_message",
-            )
+            models.Prefetch("users", queryset=get_user_queryset())
         )
 
+    def by_activity(self):
+        return self.order_by("-last_message_at", "-id")
+
 
 class ChatRoomManager(models.Manager):
     def get_queryset(self):
         return ChatRoomQuerySet(self.model, using=self._db)
 
+    def get_for_member(self, user, room_id=None, recipient_id=None):
+        """
+        Return the room `user` may join, or None if they are not a member.
+        Joining an existing room costs a single query: the room fetch is
+        joined to the membership table. The one-to-one room with
+        `recipient_id` is created on first use.
+        """
+        if room_id is not None:
+            return self.filter(id=room_id, users=user).first()
+
+        pair_key = self.model.build_pair_key(user.id, recipient_id)
+        chat_room = self.filter(pair_key=pair_key, users=user).first()
+        if chat_room is None:
+            from django.contrib.auth import get_user_model
+
+            recipient = get_user_model().objects.filter(id=recipient_id).first()
+            if recipient is None:
+                return None
+            chat_room, _ = self.get_or_create_direct(user, recipient)
+        return chat_room
+
+    def allocate_seq(self, room_id: int, count: int = 1) -> int:
+        """
+        Reserve `count` consecutive sequence numbers in the room and return the
+        first one. The room row stays locked until the surrounding transaction
+        ends, which keeps sequence numbers in commit order.
+        """
+        with transaction.atomic(using=self.db):
+            updated = self.filter(pk=room_id).update(last_seq=F("last_seq") + count)
+            if not updated:
+                raise self.model.DoesNotExist("Chat room does not exist.")
+            last_seq = self.filter(pk=room_id).values_list("last_seq", flat=True).get()
+        return last_seq - count + 1
+
+    def record_last_message(self, message):
+        """
+        Point the room at a newly created message unless a later one is
+        already recorded.
+        """
+        updated = self.filter(
+            pk=message.room_id, last_message_at__lte=message.created
+        ).update(
+            last_message=message,
+            last_message_at=message.created,
+            last_message_preview=message.get_preview(),
+        )
+        if updated:
+            expire_room_lists_of_rooms([message.room_id])
+
+    def refresh_last_message(self, room_id: int):
+        """
+        Recompute the room's last message from its history.
+        """
+        message = (
+            Message.objects.filter(room_id=room_id).order_by("-created", "-id").first()
+        )
+        if message is None:
+            self.filter(pk=room_id).update(last_message=None, last_message_preview="")
+        else:
+            self.filter(pk=room_id).update(
+                last_message=message,
+                last_message_at=message.created,
+                last_message_preview=message.get_preview(),
+            )
+        expire_room_lists_of_rooms([room_id])
+
+    def touch(self, room_ids):
+        """
+        Mark the rooms as changed, so validators of the listings showing them
+        go stale. New messages move `last_message_at` instead.
+        """
+        self.filter(pk__in=room_ids).update(modified=timezone.now())
+        expire_room_lists_of_rooms(room_ids)
+
+    def get_or_create_direct(self, user, recipient):
+        """
+        Get or create the one-to-one chat room between two users.
+        Concurrent callers always end up with the same room.
+        """
+        pair_key = self.model.build_pair_key(user.id, recipient.id)
+        try:
+            return self.get(pair_key=pair_key), False
+        except self.model.DoesNotExist:
+            pass
+
+        try:
+            with transaction.atomic():
+                chat_room = self.create(pair_key=pair_key)
+                chat_room.users.add(user, recipient)
+            return chat_room, True
+        except IntegrityError:
+            # Another connection created the room first
+            return self.get(pair_key=pair_key), False
+
 
 class ChatRoom(TimeStampedModel):
     name = models.CharField(
@@ -31,16 +138,73 @@ class ChatRoom(TimeStampedModel):
     users = models.ManyToManyField(
         settings.AUTH_USER_MODEL, related_name="chat_rooms", verbose_name=_("Users")
     )
+    pair_key = models.CharField(
+        _("Pair Key"),
+        max_length=64,
+        unique=True,
+        editable=False,
+        help_text=_("Normalized user pair of a one-to-one chat room"),
+        **OPTIONAL,
+    )
+    last_seq = models.PositiveBigIntegerField(
+        _("Last Sequence"),
+        default=0,
+        editable=False,
+        help_text=_("Sequence number of the latest message in the room"),
+    )
+    last_message = models.ForeignKey(
+        "chat.Message",
+        verbose_name=_("Last Message"),
+        related_name="+",
+        on_delete=models.SET_NULL,
+        editable=False,
+        help_text=_("Latest message in the room"),
+        **OPTIONAL,
+    )
+    last_message_at = models.DateTimeField(
+        _("Last Message At"),
+        default=timezone.now,
+        editable=False,
+        help_text=_("Time of the latest message, or of the room's creation"),
+    )
+    last_message_preview = models.CharField(
+        _("Last Message Preview"),
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text=_("Beginning of the latest message"),
+    )
 
     objects = ChatRoomManager()
 
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            # Serves the room list keyset ordered by ("-last_message_at", "-id")
+            models.Index(
+                fields=["-last_message_at", "-id"], name="chat_room_activity_idx"
+            ),
+        ]
+
+    @staticmethod
+    def build_pair_key(user_id: int, other_user_id: int) -> str:
+        return f"{min(user_id, other_user_id)}:{max(user_id, other_user_id)}"
+
     def __str__(self):
         if self.name:
             return f"{self.name} ({self.id})"
         return f"Chat Room {self.id}"
 
 
+class MessageQuerySet(models.QuerySet):
+    def with_user(self):
+        return self.prefetch_related(
+            models.Prefetch("user", queryset=get_user_queryset())
+        )
+
+
 class Message(TimeStampedModel):
+    PREVIEW_LENGTH = 255
+
     class MessageType(models.TextChoices):
         TEXT = "TEXT", _("Text")
         FILE = "FILE", _("File")
@@ -87,6 +251,41 @@ class Message(TimeStampedModel):
         on_delete=models.CASCADE,
         help_text=_("Parent message if a user is replying to a specific message"),
     )
+    seq = models.PositiveBigIntegerField(
+        _("Sequence"),
+        editable=False,
+        help_text=_("Monotonically increasing position of the message in its room"),
+    )
+
+    objects = MessageQuerySet.as_manager()
+
+    class Meta(TimeStampedModel.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["room", "seq"], name="chat_message_room_seq_unique"
+            ),
+        ]
+        indexes = [
+            # Serves the room history keyset ordered by ("-created", "-id")
+            models.Index(
+                fields=["room", "created", "id"], name="chat_message_room_created_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        # Allocate and insert in one transaction so replays never skip rows
+        with transaction.atomic(using=kwargs.get("using")):
+            if self.seq is None:
+                self.seq = ChatRoom.objects.allocate_seq(self.room_id)
+            super().save(*args, **kwargs)
+            if adding:
+                ChatRoom.objects.record_last_message(self)
+
+    def get_preview(self) -> str:
+        if self.content:
+            return self.content[: self.PREVIEW_LENGTH]
+        return str(self.MessageType(self.message_type).label)
 
     def __str__(self):
         return f"{self.user.email}: {self.content or self.file_url or self.image_url}"
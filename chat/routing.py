@@ -5,4 +5,5 @@ from chat import consumers
 
 websocket_urlpatterns = [
     path("ws/chat/", consumers.ChatConsumer.as_asgi()),
+    path("ws/chat/multiplex/", consumers.MultiplexChatConsumer.as_asgi()),
 ]
@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from chat.listings import expire_room_lists, expire_room_lists_of_rooms
+from chat.membership import invalidate_memberships
+from chat.middleware import forget_user
+from chat.models import ChatRoom, Message
+from users.signals import tokens_revoked
+
+
+def get_membership_pairs(instance, reverse, pk_set):
+    if reverse:
+        # `instance` is a user and `pk_set` holds chat room ids
+        return [(room_id, instance.pk) for room_id in pk_set]
+    return [(instance.pk, user_id) for user_id in pk_set]
+
+
+@receiver(m2m_changed, sender=ChatRoom.users.through)
+def invalidate_changed_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # The cleared rows are not passed to post_clear, so collect them now
+        if reverse:
+            pk_set = instance.chat_rooms.values_list("id", flat=True)
+        else:
+            pk_set = instance.users.values_list("id", flat=True)
+        instance._cleared_membership_pairs = get_membership_pairs(
+            instance, reverse, pk_set
+        )
+    elif action == "post_clear":
+        pairs = instance.__dict__.pop("_cleared_membership_pairs", [])
+        invalidate_memberships(pairs)
+        ChatRoom.objects.touch({room_id for room_id, _ in pairs})
+        # Members who left no longer see the rooms touched above
+        expire_room_lists({user_id for _, user_id in pairs})
+    elif action in ("post_add", "post_remove"):
+        pairs = get_membership_pairs(instance, reverse, pk_set)
+        invalidate_memberships(pairs)
+        # Members are listed with their rooms
+        ChatRoom.objects.touch({room_id for room_id, _ in pairs})
+        expire_room_lists({user_id for _, user_id in pairs})
+
+
+@receiver(pre_delete, sender=ChatRoom)
+def invalidate_deleted_room_memberships(sender, instance, **kwargs):
+    user_ids = list(instance.users.values_list("id", flat=True))
+    invalidate_memberships((instance.pk, user_id) for user_id in user_ids)
+    expire_room_lists(user_ids)
+
+
+@receiver(post_save, sender=ChatRoom)
+def expire_saved_room_lists(sender, instance, created, **kwargs):
+    # A new room has no members yet
+    if not created:
+        expire_room_lists_of_rooms([instance.pk])
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_deleted_user_memberships(sender, instance, **kwargs):
+    forget_user(instance.pk)
+    room_ids = list(instance.chat_rooms.values_list("id", flat=True))
+    invalidate_memberships((room_id, instance.pk) for room_id in room_ids)
+    # The other members stop seeing them in their rooms
+    expire_room_lists_of_rooms(room_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_saved_user(sender, instance, created, update_fields=None, **kwargs):
+    # Covers deactivation as well as profile changes
+    forget_user(instance.pk)
+    # Rooms and messages show their members' profiles; logins change none
+    if not created and update_fields != frozenset({"last_login"}):
+        ChatRoom.objects.touch(instance.chat_rooms.values("id"))
+
+
+@receiver(tokens_revoked)
+def invalidate_revoked_user(sender, user, **kwargs):
+    # The cached user still holds the old token version
+    forget_user(user.pk)
+
+
+@receiver(post_save, sender=Message)
+def touch_edited_message_room(sender, instance, created, **kwargs):
+    if not created:
+        ChatRoom.objects.touch([instance.room_id])
+
+
+@receiver(post_delete, sender=Message)
+def refresh_room_last_message(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, ChatRoom) or getattr(origin, "model", None) is ChatRoom:
+        # The room itself is being deleted
+        return
+
+    ChatRoom.objects.touch([instance.room_id])
+
+    # Deleting the last message nulls `ChatRoom.last_message`; fall back to
+    # the message before it
+    if ChatRoom.objects.filter(
+        pk=instance.room_id, last_message__isnull=True, last_seq__gt=0
+    ).exists():
+        ChatRoom.objects.refresh_last_message(instance.room_id)
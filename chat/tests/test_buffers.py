@@ -0,0 +1,115 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from asgiref.sync import sync_to_async
+
+from chat.buffers import MessageWriteBuffer, get_message_buffer, lifespan
+from chat.models import ChatRoom, Message
+from users.tests.factories import UserFactory
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+class TestMessageWriteBuffer:
+    async def create_room_and_user(self):
+        user = await sync_to_async(UserFactory.create)()
+        room = await sync_to_async(ChatRoom.objects.create)(name="Buffered Room")
+        return room, user
+
+    async def test_flush_when_batch_is_full(self):
+        """
+        Test that reaching max_size persists the batch with one bulk insert.
+        """
+        room, user = await self.create_room_and_user()
+        buffer = MessageWriteBuffer(max_size=3, max_delay=60)
+
+        with (
+            mock.patch.object(
+                Message.objects, "bulk_create", wraps=Message.objects.bulk_create
+            ) as mocked_bulk_create,
+            mock.patch.object(Message, "asave") as mocked_asave,
+        ):
+            futures = [
+                buffer.add(Message(room=room, user=user, content=f"Message {i}"))
+                for i in range(3)
+            ]
+            saved = await asyncio.gather(*futures)
+
+        assert mocked_bulk_create.call_count == 1
+        assert not mocked_asave.called
+        assert len(buffer) == 0
+        assert all(message.pk for message in saved)
+        assert [message.seq for message in saved] == [1, 2, 3]
+        assert await Message.objects.filter(room=room).acount() == 3
+
+        await room.arefresh_from_db()
+        assert room.last_message_id == saved[-1].pk
+        assert room.last_message_preview == "Message 2"
+
+    async def test_flush_after_delay(self):
+        """
+        Test that a partial batch is persisted once max_delay has passed.
+        """
+        room, user = await self.create_room_and_user()
+        buffer = MessageWriteBuffer(max_size=200, max_delay=0.01)
+
+        future = buffer.add(Message(room=room, user=user, content="Delayed"))
+        assert not future.done()
+
+        message = await asyncio.wait_for(future, timeout=5)
+        assert message.pk is not None
+
+    async def test_close_flushes_pending_messages(self):
+        """
+        Test that closing the buffer persists queued messages immediately.
+        """
+        room, user = await self.create_room_and_user()
+        buffer = MessageWriteBuffer(max_size=200, max_delay=60)
+
+        buffer.add(Message(room=room, user=user, content="Pending"))
+        await buffer.close()
+
+        assert await Message.objects.filter(content="Pending").aexists()
+
+    async def test_failed_rows_are_reported_individually(self):
+        """
+        Test that a failing row only fails its own future.
+        """
+        room, user = await self.create_room_and_user()
+        buffer = MessageWriteBuffer(max_size=2, max_delay=60)
+
+        good = buffer.add(Message(room=room, user=user, content="Good"))
+        bad = buffer.add(Message(room_id=room.id + 1000, user=user, content="Bad"))
+
+        results = await asyncio.gather(good, bad, return_exceptions=True)
+
+        assert results[0].pk is not None
+        assert isinstance(results[1], Exception)
+        assert not await Message.objects.filter(content="Bad").aexists()
+
+    async def test_lifespan_shutdown_flushes_buffer(self, settings):
+        """
+        Test that server shutdown saves the messages still queued.
+        """
+        settings.CHAT_WRITE_BEHIND = {"ENABLED": True, "MAX_DELAY": 60}
+        room, user = await self.create_room_and_user()
+        future = get_message_buffer().add(
+            Message(room=room, user=user, content="Shutdown")
+        )
+
+        assert not future.done()
+
+        events = asyncio.Queue()
+        sent = []
+
+        async def send(event):
+            sent.append(event["type"])
+
+        await events.put({"type": "lifespan.startup"})
+        await events.put({"type": "lifespan.shutdown"})
+        await asyncio.wait_for(lifespan({"type": "lifespan"}, events.get, send), 5)
+
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        assert (await future).pk is not None
+        assert await Message.objects.filter(content="Shutdown").aexists()
@@ -1,12 +1,36 @@
+from contextlib import contextmanager
+from unittest import mock
+
 import pytest
 from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
 from channels.testing import WebsocketCommunicator
 
-from chat.consumers import ChatConsumer
+from django.db.backends.utils import CursorWrapper
+
+from chat.buffers import get_message_buffer
+from chat.consumers import ChatConsumer, MultiplexChatConsumer
 from chat.models import ChatRoom, Message
+from chat.utils import encode_json
 from users.tests.factories import UserFactory
 
 
+@contextmanager
+def capture_all_queries():
+    """
+    Record queries from every thread; the async ORM runs them off the loop.
+    """
+    queries = []
+    execute = CursorWrapper._execute
+
+    def recording_execute(self, sql, *args, **kwargs):
+        queries.append(sql)
+        return execute(self, sql, *args, **kwargs)
+
+    with mock.patch.object(CursorWrapper, "_execute", recording_execute):
+        yield queries
+
+
 @pytest.mark.asyncio
 @pytest.mark.django_db(transaction=True)
 class TestChatConsumer:
@@ -41,6 +65,48 @@ class TestChatConsumer:
 
         await communicator.disconnect()
 
+    async def test_connection_handshake_query_count(self):
+        """
+        Test that joining an existing room costs at most one query, and none
+        once the membership is cached.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        recipient = await sync_to_async(UserFactory.create)()
+        chat_room, _ = await sync_to_async(ChatRoom.objects.get_or_create_direct)(
+            user, recipient
+        )
+
+        async def handshake(path):
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), path)
+            communicator.scope["user"] = user
+            with capture_all_queries() as queries:
+                connected, _ = await communicator.connect()
+            assert connected
+            await communicator.disconnect()
+            return len(queries)
+
+        # Cold room handshake: one membership query
+        assert await handshake(f"/ws/chat/?room_id={chat_room.id}") == 1
+        # Warm room handshake: served from the membership cache
+        assert await handshake(f"/ws/chat/?room_id={chat_room.id}") == 0
+        # Direct message handshake: one pair key lookup joined to membership
+        assert await handshake(f"/ws/chat/?recipient_id={recipient.id}") == 1
+
+    async def test_connection_rejected_for_non_member(self):
+        """
+        Test that a user cannot join a room they are not a member of.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        room = await sync_to_async(ChatRoom.objects.create)(name="Private Room")
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(), f"/ws/chat/?room_id={room.id}"
+        )
+        communicator.scope["user"] = user
+
+        connected, _ = await communicator.connect()
+        assert not connected
+
     async def test_message_sending(self):
         """Test message sending through WebSocket"""
         user = await sync_to_async(UserFactory.create)()
@@ -78,6 +144,158 @@ class TestChatConsumer:
 
         await communicator.disconnect()
 
+    async def test_broadcast_includes_sequence(self):
+        """
+        Test that every broadcast carries the message's sequence number.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        room = await ChatRoom.objects.acreate(name="Sequenced Room")
+        await room.users.aadd(user)
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(), f"/ws/chat/?room_id={room.id}"
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        for content in ("First", "Second"):
+            await communicator.send_json_to({"content": content, "type": "TEXT"})
+
+        assert (await communicator.receive_json_from())["seq"] == 1
+        assert (await communicator.receive_json_from())["seq"] == 2
+
+        await communicator.disconnect()
+
+    async def test_reconnect_replays_missed_messages(self):
+        """
+        Test that since_seq replays only the messages after it, in order,
+        before live delivery resumes.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        room = await ChatRoom.objects.acreate(name="Replay Room")
+        await room.users.aadd(user)
+        for i in range(1, 6):
+            await Message.objects.acreate(room=room, user=user, content=f"M{i}")
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(), f"/ws/chat/?room_id={room.id}&since_seq=3"
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        replayed = [
+            await communicator.receive_json_from(),
+            await communicator.receive_json_from(),
+        ]
+        assert [frame["seq"] for frame in replayed] == [4, 5]
+        assert [frame["message_content"] for frame in replayed] == ["M4", "M5"]
+        assert await communicator.receive_nothing()
+
+        await communicator.send_json_to({"content": "Live", "type": "TEXT"})
+        live = await communicator.receive_json_from()
+        assert live["seq"] == 6
+
+        await communicator.disconnect()
+
+    @pytest.mark.parametrize("missed, truncated", [(4, True), (2, False)])
+    async def test_replay_truncation(self, missed, truncated):
+        """
+        Test that a replay cut short by replay_limit ends with a frame telling
+        the client where to resume, and only then.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        room = await ChatRoom.objects.acreate(name="Long Gap Room")
+        await room.users.aadd(user)
+        for i in range(1, missed + 1):
+            await Message.objects.acreate(room=room, user=user, content=f"M{i}")
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(), f"/ws/chat/?room_id={room.id}&since_seq=0"
+        )
+        communicator.scope["user"] = user
+        with mock.patch.object(ChatConsumer, "replay_limit", 2):
+            connected, _ = await communicator.connect()
+            assert connected
+
+            replayed = [
+                await communicator.receive_json_from(),
+                await communicator.receive_json_from(),
+            ]
+            assert [frame["seq"] for frame in replayed] == [1, 2]
+            if truncated:
+                assert await communicator.receive_json_from() == {
+                    "action": "replay_truncated",
+                    "room_id": room.id,
+                    "next_seq": 3,
+                }
+            assert await communicator.receive_nothing()
+
+        await communicator.disconnect()
+
+    async def test_replay_waits_for_gap(self):
+        """
+        Test that a replay waits for a missing seq to be committed instead of
+        skipping past it.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        room = await ChatRoom.objects.acreate(name="Gap Room")
+        await room.users.aadd(user)
+        for seq in (1, 2, 4):
+            await Message.objects.acreate(
+                room=room, user=user, content=f"M{seq}", seq=seq
+            )
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(), f"/ws/chat/?room_id={room.id}&since_seq=1"
+        )
+        communicator.scope["user"] = user
+        with mock.patch.object(ChatConsumer, "replay_gap_timeout", 5):
+            connected, _ = await communicator.connect()
+            assert connected
+
+            assert (await communicator.receive_json_from())["seq"] == 2
+            assert await communicator.receive_nothing()
+            await Message.objects.acreate(room=room, user=user, content="M3", seq=3)
+
+            replayed = [
+                await communicator.receive_json_from(),
+                await communicator.receive_json_from(),
+            ]
+        assert [frame["seq"] for frame in replayed] == [3, 4]
+
+        await communicator.disconnect()
+
+    async def test_replay_skips_permanent_gap(self):
+        """
+        Test that a replay moves past a gap that is never filled, such as a
+        deleted message.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        room = await ChatRoom.objects.acreate(name="Deleted Room")
+        await room.users.aadd(user)
+        for seq in (1, 3):
+            await Message.objects.acreate(
+                room=room, user=user, content=f"M{seq}", seq=seq
+            )
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(), f"/ws/chat/?room_id={room.id}&since_seq=0"
+        )
+        communicator.scope["user"] = user
+        with mock.patch.object(ChatConsumer, "replay_gap_timeout", 0.1):
+            connected, _ = await communicator.connect()
+            assert connected
+
+            replayed = [
+                await communicator.receive_json_from(),
+                await communicator.receive_json_from(),
+            ]
+        assert [frame["seq"] for frame in replayed] == [1, 3]
+
+        await communicator.disconnect()
+
     async def test_group_message_broadcast(self):
         """
         Test that messages are broadcast to all group members.
@@ -108,3 +326,272 @@ class TestChatConsumer:
         assert response["message_content"] == "Broadcast test"
 
         await communicator.disconnect()
+
+    async def test_message_encoded_once_for_all_members(self):
+        """
+        Test that a broadcast is encoded once, not once per receiving member.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        other_user = await sync_to_async(UserFactory.create)()
+        room = await sync_to_async(ChatRoom.objects.create)(name="Fan-out Room")
+        await sync_to_async(room.users.add)(user, other_user)
+
+        communicators = []
+        for member in (user, other_user):
+            communicator = WebsocketCommunicator(
+                ChatConsumer.as_asgi(), f"/ws/chat/?room_id={room.id}"
+            )
+            communicator.scope["user"] = member
+            connected, _ = await communicator.connect()
+            assert connected
+            communicators.append(communicator)
+
+        with mock.patch(
+            "chat.consumers.encode_json", wraps=encode_json
+        ) as mocked_encode:
+            await communicators[0].send_json_to({"content": "Fan-out", "type": "TEXT"})
+
+            for communicator in communicators:
+                response = await communicator.receive_json_from()
+                assert response["message_content"] == "Fan-out"
+                assert response["sender_id"] == user.id
+
+        assert mocked_encode.call_count == 1
+
+        for communicator in communicators:
+            await communicator.disconnect()
+
+    async def test_write_behind_broadcasts_once_saved(self, settings):
+        """
+        Test that write-behind mode numbers and broadcasts a message when the
+        buffer saves it, without a database round trip per message.
+        """
+        settings.CHAT_WRITE_BEHIND = {"ENABLED": True, "MAX_DELAY": 60}
+        user = await sync_to_async(UserFactory.create)()
+        recipient = await sync_to_async(UserFactory.create)()
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(),
+            f"/ws/chat/?recipient_id={recipient.id}",
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        with mock.patch.object(
+            ChatRoom.objects, "allocate_seq", wraps=ChatRoom.objects.allocate_seq
+        ) as mocked_allocate:
+            for content in ("First", "Second"):
+                await communicator.send_json_to({"content": content, "type": "TEXT"})
+            assert await communicator.receive_nothing()
+            assert not mocked_allocate.called
+            assert not await Message.objects.filter(content="First").aexists()
+
+            await get_message_buffer().flush()
+
+        # Both messages were numbered in the flush transaction
+        assert mocked_allocate.call_count == 1
+        frames = [
+            await communicator.receive_json_from(),
+            await communicator.receive_json_from(),
+        ]
+        assert [frame["message_content"] for frame in frames] == ["First", "Second"]
+        assert [frame["seq"] for frame in frames] == [1, 2]
+
+        await communicator.disconnect()
+
+    async def test_write_behind_flushes_on_disconnect(self, settings):
+        """
+        Test that disconnecting persists the queued messages.
+        """
+        settings.CHAT_WRITE_BEHIND = {"ENABLED": True, "MAX_DELAY": 60}
+        user = await sync_to_async(UserFactory.create)()
+        recipient = await sync_to_async(UserFactory.create)()
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(),
+            f"/ws/chat/?recipient_id={recipient.id}",
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        await communicator.send_json_to({"content": "Write-behind", "type": "TEXT"})
+        assert await communicator.receive_nothing()
+        assert not await Message.objects.filter(content="Write-behind").aexists()
+
+        await communicator.disconnect()
+        assert await Message.objects.filter(content="Write-behind").aexists()
+
+    async def test_write_behind_reports_failed_save(self, settings):
+        """
+        Test that the sender is told when a queued message could not be saved.
+        """
+        settings.CHAT_WRITE_BEHIND = {"ENABLED": True, "MAX_SIZE": 1}
+        user = await sync_to_async(UserFactory.create)()
+        recipient = await sync_to_async(UserFactory.create)()
+
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(),
+            f"/ws/chat/?recipient_id={recipient.id}",
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        assert connected
+
+        with (
+            mock.patch.object(
+                Message.objects, "bulk_create", side_effect=Exception("boom")
+            ),
+            mock.patch.object(Message, "asave", side_effect=Exception("boom")),
+        ):
+            await communicator.send_json_to(
+                {"content": "Lost", "type": "TEXT", "client_id": "abc"}
+            )
+            error = await communicator.receive_json_from()
+
+        # The unsaved message is never broadcast
+        assert await communicator.receive_nothing()
+        assert error["error"] == "Message could not be saved."
+        assert error["client_id"] == "abc"
+
+        await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+class TestMultiplexChatConsumer:
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(
+            MultiplexChatConsumer.as_asgi(), "/ws/chat/multiplex/"
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        assert connected
+        return communicator
+
+    async def create_room(self, *users):
+        room = await ChatRoom.objects.acreate(name="Multiplex Room")
+        await room.users.aadd(*users)
+        return room
+
+    async def test_connection_unauthenticated_user(self):
+        communicator = WebsocketCommunicator(
+            MultiplexChatConsumer.as_asgi(), "/ws/chat/multiplex/"
+        )
+        communicator.scope["user"] = None
+
+        connected, _ = await communicator.connect()
+        assert not connected
+
+    async def test_many_rooms_over_one_connection(self):
+        """
+        Test that one connection receives messages from every subscribed room,
+        tagged with the room they belong to.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        other_user = await sync_to_async(UserFactory.create)()
+        rooms = [await self.create_room(user, other_user) for _ in range(3)]
+
+        communicator = await self.connect(user)
+        for room in rooms:
+            await communicator.send_json_to({"action": "subscribe", "room_id": room.id})
+            response = await communicator.receive_json_from()
+            assert response == {"action": "subscribed", "room_id": room.id}
+
+        sender = await self.connect(other_user)
+        for room in rooms:
+            await sender.send_json_to({"action": "subscribe", "room_id": room.id})
+            await sender.receive_json_from()
+
+        for room in rooms:
+            await sender.send_json_to(
+                {"action": "send", "room_id": room.id, "content": f"Hi {room.id}"}
+            )
+            response = await communicator.receive_json_from()
+            assert response["room_id"] == room.id
+            assert response["message_content"] == f"Hi {room.id}"
+            assert response["sender_id"] == other_user.id
+
+        assert await Message.objects.filter(user=other_user).acount() == 3
+
+        await communicator.disconnect()
+        await sender.disconnect()
+
+    async def test_subscribe_requires_membership(self):
+        user = await sync_to_async(UserFactory.create)()
+        room = await self.create_room(await sync_to_async(UserFactory.create)())
+
+        communicator = await self.connect(user)
+        await communicator.send_json_to({"action": "subscribe", "room_id": room.id})
+
+        response = await communicator.receive_json_from()
+        assert response["error"] == "You are not a member of this room."
+        assert response["room_id"] == room.id
+
+        await communicator.disconnect()
+
+    async def test_send_requires_subscription(self):
+        user = await sync_to_async(UserFactory.create)()
+        room = await self.create_room(user)
+
+        communicator = await self.connect(user)
+        await communicator.send_json_to(
+            {"action": "send", "room_id": room.id, "content": "Hello"}
+        )
+
+        response = await communicator.receive_json_from()
+        assert response["error"] == "Not subscribed to this room."
+        assert not await Message.objects.aexists()
+
+        await communicator.disconnect()
+
+    async def test_unsubscribe_stops_delivery(self):
+        user = await sync_to_async(UserFactory.create)()
+        room = await self.create_room(user)
+
+        communicator = await self.connect(user)
+        await communicator.send_json_to({"action": "subscribe", "room_id": room.id})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({"action": "unsubscribe", "room_id": room.id})
+        response = await communicator.receive_json_from()
+        assert response == {"action": "unsubscribed", "room_id": room.id}
+
+        await get_channel_layer().group_send(
+            f"chat_{room.id}", {"type": "chat_message", "text": "{}"}
+        )
+        assert await communicator.receive_nothing()
+
+        await communicator.disconnect()
+
+    async def test_subscribe_replays_missed_messages(self):
+        user = await sync_to_async(UserFactory.create)()
+        room = await self.create_room(user)
+        for i in range(1, 4):
+            await Message.objects.acreate(room=room, user=user, content=f"M{i}")
+
+        communicator = await self.connect(user)
+        await communicator.send_json_to(
+            {"action": "subscribe", "room_id": room.id, "since_seq": 1}
+        )
+
+        assert (await communicator.receive_json_from())["action"] == "subscribed"
+        replayed = [
+            await communicator.receive_json_from(),
+            await communicator.receive_json_from(),
+        ]
+        assert [frame["seq"] for frame in replayed] == [2, 3]
+        assert all(frame["room_id"] == room.id for frame in replayed)
+
+        await communicator.disconnect()
+
+    async def test_invalid_room_id(self):
+        user = await sync_to_async(UserFactory.create)()
+
+        communicator = await self.connect(user)
+        await communicator.send_json_to({"action": "subscribe", "room_id": "abc"})
+
+        response = await communicator.receive_json_from()
+        assert response["error"] == "A valid room_id is required."
+
+        await communicator.disconnect()
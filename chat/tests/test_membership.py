@@ -0,0 +1,112 @@
+from unittest import mock
+
+import pytest
+from asgiref.sync import sync_to_async
+
+from chat import membership
+from chat.membership import ais_member, is_member, membership_cache_key
+from chat.models import ChatRoom
+from core.cache import MISSING, get_local
+from core.tests.helpers import wait_for
+from users.tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestMembership:
+    def test_is_member(self):
+        user = UserFactory()
+        chat_room = ChatRoom.objects.create(name="Room")
+        chat_room.users.add(user)
+
+        assert is_member(chat_room.id, user.id)
+        assert not is_member(chat_room.id, UserFactory().id)
+
+    def test_warm_check_costs_no_queries(self, django_assert_num_queries):
+        user = UserFactory()
+        chat_room = ChatRoom.objects.create(name="Room")
+        chat_room.users.add(user)
+
+        with django_assert_num_queries(1):
+            assert is_member(chat_room.id, user.id)
+        with django_assert_num_queries(0):
+            assert is_member(chat_room.id, user.id)
+
+    def test_add_invalidates(self):
+        user = UserFactory()
+        chat_room = ChatRoom.objects.create(name="Room")
+
+        assert not is_member(chat_room.id, user.id)
+        chat_room.users.add(user)
+        assert is_member(chat_room.id, user.id)
+
+    def test_remove_invalidates(self):
+        user = UserFactory()
+        chat_room = ChatRoom.objects.create(name="Room")
+        chat_room.users.add(user)
+
+        assert is_member(chat_room.id, user.id)
+        chat_room.users.remove(user)
+        assert not is_member(chat_room.id, user.id)
+
+    def test_clear_invalidates(self):
+        user = UserFactory()
+        chat_room = ChatRoom.objects.create(name="Room")
+        chat_room.users.add(user)
+
+        assert is_member(chat_room.id, user.id)
+        chat_room.users.clear()
+        assert not is_member(chat_room.id, user.id)
+
+    def test_reverse_changes_invalidate(self):
+        user = UserFactory()
+        chat_room = ChatRoom.objects.create(name="Room")
+
+        assert not is_member(chat_room.id, user.id)
+        user.chat_rooms.add(chat_room)
+        assert is_member(chat_room.id, user.id)
+        user.chat_rooms.clear()
+        assert not is_member(chat_room.id, user.id)
+
+    def test_room_delete_invalidates(self):
+        user = UserFactory()
+        chat_room = ChatRoom.objects.create(name="Room")
+        chat_room.users.add(user)
+        room_id = chat_room.id
+
+        assert is_member(room_id, user.id)
+        chat_room.delete()
+        assert not is_member(room_id, user.id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+class TestAsyncMembership:
+    async def test_ais_member(self):
+        user = await UserFactory._meta.model.objects.acreate(username="member")
+        chat_room = await ChatRoom.objects.acreate(name="Room")
+        await chat_room.users.aadd(user)
+
+        assert await ais_member(chat_room.id, user.id)
+        assert not await ais_member(chat_room.id, user.id + 1)
+
+    async def test_removal_reaches_other_processes(self, make_cache):
+        """
+        Test that a member removed in one process is turned away by the warm
+        cache of another.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        chat_room = await ChatRoom.objects.acreate(name="Room")
+        await chat_room.users.aadd(user)
+        this_process, other_process = make_cache(), make_cache()
+        key = membership_cache_key(chat_room.id, user.id)
+
+        with mock.patch.object(membership, "cache", other_process):
+            assert await ais_member(chat_room.id, user.id)
+            assert get_local(other_process, key) is True
+
+        with mock.patch.object(membership, "cache", this_process):
+            await chat_room.users.aremove(user)
+
+        wait_for(lambda: get_local(other_process, key) is MISSING)
+        with mock.patch.object(membership, "cache", other_process):
+            assert not await ais_member(chat_room.id, user.id)
@@ -0,0 +1,132 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat import middleware
+from chat.middleware import get_user_from_token, user_cache_key
+from core.cache import MISSING, get_local
+from core.tests.helpers import wait_for
+from users.tests.factories import UserFactory
+from users.tokens import RefreshToken
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+class TestGetUserFromToken:
+    async def authenticate(self, token):
+        with mock.patch.object(
+            middleware, "get_user", wraps=middleware.get_user
+        ) as mocked_get_user:
+            user = await get_user_from_token(str(token))
+        return user, mocked_get_user.call_count
+
+    async def test_user_is_cached(self):
+        """
+        Test that repeated handshakes with a token load the user only once.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        token = AccessToken.for_user(user)
+
+        cold_user, cold_loads = await self.authenticate(token)
+        warm_user, warm_loads = await self.authenticate(token)
+
+        assert cold_user.id == warm_user.id == user.id
+        assert (cold_loads, warm_loads) == (1, 0)
+
+    async def test_invalid_token(self):
+        user = await sync_to_async(UserFactory.create)()
+        token = str(AccessToken.for_user(user))
+
+        resolved, _ = await self.authenticate(token[:-2])
+        assert resolved.is_anonymous
+
+        resolved, _ = await self.authenticate("not-a-token")
+        assert resolved.is_anonymous
+
+    async def test_forged_token_reusing_cached_jti(self):
+        """
+        Test that a cached jti does not vouch for a different token.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        other_user = await sync_to_async(UserFactory.create)()
+        token = AccessToken.for_user(user)
+        await self.authenticate(token)
+
+        forged = AccessToken.for_user(other_user)
+        forged["jti"] = token["jti"]
+        forged_token = str(forged)[:-2] + "xx"
+
+        resolved, _ = await self.authenticate(forged_token)
+        assert resolved.is_anonymous
+
+    async def test_expired_token_is_not_served_from_cache(self):
+        user = await sync_to_async(UserFactory.create)()
+        token = AccessToken.for_user(user)
+        token.set_exp(lifetime=timedelta(seconds=1))
+        await self.authenticate(token)
+
+        assert middleware.token_claims.get(token["jti"]) is not None
+        after_expiry = time.monotonic() + 2
+        with mock.patch("core.cache.time.monotonic", return_value=after_expiry):
+            assert middleware.token_claims.get(token["jti"]) is None
+
+    async def test_saving_user_invalidates_cache(self):
+        user = await sync_to_async(UserFactory.create)()
+        token = AccessToken.for_user(user)
+        await self.authenticate(token)
+
+        user.first_name = "Renamed"
+        await user.asave()
+
+        resolved, loads = await self.authenticate(token)
+        assert loads == 1
+        assert resolved.first_name == "Renamed"
+
+    async def test_deactivated_user_is_rejected(self):
+        user = await sync_to_async(UserFactory.create)()
+        token = AccessToken.for_user(user)
+        await self.authenticate(token)
+
+        user.is_active = False
+        await user.asave()
+
+        resolved, _ = await self.authenticate(token)
+        assert resolved.is_anonymous
+
+    async def test_revoking_tokens_invalidates_cache(self):
+        user = await sync_to_async(UserFactory.create)()
+        token = (await sync_to_async(RefreshToken.for_user)(user)).access_token
+        await self.authenticate(token)
+
+        await sync_to_async(user.revoke_tokens)()
+
+        resolved, loads = await self.authenticate(token)
+        assert loads == 1
+        assert resolved.is_anonymous
+
+    async def test_revocation_reaches_other_processes(self, make_cache):
+        """
+        Test that a user cached by one process is dropped when another
+        process revokes their tokens.
+        """
+        user = await sync_to_async(UserFactory.create)()
+        token = (await sync_to_async(RefreshToken.for_user)(user)).access_token
+        this_process, other_process = make_cache(), make_cache()
+        key = user_cache_key(user.id)
+
+        with mock.patch.object(middleware, "cache", other_process):
+            await self.authenticate(token)
+            assert get_local(other_process, key) is not MISSING
+
+        with mock.patch.object(middleware, "cache", this_process):
+            await sync_to_async(user.revoke_tokens)()
+
+        wait_for(lambda: get_local(other_process, key) is MISSING)
+        with mock.patch.object(middleware, "cache", other_process):
+            resolved, loads = await self.authenticate(token)
+        assert loads == 1
+        assert resolved.is_anonymous
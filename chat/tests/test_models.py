@@ -0,0 +1,222 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from chat.models import ChatRoom, Message
+from users.tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestChatRoomManager:
+    def test_get_or_create_direct_creates_room(self):
+        user = UserFactory()
+        recipient = UserFactory()
+
+        chat_room, created = ChatRoom.objects.get_or_create_direct(user, recipient)
+
+        assert created
+        assert chat_room.pair_key == ChatRoom.build_pair_key(user.id, recipient.id)
+        assert set(chat_room.users.values_list("id", flat=True)) == {
+            user.id,
+            recipient.id,
+        }
+
+    def test_get_or_create_direct_is_symmetric(self):
+        user = UserFactory()
+        recipient = UserFactory()
+
+        chat_room, _ = ChatRoom.objects.get_or_create_direct(user, recipient)
+        same_room, created = ChatRoom.objects.get_or_create_direct(recipient, user)
+
+        assert not created
+        assert same_room == chat_room
+        assert ChatRoom.objects.count() == 1
+
+    def test_get_or_create_direct_ignores_other_rooms(self):
+        """
+        Test that rooms shared with other users are never mistaken for the DM.
+        """
+        user = UserFactory()
+        recipient = UserFactory()
+        group_room = ChatRoom.objects.create(name="Group")
+        group_room.users.add(user, UserFactory())
+
+        chat_room, created = ChatRoom.objects.get_or_create_direct(user, recipient)
+
+        assert created
+        assert chat_room != group_room
+
+    def test_get_or_create_direct_lookup_is_single_query(
+        self, django_assert_num_queries
+    ):
+        user = UserFactory()
+        recipient = UserFactory()
+        ChatRoom.objects.get_or_create_direct(user, recipient)
+
+        with django_assert_num_queries(1):
+            ChatRoom.objects.get_or_create_direct(user, recipient)
+
+    def test_get_or_create_direct_recovers_from_concurrent_create(self):
+        """
+        Test that losing the creation race returns the room created by the winner.
+        """
+        user = UserFactory()
+        recipient = UserFactory()
+        winner, _ = ChatRoom.objects.get_or_create_direct(user, recipient)
+
+        original_get = ChatRoom.objects.get
+        calls = []
+
+        def get_after_race(*args, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise ChatRoom.DoesNotExist
+            return original_get(*args, **kwargs)
+
+        with mock.patch.object(ChatRoom.objects, "get", side_effect=get_after_race):
+            chat_room, created = ChatRoom.objects.get_or_create_direct(user, recipient)
+
+        assert not created
+        assert chat_room == winner
+
+    def test_get_for_member_by_room_is_single_query(self, django_assert_num_queries):
+        user = UserFactory()
+        chat_room = ChatRoom.objects.create(name="Room")
+        chat_room.users.add(user)
+
+        with django_assert_num_queries(1):
+            assert ChatRoom.objects.get_for_member(user, room_id=chat_room.id) == (
+                chat_room
+            )
+
+    def test_get_for_member_by_recipient_is_single_query(
+        self, django_assert_num_queries
+    ):
+        user = UserFactory()
+        recipient = UserFactory()
+        chat_room, _ = ChatRoom.objects.get_or_create_direct(user, recipient)
+
+        with django_assert_num_queries(1):
+            assert (
+                ChatRoom.objects.get_for_member(user, recipient_id=recipient.id)
+                == chat_room
+            )
+
+    def test_get_for_member_rejects_non_member(self):
+        chat_room = ChatRoom.objects.create(name="Private")
+        chat_room.users.add(UserFactory())
+
+        assert (
+            ChatRoom.objects.get_for_member(UserFactory(), room_id=chat_room.id) is None
+        )
+
+    def test_get_for_member_creates_direct_room(self):
+        user = UserFactory()
+        recipient = UserFactory()
+
+        chat_room = ChatRoom.objects.get_for_member(user, recipient_id=recipient.id)
+
+        assert chat_room.pair_key == ChatRoom.build_pair_key(user.id, recipient.id)
+
+    def test_get_for_member_unknown_recipient(self):
+        assert ChatRoom.objects.get_for_member(UserFactory(), recipient_id=0) is None
+
+
+@pytest.mark.django_db
+class TestMessageSequence:
+    def test_seq_is_assigned_per_room(self):
+        user = UserFactory()
+        room = ChatRoom.objects.create(name="Room")
+        other_room = ChatRoom.objects.create(name="Other Room")
+
+        first = Message.objects.create(room=room, user=user, content="1")
+        other = Message.objects.create(room=other_room, user=user, content="1")
+        second = Message.objects.create(room=room, user=user, content="2")
+
+        assert (first.seq, second.seq) == (1, 2)
+        assert other.seq == 1
+        room.refresh_from_db()
+        assert room.last_seq == 2
+
+    def test_allocate_seq_reserves_a_block(self):
+        room = ChatRoom.objects.create(name="Room")
+
+        assert ChatRoom.objects.allocate_seq(room.id, 5) == 1
+        assert ChatRoom.objects.allocate_seq(room.id) == 6
+
+    def test_allocate_seq_unknown_room(self):
+        with pytest.raises(ChatRoom.DoesNotExist):
+            ChatRoom.objects.allocate_seq(0)
+
+
+@pytest.mark.django_db
+class TestChatRoomLastMessage:
+    def test_new_room_is_active_from_creation(self):
+        room = ChatRoom.objects.create(name="Room")
+
+        assert room.last_message is None
+        assert room.last_message_at is not None
+
+    def test_message_updates_last_message(self):
+        user = UserFactory()
+        room = ChatRoom.objects.create(name="Room")
+
+        Message.objects.create(room=room, user=user, content="Hello")
+        message = Message.objects.create(room=room, user=user, content="x" * 300)
+
+        room.refresh_from_db()
+        assert room.last_message == message
+        assert room.last_message_at == message.created
+        assert room.last_message_preview == "x" * Message.PREVIEW_LENGTH
+
+    def test_preview_of_message_without_content(self):
+        user = UserFactory()
+        room = ChatRoom.objects.create(name="Room")
+
+        Message.objects.create(
+            room=room, user=user, message_type=Message.MessageType.IMAGE
+        )
+
+        room.refresh_from_db()
+        assert room.last_message_preview == "Image"
+
+    def test_older_message_does_not_replace_last_message(self):
+        user = UserFactory()
+        room = ChatRoom.objects.create(name="Room")
+        older = Message.objects.create(room=room, user=user, content="Old")
+        message = Message.objects.create(room=room, user=user, content="New")
+        older.created = message.created - timedelta(minutes=1)
+
+        ChatRoom.objects.record_last_message(older)
+
+        room.refresh_from_db()
+        assert room.last_message == message
+
+    def test_deleting_last_message_falls_back_to_previous(self):
+        user = UserFactory()
+        room = ChatRoom.objects.create(name="Room")
+        first = Message.objects.create(room=room, user=user, content="First")
+        second = Message.objects.create(room=room, user=user, content="Second")
+
+        second.delete()
+        room.refresh_from_db()
+        assert room.last_message == first
+        assert room.last_message_preview == "First"
+
+        first.delete()
+        room.refresh_from_db()
+        assert room.last_message is None
+        assert room.last_message_preview == ""
+
+    def test_deleting_room_skips_refresh(self, django_assert_max_num_queries):
+        user = UserFactory()
+        room = ChatRoom.objects.create(name="Room")
+        Message.objects.bulk_create(
+            Message(room=room, user=user, content=str(seq), seq=seq)
+            for seq in range(1, 21)
+        )
+
+        # The deletion does not cost a query per message
+        with django_assert_max_num_queries(10):
+            room.delete()
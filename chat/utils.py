@@ -0,0 +1,28 @@
+import json
+from typing import Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+
+def encode_json(content: Any) -> str:
+    """
+    Encode content into a JSON text frame, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z).decode()
+    return json.dumps(content, cls=DjangoJSONEncoder)
+
+
+def decode_json(text_data: str | bytes) -> Any:
+    """
+    Decode a JSON text frame, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(text_data)
+    return json.loads(text_data)
@@ -1,5 +1,7 @@
+import uuid
 from io import BytesIO
 
+import fakeredis
 import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
 from PIL import Image
@@ -12,6 +14,10 @@ from django.utils import timezone
 from rest_framework.authtoken.models import Token
 from allauth.socialaccount.models import SocialAccount
 
+from core.cache import TwoTierRedisCache
+from core.config import bump_config_version
+from core.tests.helpers import wait_for
+
 register(UserFactory)
 
 
@@ -99,10 +105,62 @@ def email_confirmation_setup(authenticated_api_client, user):
     )
     return confirmation 
 
+@pytest.fixture(autouse=True)
+def reset_config_snapshot():
+    """
+    Rolled back Constance values must not survive in the snapshot.
+    """
+    yield
+    bump_config_version()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """
+    Uploads must not land in the repository's media directory.
+    """
+    settings.MEDIA_ROOT = tmp_path / "media"
+
+
 @pytest.fixture(autouse=True)
 def setup(settings):
     settings.ACCOUNT_EMAIL_VERIFICATION = "optional"
     settings.ACCOUNT_EMAIL_REQUIRED = True
 @pytest.fixture
 def social_account(user):
-    return SocialAccount.objects.create(user=user, provider="google")
\ No newline at end of file
+    return SocialAccount.objects.create(user=user, provider="google")
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def make_cache(redis_server):
+    """Build caches sharing one Redis, each standing in for a process"""
+    caches = []
+    # django-redis keeps one connection pool per URL
+    url = f"redis://{uuid.uuid4().hex}:6379/0"
+
+    def make_cache(**options):
+        cache = TwoTierRedisCache(
+            url,
+            {
+                "OPTIONS": {
+                    "CONNECTION_POOL_KWARGS": {
+                        "connection_class": fakeredis.FakeConnection,
+                        "server": redis_server,
+                    },
+                    **options,
+                }
+            },
+        )
+        cache.start_listener()
+        wait_for(lambda: cache.listening)
+        caches.append(cache)
+        return cache
+
+    yield make_cache
+    for cache in caches:
+        cache.stop_listener()
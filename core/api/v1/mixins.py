@@ -1,7 +1,163 @@
-from rest_framework_simplejwt.tokens import RefreshToken
+import hashlib
+import time
+
+from django_restql.exceptions import QueryFormatError
+from rest_framework.serializers import ValidationError
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from users.tokens import RefreshToken
 
 
 class TokenResponseMixin:
     def get_token_response(self, user):
         refresh = RefreshToken.for_user(user)
         return {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+
+class OptimizedQuerySetMixin:
+    """
+    Lets a django-restql serializer trim a queryset to the columns and
+    relations of the fields a query selects.
+
+    Fields read the column they are named after unless `query_columns` says
+    otherwise. Serializers that output relations load them in
+    `get_field_lookups`.
+    """
+
+    query_columns = {}
+
+    def get_selected_fields(self, parsed_query=None) -> dict:
+        """
+        Return the names of the fields `parsed_query` selects, mapped to the
+        query of their sub fields, or None for all of them.
+        """
+        fields = dict(self.allowed_fields)
+        if parsed_query is None:
+            return dict.fromkeys(fields)
+
+        selected_fields, nested_queries = self.select_fields(parsed_query, fields)
+        selected = {}
+        for alias, field in selected_fields.items():
+            # A field selected twice under different aliases loads all of it
+            if field.field_name in selected:
+                selected[field.field_name] = None
+            else:
+                selected[field.field_name] = nested_queries.get(alias)
+        return selected
+
+    def get_field_lookups(self, field_name, parsed_query, prefix=""):
+        """
+        Return the columns, the relations to join and the relations to
+        prefetch the field needs.
+        """
+        columns = self.query_columns.get(field_name, [field_name])
+        return [f"{prefix}{column}" for column in columns], [], []
+
+    def get_query_lookups(self, parsed_query=None, prefix=""):
+        only, select_related, prefetch_related = [], [], []
+        for field_name, query in self.get_selected_fields(parsed_query).items():
+            columns, joins, prefetches = self.get_field_lookups(
+                field_name, query, prefix
+            )
+            only += columns
+            select_related += joins
+            prefetch_related += prefetches
+        return only, select_related, prefetch_related
+
+    def optimize_queryset(self, queryset, parsed_query=None, columns=()):
+        """
+        Return `queryset` loading what the fields `parsed_query` selects
+        need, plus `columns`.
+        """
+        only, select_related, prefetch_related = self.get_query_lookups(parsed_query)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        return (
+            queryset.prefetch_related(None)
+            .prefetch_related(*prefetch_related)
+            .only(*only, *columns)
+        )
+
+
+class OptimizedQuerySetViewMixin:
+    """
+    Fetch only what the serializer outputs for the request's django-restql
+    `?query=`, so sparse queries cost sparse SQL.
+
+    The serializer must use `OptimizedQuerySetMixin`. `query_columns` lists
+    columns the view itself reads; the pagination ordering is added to them.
+    """
+
+    query_columns = []
+
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
+
+    def optimize_queryset(self, queryset):
+        serializer = self.get_serializer()
+        columns = [*self.query_columns]
+        ordering = getattr(self.paginator, "ordering", None) or ()
+        columns += [field.lstrip("-") for field in ordering]
+
+        try:
+            parsed_query = serializer.get_parsed_restql_query()
+            return serializer.optimize_queryset(queryset, parsed_query, columns)
+        except (SyntaxError, QueryFormatError, ValidationError):
+            # Let serialization report the invalid query to the client
+            return serializer.optimize_queryset(queryset, columns=columns)
+
+
+class ConditionalListMixin:
+    """
+    Answer `list` with 304 Not Modified while the client's `ETag` or
+    `Last-Modified` still holds, before the page is fetched or serialized.
+
+    `get_list_validators` returns a version that changes whenever the
+    listing does and the time of the last change, or None for either.
+    Returning None altogether skips the check. The validators are read
+    before the page, so a change in between only makes the next request
+    miss. HTTP dates have one-second precision, so `Last-Modified` is left
+    out while its second is still current; another change within that
+    second would otherwise pass `If-Modified-Since`.
+    """
+
+    def get_list_validators(self):
+        return None
+
+    def get_list_etag(self, version):
+        # Representations differ per query string, user and renderer
+        request = self.request
+        key = "|".join(
+            [
+                str(version),
+                request.get_full_path(),
+                str(request.user.pk),
+                request.accepted_media_type,
+            ]
+        )
+        return "W/" + quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        validators = self.get_list_validators()
+        if validators is None:
+            return super().list(request, *args, **kwargs)
+
+        version, last_modified = validators
+        etag = self.get_list_etag(version) if version is not None else None
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+            if last_modified >= int(time.time()):
+                last_modified = None
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+
+        if etag is not None:
+            response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
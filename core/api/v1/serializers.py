@@ -1,4 +1,3 @@
-from constance import config
 from rest_framework import serializers
 
 
@@ -9,7 +8,7 @@ class ConstanceSerializer(serializers.Serializer):
     def to_representation(self, instance):
         return {
             "key": instance[0],
-            "value": getattr(config, instance[0]),
+            "value": instance[1],
         }
 class SocialAccountSerializer(serializers.Serializer):
     providers = serializers.ListField(child=serializers.CharField())
@@ -1,6 +1,8 @@
 import pytest
+from django_restql.parser import QueryParser
 from rest_framework_simplejwt.tokens import RefreshToken
 from core.api.v1.mixins import TokenResponseMixin
+from users.api.v1.serializers import UserDetailSerializer
 from users.models import User
 
 
@@ -16,3 +18,30 @@ def test_get_token_response():
     assert token_response["access"] is not None
     assert isinstance(token_response["refresh"], str)
     assert isinstance(token_response["access"], str)
+
+
+@pytest.mark.django_db
+def test_optimized_queryset_loads_selected_fields():
+    User.objects.create_user(username="testuser", email="test@example.com")
+    serializer = UserDetailSerializer()
+    parsed_query = QueryParser().parse("{name: username, has_usable_password}")
+
+    assert serializer.get_selected_fields(parsed_query) == {
+        "username": None,
+        "has_usable_password": None,
+    }
+    user = serializer.optimize_queryset(User.objects.all(), parsed_query).get()
+    assert user.get_deferred_fields() == {
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname not in {"id", "username", "password"}
+    }
+    assert not hasattr(user, "has_verified_email")
+
+
+@pytest.mark.django_db
+def test_optimized_queryset_without_query_loads_everything():
+    User.objects.create_user(username="testuser", email="test@example.com")
+    user = UserDetailSerializer().optimize_queryset(User.objects.all()).get()
+    assert "email" not in user.get_deferred_fields()
+    assert user.has_verified_email is False
@@ -34,3 +34,27 @@ def test_social_account_viewset(authenticated_api_client, user, social_account):
     assert "providers" in response.data[0]
     assert isinstance(response.data[0]["providers"], list)
     assert "google" in response.data[0]["providers"]
+
+
+@pytest.mark.django_db
+def test_constance_viewset_conditional_get(api_client):
+    url = reverse("v1:core:constance-list")
+    response = api_client.get(url)
+    etag = response["ETag"]
+    assert response.status_code == status.HTTP_200_OK
+    assert "no-cache" in response["Cache-Control"]
+    assert all(
+        item["key"] not in settings.EXCLUDED_KEYS_FOR_API for item in response.data
+    )
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == etag
+
+    config.FACEBOOK_URL = "https://facebook.com/example"
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+    assert {"key": "FACEBOOK_URL", "value": "https://facebook.com/example"} in (
+        response.data
+    )
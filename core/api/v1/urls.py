@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from core.api.v1.views import ThreadPoolStatsView
 from core.api.v1.viewsets import ConstanceViewSet, SocialAccountViewSet
 
 router = DefaultRouter()
@@ -8,4 +9,5 @@ router.register(r"social-accounts", SocialAccountViewSet, basename="social-accou
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("thread-pool/", ThreadPoolStatsView.as_view(), name="thread_pool_stats"),
 ]
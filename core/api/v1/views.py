@@ -1,18 +1,19 @@
-
 from allauth.socialaccount.providers.facebook.views import FacebookOAuth2Adapter
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from dj_rest_auth.registration.views import SocialConnectView, SocialLoginView
 from rest_framework import status
 from rest_framework.generics import GenericAPIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from django.core.exceptions import ObjectDoesNotExist
 
 from core.api.v1.serializers import DisconnectSocialAccountSerializer
 from core.api.v1.mixins import TokenResponseMixin
+from core.thread_pool import get_view_thread_pool
 
 
 class FacebookLoginView(SocialLoginView, TokenResponseMixin):
@@ -84,4 +85,15 @@ class DisconnectSocialAccountView(GenericAPIView):
                 )
         return Response(
             {"error": "Provider not provided"}, status=status.HTTP_400_BAD_REQUEST
-        )
\ No newline at end of file
+        )
+
+
+class ThreadPoolStatsView(APIView):
+    """
+    Saturation counters of this worker process's view thread pool.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_view_thread_pool().stats(), status=status.HTTP_200_OK)
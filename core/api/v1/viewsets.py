@@ -1,28 +1,30 @@
 from allauth.socialaccount.models import SocialAccount
-from constance import config
-from constance import settings as constance_settings
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
 
-from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 from core.api.v1.serializers import ConstanceSerializer, SocialAccountSerializer
+from core.config import get_config_snapshot
 
 
 class ConstanceViewSet(ViewSet):
     permission_classes = [AllowAny]
     def list(self, request):
-        keys = [
-            key
-            for key in constance_settings.CONFIG.keys()
-            if key not in settings.EXCLUDED_KEYS_FOR_API
-        ]
-        constance_values = [(key, getattr(config, key)) for key in keys]
-        serializer = ConstanceSerializer(constance_values, many=True)
-        return Response(serializer.data, status.HTTP_200_OK)
+        snapshot = get_config_snapshot()
+        etag = snapshot.public_etag
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            serializer = ConstanceSerializer(snapshot.public_values, many=True)
+            response = Response(serializer.data, status.HTTP_200_OK)
+        response["ETag"] = etag
+        # Cacheable by anyone, but revalidated with the ETag on every use
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
 
 
 class SocialAccountViewSet(ViewSet):
@@ -0,0 +1,86 @@
+"""
+Helpers shared by the benchmark scripts kept under `<app>/benchmarks/`.
+
+Benchmarks are plain scripts rather than tests; run one with, for example:
+
+    python -m chat.benchmarks.bench_write_behind
+
+`DJANGO_SETTINGS_MODULE` defaults to the project settings. Benchmarks that
+need the database run against a throwaway test database.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_install_chat.settings")
+
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Create a test database for the duration of the block.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def timer(label: str, operations: int):
+    """
+    Time the block and print throughput for `operations` units of work.
+    """
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<45} {operations / elapsed:>12,.0f} ops/s"
+        f" {elapsed * 1000 / operations:>10.4f} ms/op"
+    )
+
+
+async def asgi_get(application, path: str, query_string=b"", headers=()):
+    """
+    Send a GET request through an ASGI application, as uvicorn would, and
+    return the response status and body.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "query_string": query_string,
+        "headers": [(b"host", b"testserver"), *headers],
+        "server": ("testserver", 80),
+    }
+    messages = asyncio.Queue()
+    messages.put_nowait({"type": "http.request", "body": b""})
+    response = {"body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        else:
+            response["body"] += message.get("body", b"")
+
+    # The client stays connected, so nothing follows the request body
+    await application(scope, messages.get, send)
+    return response["status"], response["body"]
@@ -0,0 +1,83 @@
+"""
+Measure the middleware overhead saved by `core.handlers` on a trivial view.
+
+    python -m core.benchmarks.bench_middleware [requests]
+
+Serves `/health/` through the stock Django handlers, which run the whole
+`MIDDLEWARE` chain, and through the path dispatching ones, which run
+`REDUCED_MIDDLEWARE` for it. `/admin/login/` is timed through the
+dispatching handlers as well, to show full-chain paths do not get slower.
+The ASGI handlers are what uvicorn runs; WSGI is timed for comparison.
+"""
+
+import asyncio
+import io
+import sys
+
+from core.benchmarks import asgi_get, setup_django, test_database, timer
+
+
+def wsgi_environ(path):
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.url_scheme": "http",
+    }
+
+
+def bench_wsgi(label, handler, path, requests):
+    statuses = set()
+
+    def start_response(status, headers):
+        statuses.add(status)
+
+    with timer(label, requests):
+        for _ in range(requests):
+            response = handler(wsgi_environ(path), start_response)
+            response.close()
+    assert statuses == {"200 OK"}, statuses
+
+
+def bench_asgi(label, handler, path, requests):
+    statuses = set()
+
+    async def run():
+        for _ in range(requests):
+            status, _ = await asgi_get(handler, path)
+            statuses.add(status)
+
+    with timer(label, requests):
+        asyncio.run(run())
+    assert statuses == {200}, statuses
+
+
+def main(requests: int):
+    from django.core.handlers.asgi import ASGIHandler
+    from django.core.handlers.wsgi import WSGIHandler
+
+    from core.handlers import PathDispatchASGIHandler, PathDispatchWSGIHandler
+
+    with test_database():
+        print(f"{requests:,} sequential GET requests per row")
+        for name, full, dispatch, bench in [
+            ("asgi", ASGIHandler(), PathDispatchASGIHandler(), bench_asgi),
+            ("wsgi", WSGIHandler(), PathDispatchWSGIHandler(), bench_wsgi),
+        ]:
+            # Warm up URL resolution and template loading
+            bench(f"{name} warm up", dispatch, "/admin/login/", 10)
+            bench(f"{name} /health/, full chain", full, "/health/", requests)
+            bench(f"{name} /health/, reduced chain", dispatch, "/health/", requests)
+            bench(f"{name} /admin/login/, full chain", full, "/admin/login/", requests)
+            bench(
+                f"{name} /admin/login/, dispatched", dispatch, "/admin/login/", requests
+            )
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,151 @@
+"""
+Measure process startup with Constance-backed settings.
+
+    python -m core.benchmarks.bench_startup [runs]
+
+Each run starts a fresh interpreter, imports the settings and runs
+`django.setup()`, as every manage.py command, Celery worker and uvicorn
+worker does at boot. The "eager" runs also resolve the social provider
+credentials during startup, which is what settings that read Constance at
+import time cost: once through the snapshot (one query) and once with a
+`getattr(config, key)` per credential, which also writes the keys never
+saved. The last section starts with a database that cannot be opened:
+lazy settings do not notice, eager ones fail every query and Constance
+silently falls back to the defaults.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+CHILD = """
+import importlib, json, os, time
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+
+queries = {"run": 0, "failed": 0}
+connect = BaseDatabaseWrapper.connect
+
+
+def count_connect(self):
+    try:
+        return connect(self)
+    except Exception:
+        queries["failed"] += 1
+        raise
+
+
+BaseDatabaseWrapper.connect = count_connect
+
+
+def count_queries(execute, sql, params, many, context):
+    queries["run"] += 1
+    try:
+        return execute(sql, params, many, context)
+    except Exception:
+        queries["failed"] += 1
+        raise
+
+
+def watch(connection, **kwargs):
+    connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(watch, weak=False)
+
+start = time.perf_counter()
+importlib.import_module(os.environ["DJANGO_SETTINGS_MODULE"])
+imported = time.perf_counter()
+import django
+django.setup()
+
+mode = os.environ["BENCH_MODE"]
+if mode != "lazy":
+    from constance import config
+    from django.conf import settings
+    from test_install_chat.utils import ConstanceValue
+
+    values = []
+    for provider in settings.SOCIALACCOUNT_PROVIDERS.values():
+        for app in provider.get("APPS", [provider.get("APP", {})]):
+            values.extend(v for v in app.values() if isinstance(v, ConstanceValue))
+    for value in values:
+        if mode == "eager_snapshot":
+            value.resolve()
+        else:
+            getattr(config, value.key)
+
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "total_ms": (time.perf_counter() - start) * 1000,
+    **queries,
+}))
+"""
+
+
+def run(mode, database_url):
+    env = dict(
+        os.environ,
+        BENCH_MODE=mode,
+        DATABASE_URL=database_url,
+        DJANGO_SETTINGS_MODULE="test_install_chat.settings",
+    )
+    env.setdefault("SECRET_KEY", "benchmark")
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        return None, result.stderr.strip().splitlines()[-1]
+    return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+
+def report(label, mode, database_url, runs):
+    results = []
+    for _ in range(runs):
+        result, error = run(mode, database_url)
+        if error:
+            print(f"{label:<45} failed: {error}")
+            return
+        results.append(result)
+
+    import_ms = statistics.median(result["import_ms"] for result in results)
+    total_ms = statistics.median(result["total_ms"] for result in results)
+    print(
+        f"{label:<40} import {import_ms:>6.1f} ms  startup {total_ms:>7.1f} ms"
+        f"  {results[0]['run']:>2} queries, {results[0]['failed']} db errors"
+    )
+
+
+def main(runs: int):
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{directory}/startup.sqlite3"
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "constance", "-v", "0"],
+            env=dict(
+                os.environ,
+                DATABASE_URL=database_url,
+                SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+            ),
+            check=True,
+        )
+
+        print(f"median of {runs} runs")
+        report("lazy settings", "lazy", database_url, runs)
+        report("eager, one snapshot query", "eager_snapshot", database_url, runs)
+        report(
+            "eager, getattr(config, key) per value", "eager_getattr", database_url, runs
+        )
+
+        print("database unreachable")
+        missing_url = f"sqlite:///{directory}/missing/startup.sqlite3"
+        report("lazy settings", "lazy", missing_url, runs)
+        report("eager, one snapshot query", "eager_snapshot", missing_url, runs)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,99 @@
+"""
+Measure sync view throughput under ASGI with and without the view thread pool.
+
+    python -m core.benchmarks.bench_thread_pool [requests] [concurrency]
+
+Sends `requests` GETs, `concurrency` at a time, through the ASGI handler
+to two sync views: one that blocks for 5 ms like a database query, and one
+that burns 1 ms of CPU. The baseline runs them the stock way, where each
+request's thread-sensitive context starts a thread of its own. The other
+rows run them on pools of growing size, printing the saturation counters.
+Blocking views scale with the pool until it matches the concurrency, while
+CPU-bound views stay bound by the GIL whatever the pool size.
+"""
+
+import asyncio
+import sys
+import time
+
+from django.http import HttpResponse
+from django.urls import path
+
+from core.benchmarks import asgi_get, setup_django, timer
+
+
+POOL_SIZES = [1, 2, 4, 8, 16, 32]
+
+
+def blocking_view(request):
+    time.sleep(0.005)
+    return HttpResponse("ok")
+
+
+def cpu_view(request):
+    deadline = time.perf_counter() + 0.001
+    while time.perf_counter() < deadline:
+        pass
+    return HttpResponse("ok")
+
+
+urlpatterns = [
+    path("bench/blocking/", blocking_view),
+    path("bench/cpu/", cpu_view),
+]
+
+
+def bench(label, handler, url, requests, concurrency):
+    statuses = set()
+
+    async def client(count):
+        for _ in range(count):
+            status, _ = await asgi_get(handler, url)
+            statuses.add(status)
+
+    async def run():
+        per_client, rest = divmod(requests, concurrency)
+        await asyncio.gather(
+            *(client(per_client + (i < rest)) for i in range(concurrency))
+        )
+
+    with timer(label, requests):
+        asyncio.run(run())
+    assert statuses == {200}, statuses
+
+
+def main(requests: int, concurrency: int):
+    from django.test.utils import override_settings
+
+    from core.handlers import PathDispatchASGIHandler
+    from core.thread_pool import get_view_thread_pool, reset_view_thread_pool
+
+    print(f"{requests:,} requests, {concurrency} concurrent")
+    for url in ["/bench/blocking/", "/bench/cpu/"]:
+        with override_settings(
+            ROOT_URLCONF=__name__, REDUCED_MIDDLEWARE_PATHS=["/bench/"]
+        ):
+            handler = PathDispatchASGIHandler()
+            bench(f"{url} thread-sensitive", handler, url, requests, concurrency)
+            for size in POOL_SIZES:
+                with override_settings(
+                    THREAD_POOL_VIEW_PATHS=["/bench/"], VIEW_THREAD_POOL_SIZE=size
+                ):
+                    reset_view_thread_pool()
+                    bench(f"{url} pool of {size}", handler, url, requests, concurrency)
+                    stats = get_view_thread_pool().stats()
+                    print(
+                        f"{'':<4}saturated {stats['saturated']:,}"
+                        f"  peak queued {stats['peak_queued']}"
+                        f"  avg wait {stats['avg_wait_ms']:.2f} ms"
+                        f"  avg run {stats['avg_run_ms']:.2f} ms"
+                    )
+            reset_view_thread_pool()
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 32,
+    )
@@ -0,0 +1,437 @@
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from django_redis.cache import RedisCache
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.connection import ConnectionProxy
+
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class LRUCache:
+    """
+    A small thread-safe, per-process LRU cache with an optional TTL.
+    Use it in front of the shared Django cache for hot keys.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is MISSING:
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time. Callers that arrive while a call
+    is running wait for it and share its result instead of repeating it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event()}
+
+        if not leader:
+            call["done"].wait()
+            if "error" in call:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = function()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+class Pickled(bytes):
+    """An L1 value stored pickled so callers cannot mutate the cached copy"""
+
+
+# Values that can be handed out without copying
+IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+class TwoTierRedisCache(RedisCache):
+    """
+    A django-redis cache with a bounded per-process LRU (L1) in front of it.
+
+    Writes go to Redis and publish the changed keys on a pub/sub channel.
+    Each process listens on that channel in a daemon thread and drops those
+    keys from its L1, so reads that hit L1 never leave the process. L1 is
+    only used while the listener is subscribed, is cleared whenever it
+    reconnects, and its entries expire after `L1_TIMEOUT` seconds, which
+    bounds staleness if a message is lost.
+
+    Concurrent misses for the same key in a process share one Redis read,
+    and `get_or_set` computes a missing value in one process at a time.
+
+    Extra OPTIONS: `L1_MAX_ENTRIES` (10,000), `L1_TIMEOUT` (60 seconds),
+    `INVALIDATION_CHANNEL` and `LOCK_TIMEOUT` (10 seconds, how long other
+    processes wait for a value being computed).
+    """
+
+    RECONNECT_DELAY = 1
+    LOCK_POLL_INTERVAL = 0.05
+
+    def __init__(self, server, params):
+        options = dict(params.get("OPTIONS", {}))
+        self.l1_max_entries = options.pop("L1_MAX_ENTRIES", 10_000)
+        self.l1_timeout = options.pop("L1_TIMEOUT", 60)
+        self.lock_timeout = options.pop("LOCK_TIMEOUT", 10)
+        channel = options.pop("INVALIDATION_CHANNEL", None)
+        super().__init__(server, {**params, "OPTIONS": options})
+
+        self.channel = channel or f"{self.key_prefix}:cache:invalidate"
+        self.l1 = LRUCache(maxsize=self.l1_max_entries, ttl=self.l1_timeout)
+        self.single_flight = SingleFlight()
+        self._listener_lock = threading.Lock()
+        self._pid = None
+
+    # Listener
+
+    def start_listener(self):
+        """
+        Start the invalidation listener of this process if it is not running.
+        Forked processes do not inherit the thread, so it is started per pid.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.sender = uuid.uuid4().hex
+            # Bumped on every invalidation, so reads that raced one are not
+            # stored in L1
+            self.epoch = 0
+            self.listening = False
+            self.l1.clear()
+            self._stopped = threading.Event()
+            self._pubsub = None
+            threading.Thread(
+                target=self._listen, name="cache-invalidation", daemon=True
+            ).start()
+
+    def stop_listener(self):
+        self._stopped.set()
+        self.listening = False
+        self.l1.clear()
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            try:
+                self._pubsub = self.client.get_client().pubsub()
+                self._pubsub.subscribe(self.channel)
+                while not self._stopped.is_set():
+                    message = self._pubsub.get_message(timeout=1)
+                    if message is None:
+                        continue
+                    if message["type"] == "subscribe":
+                        # Anything may have changed while unsubscribed
+                        self.l1.clear()
+                        self.listening = True
+                    elif message["type"] == "message":
+                        self._receive(message["data"])
+            except Exception:
+                if not self._stopped.is_set():
+                    logger.warning("Cache invalidation listener failed", exc_info=True)
+            finally:
+                self.listening = False
+                self.epoch += 1
+                self.l1.clear()
+            self._stopped.wait(self.RECONNECT_DELAY)
+
+    def _receive(self, data):
+        message = json.loads(data)
+        if message["sender"] == self.sender:
+            return
+        self.epoch += 1
+        if message.get("clear"):
+            self.l1.clear()
+        else:
+            self.l1.delete_many(message["keys"])
+
+    def _invalidate(self, keys=None):
+        """
+        Drop keys from L1 here and, through Redis, in every other process.
+        Without keys the whole L1 is dropped.
+        """
+        self.start_listener()
+        self.epoch += 1
+        if keys is None:
+            self.l1.clear()
+            message = {"sender": self.sender, "clear": True}
+        else:
+            keys = [str(key) for key in keys]
+            self.l1.delete_many(keys)
+            message = {"sender": self.sender, "keys": keys}
+        self.client.get_client().publish(self.channel, json.dumps(message))
+
+    # L1
+
+    def _l1_key(self, key, version=None):
+        return str(self.client.make_key(key, version=version))
+
+    def _l1_get(self, key):
+        if not self.listening:
+            return MISSING
+        value = self.l1.get(key, MISSING)
+        if isinstance(value, Pickled):
+            return pickle.loads(value)
+        return value
+
+    def _l1_set(self, key, value, epoch, timeout=DEFAULT_TIMEOUT):
+        if not self.listening or epoch != self.epoch:
+            return
+        ttl = self.l1_timeout
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is not None:
+            ttl = min(ttl, timeout)
+        if not isinstance(value, IMMUTABLE_TYPES):
+            value = Pickled(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        self.l1.set(key, value, ttl)
+
+    # Reads
+
+    def get_local(self, key, version=None):
+        """
+        Return the value from L1, or MISSING. Never reads Redis.
+        """
+        self.start_listener()
+        return self._l1_get(self._l1_key(key, version))
+
+    def get(self, key, default=None, version=None, client=None):
+        if client is not None:
+            return super().get(key, default, version, client)
+
+        self.start_listener()
+        l1_key = self._l1_key(key, version)
+        value = self._l1_get(l1_key)
+        if value is not MISSING:
+            return value
+
+        def fetch():
+            epoch = self.epoch
+            value = super(TwoTierRedisCache, self).get(key, MISSING, version)
+            if value is not MISSING:
+                self._l1_set(l1_key, value, epoch)
+            return value
+
+        value = self.single_flight.do(l1_key, fetch)
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        self.start_listener()
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._l1_get(self._l1_key(key, version))
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+
+        if missing:
+            epoch = self.epoch
+            fetched = super().get_many(missing, version=version)
+            for key, value in fetched.items():
+                self._l1_set(self._l1_key(key, version), value, epoch)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None, client=None):
+        self.start_listener()
+        if self._l1_get(self._l1_key(key, version)) is not MISSING:
+            return True
+        return super().has_key(key, version=version, client=client)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Return the cached value, computing and storing `default` when missing.
+        Only one process computes a missing value at a time; the others wait
+        up to `LOCK_TIMEOUT` for it to appear before computing it themselves.
+        """
+        value = self.get(key, MISSING, version=version)
+        if value is not MISSING:
+            return value
+
+        def compute():
+            lock_key = self.client.make_key(f"{key}:lock", version=version)
+            token = uuid.uuid4().hex
+            redis = self.client.get_client()
+            acquired = redis.set(lock_key, token, nx=True, px=self.lock_timeout * 1000)
+            try:
+                if not acquired:
+                    deadline = time.monotonic() + self.lock_timeout
+                    while time.monotonic() < deadline:
+                        time.sleep(self.LOCK_POLL_INTERVAL)
+                        value = self.get(key, MISSING, version=version)
+                        if value is not MISSING:
+                            return value
+
+                value = default() if callable(default) else default
+                self.set(key, value, timeout=timeout, version=version)
+                return value
+            finally:
+                if acquired and redis.get(lock_key) == token.encode():
+                    redis.delete(lock_key)
+
+        return self.single_flight.do(
+            ("get_or_set", self._l1_key(key, version)), compute
+        )
+
+    # Writes
+
+    def set(
+        self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None, **kwargs
+    ):
+        result = super().set(
+            key, value, timeout, version=version, client=client, **kwargs
+        )
+        l1_key = self._l1_key(key, version)
+        self._invalidate([l1_key])
+        if result and client is None:
+            self._l1_set(l1_key, value, self.epoch, timeout)
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        result = super().add(key, value, timeout, version=version, client=client)
+        if result:
+            self._invalidate([self._l1_key(key, version)])
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        result = super().set_many(data, timeout, version=version, client=client)
+        self._invalidate([self._l1_key(key, version) for key in data])
+        return result
+
+    def delete(self, key, version=None, prefix=None, client=None):
+        result = super().delete(key, version=version, prefix=prefix, client=client)
+        self._invalidate([self._l1_key(key, version)])
+        return result
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        result = super().delete_many(keys, version=version)
+        self._invalidate([self._l1_key(key, version) for key in keys])
+        return result
+
+    def incr(self, key, delta=1, version=None, client=None, ignore_key_check=False):
+        result = super().incr(
+            key,
+            delta,
+            version=version,
+            client=client,
+            ignore_key_check=ignore_key_check,
+        )
+        self._invalidate([self._l1_key(key, version)])
+        return result
+
+    def decr(self, key, delta=1, version=None, client=None):
+        result = super().decr(key, delta, version=version, client=client)
+        self._invalidate([self._l1_key(key, version)])
+        return result
+
+    def incr_version(self, key, delta=1, version=None, client=None):
+        version = self.version if version is None else version
+        result = super().incr_version(key, delta, version=version, client=client)
+        self._invalidate(
+            [self._l1_key(key, version), self._l1_key(key, version + delta)]
+        )
+        return result
+
+    def delete_pattern(self, *args, **kwargs):
+        result = super().delete_pattern(*args, **kwargs)
+        self._invalidate()
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self._invalidate()
+        return result
+
+
+def get_local(cache, key):
+    """
+    Return the cached value if it can be read without leaving the process,
+    or MISSING. Async code reads hot keys this way on the event loop and
+    only falls back to a thread on a miss.
+
+    The two-tier cache answers from its L1, which writes in any process
+    invalidate; a local-memory cache lives in the process anyway. Other
+    backends always miss.
+    """
+    if isinstance(cache, ConnectionProxy):
+        # `django.core.cache.cache`
+        cache = cache._connections[cache._alias]
+    if isinstance(cache, TwoTierRedisCache):
+        return cache.get_local(key)
+    if isinstance(cache, LocMemCache):
+        return cache.get(key, MISSING)
+    return MISSING
@@ -0,0 +1,101 @@
+"""
+A process-local snapshot of the Constance settings.
+
+Reading `constance.config.KEY` with the database backend costs a query per
+key, and a write for keys never saved. The snapshot loads every value in one
+query, parses JSON values once, and is shared by all threads of the process.
+
+Each snapshot carries the version held in the shared cache. Saving a value
+bumps that version, so every process reloads on its next read. Snapshots
+also expire after `CONFIG_SNAPSHOT_TTL` seconds, which bounds staleness when
+the cache is per-process.
+"""
+
+import hashlib
+import json
+import logging
+import time
+import uuid
+from functools import cached_property
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+CONFIG_VERSION_CACHE_KEY = "core:config_version"
+CONFIG_SNAPSHOT_TTL = 60
+
+snapshot = None
+
+
+def parse_value(key: str, value: Any) -> Any:
+    """
+    Return JSON objects stored as strings as dicts and anything else as is.
+    """
+    if isinstance(value, str) and value.lstrip().startswith("{"):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError as e:
+            logger.error("Error decoding JSON for key %s: %s", key, e)
+    return value
+
+
+class ConfigSnapshot:
+    def __init__(self, version: str, values: dict[str, Any]):
+        self.version = version
+        self.values = values
+        self.parsed = {key: parse_value(key, value) for key, value in values.items()}
+        self.loaded_at = time.monotonic()
+
+    def is_current(self, version: str) -> bool:
+        return (
+            self.version == version
+            and time.monotonic() - self.loaded_at < CONFIG_SNAPSHOT_TTL
+        )
+
+    @cached_property
+    def public_values(self) -> list[tuple[str, Any]]:
+        """The (key, value) pairs the API may expose"""
+        return [
+            (key, value)
+            for key, value in self.values.items()
+            if key not in settings.EXCLUDED_KEYS_FOR_API
+        ]
+
+    @cached_property
+    def public_etag(self) -> str:
+        content = json.dumps(self.public_values, sort_keys=True, default=str)
+        return f'"{hashlib.sha1(content.encode()).hexdigest()}"'
+
+
+def get_config_version() -> str:
+    version = cache.get(CONFIG_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(CONFIG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CONFIG_VERSION_CACHE_KEY)
+    return version
+
+
+def bump_config_version():
+    """
+    Make every process reload its snapshot on its next read.
+    """
+    global snapshot
+
+    cache.set(CONFIG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+    snapshot = None
+
+
+def get_config_snapshot() -> ConfigSnapshot:
+    global snapshot
+
+    version = get_config_version()
+    current = snapshot
+    if current is None or not current.is_current(version):
+        from constance.utils import get_values
+
+        current = snapshot = ConfigSnapshot(version, get_values())
+    return current
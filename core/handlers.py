@@ -0,0 +1,183 @@
+"""
+Request handlers that run a reduced middleware chain for some paths.
+
+`settings.MIDDLEWARE` stays the full chain: Django, the admin and allauth
+check it, and it serves every path not listed below. Requests whose path
+starts with one of `REDUCED_MIDDLEWARE_PATHS` go through
+`REDUCED_MIDDLEWARE` instead, unless the path also starts with one of
+`FULL_MIDDLEWARE_PATHS`, which always wins.
+
+The reduced chain suits API views and health checks, which need neither
+the messages nor the CSRF middleware: DRF views are CSRF exempt and
+`SessionAuthentication` enforces CSRF itself. It must keep the session and
+authentication middleware for `SessionAuthentication` to find the logged in
+user; both are lazy, so token-authenticated requests never load a session.
+
+Under ASGI, sync views under `THREAD_POOL_VIEW_PATHS` also run on the view
+thread pool from `core.thread_pool` instead of the single thread-sensitive
+thread.
+"""
+
+from asgiref.sync import iscoroutinefunction
+
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+from core.thread_pool import pooled_view, uses_thread_pool
+
+
+class PooledViewsMixin:
+    """
+    Run sync views under `THREAD_POOL_VIEW_PATHS` on the view thread pool
+    when serving asynchronously.
+    """
+
+    pool_views = False
+
+    def load_middleware(self, is_async=False):
+        super().load_middleware(is_async)
+        self.pool_views = is_async
+
+    def resolve_request(self, request):
+        match = super().resolve_request(request)
+        if (
+            self.pool_views
+            and uses_thread_pool(request.path_info)
+            and not iscoroutinefunction(match.func)
+        ):
+            match.func = pooled_view(match.func)
+        return match
+
+
+class MiddlewareChainHandler(PooledViewsMixin, BaseHandler):
+    """
+    A handler for an explicit list of middleware.
+
+    Same as `BaseHandler.load_middleware`, which always reads
+    `settings.MIDDLEWARE`.
+    """
+
+    def __init__(self, middleware: list[str]):
+        self.middleware = middleware
+
+    def load_middleware(self, is_async=False):
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        get_response = self._get_response_async if is_async else self._get_response
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(self.middleware):
+            middleware = import_string(middleware_path)
+            middleware_can_sync = getattr(middleware, "sync_capable", True)
+            middleware_can_async = getattr(middleware, "async_capable", False)
+            if not middleware_can_sync and not middleware_can_async:
+                raise RuntimeError(
+                    "Middleware %s must have at least one of "
+                    "sync_capable/async_capable set to True." % middleware_path
+                )
+            elif not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
+            try:
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async,
+                    handler,
+                    handler_is_async,
+                    debug=settings.DEBUG,
+                    name="middleware %s" % middleware_path,
+                )
+                mw_instance = middleware(adapted_handler)
+            except MiddlewareNotUsed:
+                continue
+            handler = adapted_handler
+
+            if mw_instance is None:
+                raise ImproperlyConfigured(
+                    "Middleware factory %s returned None." % middleware_path
+                )
+
+            if hasattr(mw_instance, "process_view"):
+                self._view_middleware.insert(
+                    0, self.adapt_method_mode(is_async, mw_instance.process_view)
+                )
+            if hasattr(mw_instance, "process_template_response"):
+                self._template_response_middleware.append(
+                    self.adapt_method_mode(
+                        is_async, mw_instance.process_template_response
+                    )
+                )
+            if hasattr(mw_instance, "process_exception"):
+                self._exception_middleware.append(
+                    self.adapt_method_mode(False, mw_instance.process_exception)
+                )
+
+            handler = convert_exception_to_response(mw_instance)
+            handler_is_async = middleware_is_async
+
+        handler = self.adapt_method_mode(is_async, handler, handler_is_async)
+        self._middleware_chain = handler
+        self.pool_views = is_async
+
+
+def uses_reduced_middleware(path: str) -> bool:
+    if path.startswith(tuple(settings.FULL_MIDDLEWARE_PATHS)):
+        return False
+    return path.startswith(tuple(settings.REDUCED_MIDDLEWARE_PATHS))
+
+
+class PathDispatchMixin(PooledViewsMixin):
+    """
+    Send requests for reduced paths through `REDUCED_MIDDLEWARE`, and every
+    other request through the handler's own, full, chain.
+    """
+
+    reduced_handler = None
+
+    def load_middleware(self, is_async=False):
+        super().load_middleware(is_async)
+        reduced_handler = MiddlewareChainHandler(settings.REDUCED_MIDDLEWARE)
+        reduced_handler.load_middleware(is_async)
+        self.reduced_handler = reduced_handler
+
+    def get_response(self, request):
+        if uses_reduced_middleware(request.path_info):
+            return self.reduced_handler.get_response(request)
+        return super().get_response(request)
+
+    async def get_response_async(self, request):
+        if uses_reduced_middleware(request.path_info):
+            return await self.reduced_handler.get_response_async(request)
+        return await super().get_response_async(request)
+
+
+class PathDispatchWSGIHandler(PathDispatchMixin, WSGIHandler):
+    pass
+
+
+class PathDispatchASGIHandler(PathDispatchMixin, ASGIHandler):
+    pass
+
+
+def get_wsgi_application():
+    """
+    Same as `django.core.wsgi.get_wsgi_application`, with path dispatch.
+    """
+    django.setup(set_prefix=False)
+    return PathDispatchWSGIHandler()
+
+
+def get_asgi_application():
+    """
+    Same as `django.core.asgi.get_asgi_application`, with path dispatch.
+    """
+    django.setup(set_prefix=False)
+    return PathDispatchASGIHandler()
@@ -0,0 +1,112 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:10
+
+import django.utils.timezone
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="QueuedEmail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                (
+                    "subject",
+                    models.CharField(
+                        blank=True, max_length=998, verbose_name="Subject"
+                    ),
+                ),
+                ("body", models.TextField(blank=True, verbose_name="Body")),
+                ("html_body", models.TextField(blank=True, verbose_name="HTML body")),
+                (
+                    "from_email",
+                    models.CharField(blank=True, max_length=254, verbose_name="From"),
+                ),
+                ("to", models.JSONField(default=list, verbose_name="To")),
+                ("cc", models.JSONField(blank=True, default=list, verbose_name="Cc")),
+                ("bcc", models.JSONField(blank=True, default=list, verbose_name="Bcc")),
+                (
+                    "reply_to",
+                    models.JSONField(blank=True, default=list, verbose_name="Reply to"),
+                ),
+                (
+                    "headers",
+                    models.JSONField(blank=True, default=dict, verbose_name="Headers"),
+                ),
+                (
+                    "attachments",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="(filename, base64 content, mimetype) triples",
+                        verbose_name="Attachments",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("SENT", "Sent"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="PENDING",
+                        max_length=50,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="Attempts"),
+                ),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="The email is not sent before this time",
+                        verbose_name="Next attempt at",
+                    ),
+                ),
+                (
+                    "sent_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Sent at"),
+                ),
+                ("last_error", models.TextField(blank=True, verbose_name="Last error")),
+            ],
+            options={
+                "get_latest_by": "modified",
+                "abstract": False,
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"], name="core_email_due_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,4 +1,142 @@
+import base64
+from datetime import timedelta
+
+from django_extensions.db.models import TimeStampedModel
+
+from django.core.mail import EmailMultiAlternatives
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
 OPTIONAL = {
     "blank": True,
     "null": True,
 }
+
+
+class QueuedEmailQuerySet(models.QuerySet):
+    def due(self):
+        return self.filter(
+            status=QueuedEmail.StatusType.PENDING, next_attempt_at__lte=timezone.now()
+        )
+
+
+class QueuedEmail(TimeStampedModel):
+    """
+    An email waiting in the outbox. Request handlers render the message and
+    store it here; `core.tasks.send_queued_emails` delivers it.
+    """
+
+    class StatusType(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        SENT = "SENT", _("Sent")
+        FAILED = "FAILED", _("Failed")
+
+    subject = models.CharField(_("Subject"), max_length=998, blank=True)
+    body = models.TextField(_("Body"), blank=True)
+    html_body = models.TextField(_("HTML body"), blank=True)
+    from_email = models.CharField(_("From"), max_length=254, blank=True)
+    to = models.JSONField(_("To"), default=list)
+    cc = models.JSONField(_("Cc"), default=list, blank=True)
+    bcc = models.JSONField(_("Bcc"), default=list, blank=True)
+    reply_to = models.JSONField(_("Reply to"), default=list, blank=True)
+    headers = models.JSONField(_("Headers"), default=dict, blank=True)
+    attachments = models.JSONField(
+        _("Attachments"),
+        default=list,
+        blank=True,
+        help_text=_("(filename, base64 content, mimetype) triples"),
+    )
+    status = models.CharField(
+        _("Status"),
+        choices=StatusType.choices,
+        default=StatusType.PENDING,
+        max_length=50,
+    )
+    attempts = models.PositiveIntegerField(_("Attempts"), default=0)
+    next_attempt_at = models.DateTimeField(
+        _("Next attempt at"),
+        default=timezone.now,
+        help_text=_("The email is not sent before this time"),
+    )
+    sent_at = models.DateTimeField(_("Sent at"), **OPTIONAL)
+    last_error = models.TextField(_("Last error"), blank=True)
+
+    objects = QueuedEmailQuerySet.as_manager()
+
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            # Serves the outbox scan for due emails
+            models.Index(
+                fields=["status", "next_attempt_at"], name="core_email_due_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+    @classmethod
+    def from_message(cls, message):
+        """
+        Return an unsaved queued email holding a copy of `message`.
+        """
+        html_body = ""
+        for content, mimetype in getattr(message, "alternatives", []):
+            if mimetype == "text/html":
+                html_body = content
+        if message.content_subtype == "html":
+            html_body, body = message.body, ""
+        else:
+            body = message.body
+
+        attachments = []
+        for attachment in message.attachments:
+            if not isinstance(attachment, tuple):
+                raise ValueError(
+                    "Only (filename, content, mimetype) attachments can be queued."
+                )
+            filename, content, mimetype = attachment
+            if isinstance(content, str):
+                content = content.encode()
+            attachments.append(
+                (filename, base64.b64encode(content).decode("ascii"), mimetype)
+            )
+
+        return cls(
+            subject=message.subject,
+            body=body,
+            html_body=html_body,
+            from_email=message.from_email,
+            to=list(message.to),
+            cc=list(message.cc),
+            bcc=list(message.bcc),
+            reply_to=list(message.reply_to),
+            headers=message.extra_headers,
+            attachments=attachments,
+        )
+
+    def to_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            cc=self.cc,
+            bcc=self.bcc,
+            reply_to=self.reply_to,
+            headers=self.headers,
+            connection=connection,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, "text/html")
+        for filename, content, mimetype in self.attachments:
+            message.attach(filename, base64.b64decode(content), mimetype)
+        return message
+
+    def get_retry_delay(self, base_delay):
+        """
+        Return how long to wait before the next attempt, doubling with each
+        failed attempt.
+        """
+        return timedelta(seconds=base_delay * 2 ** max(self.attempts - 1, 0))
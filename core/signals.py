@@ -0,0 +1,13 @@
+from constance.models import Constance
+from constance.signals import config_updated
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.config import bump_config_version
+
+
+@receiver(config_updated)
+@receiver(post_save, sender=Constance)
+@receiver(post_delete, sender=Constance)
+def invalidate_config_snapshot(sender, **kwargs):
+    bump_config_version()
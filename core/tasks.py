@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import QueuedEmail
+
+
+logger = logging.getLogger(__name__)
+
+# How long claimed emails stay hidden from other workers. Emails claimed by a
+# worker that died mid-batch are picked up again after this, so delivery is
+# at least once.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def claim_emails(batch_size):
+    """
+    Claim up to `batch_size` due emails for this worker and count the attempt.
+    """
+    with transaction.atomic():
+        emails = list(
+            QueuedEmail.objects.due()
+            .select_for_update(skip_locked=True)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        QueuedEmail.objects.filter(id__in=[email.id for email in emails]).update(
+            next_attempt_at=timezone.now() + CLAIM_TIMEOUT,
+            attempts=F("attempts") + 1,
+        )
+    for email in emails:
+        email.attempts += 1
+    return emails
+
+
+def record_failure(email, error):
+    """
+    Schedule another attempt with exponential backoff, or give up on the
+    email once it has used up its attempts.
+    """
+    email.last_error = repr(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = QueuedEmail.StatusType.FAILED
+        logger.error("Giving up on email %s: %r", email.id, error)
+    else:
+        email.next_attempt_at = timezone.now() + email.get_retry_delay(
+            settings.EMAIL_OUTBOX_RETRY_DELAY
+        )
+        logger.warning("Email %s failed, retrying later: %r", email.id, error)
+    email.save(update_fields=["status", "next_attempt_at", "last_error", "modified"])
+
+
+def send_batch(connection, emails):
+    """
+    Send `emails` over the already open `connection` and return how many
+    were sent. Raises if the connection is lost and cannot be reopened.
+    """
+    sent = []
+    try:
+        for index, email in enumerate(emails):
+            try:
+                email.to_message(connection).send()
+            except Exception as e:
+                record_failure(email, e)
+                # The connection may be broken, so start the rest on a new one
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    unsent = index + 1
+                    for email in emails[unsent:]:
+                        record_failure(email, e)
+                    raise
+            else:
+                sent.append(email.id)
+    finally:
+        QueuedEmail.objects.filter(id__in=sent).update(
+            status=QueuedEmail.StatusType.SENT,
+            sent_at=timezone.now(),
+            last_error="",
+            modified=timezone.now(),
+        )
+    return len(sent)
+
+
+def get_retry_countdown(task):
+    return settings.EMAIL_OUTBOX_RETRY_DELAY * 2**task.request.retries
+
+
+# Beat keeps draining the outbox once these retries are used up
+@shared_task(bind=True, max_retries=3)
+def send_queued_emails(self):
+    """
+    Drain the outbox in batches, each over one SMTP connection.
+
+    Runs after emails are queued and periodically from beat, which also
+    picks up emails whose retry delay has passed.
+    """
+    batch_size = settings.EMAIL_OUTBOX_BATCH_SIZE
+    total = 0
+    while True:
+        emails = claim_emails(batch_size)
+        if not emails:
+            break
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            for email in emails:
+                record_failure(email, e)
+            raise self.retry(exc=e, countdown=get_retry_countdown(self))
+
+        try:
+            total += send_batch(connection, emails)
+        except Exception as e:
+            raise self.retry(exc=e, countdown=get_retry_countdown(self))
+        finally:
+            connection.close()
+
+        if len(emails) < batch_size:
+            break
+    return total
@@ -0,0 +1,175 @@
+import threading
+import time
+import uuid
+from unittest import mock
+
+import pytest
+from django_redis.cache import RedisCache
+
+from core.cache import MISSING, SingleFlight, TwoTierRedisCache, get_local
+from core.tests.helpers import wait_for
+
+
+def count_redis_gets():
+    return mock.patch.object(RedisCache, "get", autospec=True, wraps=RedisCache.get)
+
+
+class TestTwoTierRedisCache:
+    def test_reads_are_served_from_memory(self, make_cache):
+        cache = make_cache()
+        cache.set("key", "value")
+        assert cache.get("missing", "default") == "default"
+
+        with count_redis_gets() as redis_get:
+            for _ in range(10):
+                assert cache.get("key") == "value"
+                assert cache.get_many(["key"]) == {"key": "value"}
+                assert cache.has_key("key")
+        assert redis_get.call_count == 0
+
+    def test_writes_invalidate_other_processes(self, make_cache):
+        cache, other = make_cache(), make_cache()
+        cache.set("key", "old")
+        assert other.get("key") == "old"
+
+        cache.set("key", "new")
+        wait_for(lambda: other.get("key") == "new")
+
+        cache.delete("key")
+        wait_for(lambda: other.get("key") is None)
+
+        cache.set_many({"a": 1, "b": 2})
+        assert other.get_many(["a", "b"]) == {"a": 1, "b": 2}
+        cache.incr("a")
+        wait_for(lambda: other.get("a") == 2)
+
+        cache.clear()
+        wait_for(lambda: other.get("b") is None)
+
+    def test_get_local_never_reads_redis(self, make_cache):
+        cache, other = make_cache(), make_cache()
+        cache.set("key", "value")
+
+        with count_redis_gets() as redis_get:
+            assert get_local(cache, "key") == "value"
+            assert get_local(other, "key") is MISSING
+        assert redis_get.call_count == 0
+
+        # A write in another process drops the local copy
+        assert other.get("key") == "value"
+        assert get_local(other, "key") == "value"
+        cache.delete("key")
+        wait_for(lambda: get_local(other, "key") is MISSING)
+
+    def test_get_local_reads_the_default_cache(self):
+        from django.core.cache import cache
+
+        cache.set("key", "value")
+        assert get_local(cache, "key") == "value"
+        cache.delete("key")
+        assert get_local(cache, "key") is MISSING
+
+    def test_cached_objects_cannot_be_mutated(self, make_cache):
+        cache = make_cache()
+        cache.set("key", {"items": [1]})
+
+        cache.get("key")["items"].append(2)
+
+        assert cache.get("key") == {"items": [1]}
+
+    def test_memory_entries_expire(self, make_cache):
+        cache = make_cache(L1_TIMEOUT=30)
+        cache.set("key", "value")
+        expires_at = time.monotonic() + 30
+
+        with count_redis_gets() as redis_get:
+            with mock.patch("core.cache.time.monotonic", return_value=expires_at):
+                assert cache.get("key") == "value"
+        assert redis_get.call_count == 1
+
+    def test_memory_is_skipped_while_not_listening(self, make_cache):
+        cache = make_cache()
+        cache.set("key", "value")
+        cache.stop_listener()
+
+        with count_redis_gets() as redis_get:
+            assert cache.get("key") == "value"
+        assert redis_get.call_count == 1
+
+    def test_concurrent_misses_share_one_read(self, make_cache):
+        cache, other = make_cache(), make_cache()
+        other.set("key", "value")
+        original_get = RedisCache.get
+
+        def slow_get(*args, **kwargs):
+            time.sleep(0.1)
+            return original_get(*args, **kwargs)
+
+        with mock.patch.object(
+            RedisCache, "get", autospec=True, side_effect=slow_get
+        ) as redis_get:
+            threads = [
+                threading.Thread(target=cache.get, args=("key",)) for _ in range(10)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert redis_get.call_count == 1
+
+    def test_get_or_set_computes_once_across_processes(self, make_cache):
+        caches = [make_cache(), make_cache()]
+        computed = []
+
+        def compute():
+            computed.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda cache=cache: results.append(
+                    cache.get_or_set("key", compute)
+                )
+            )
+            for cache in caches * 3
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["value"] * 6
+        assert len(computed) == 1
+
+
+class TestSingleFlight:
+    def test_errors_reach_every_caller(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError("boom")
+
+        def call():
+            try:
+                flight.do("key", fail)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        assert len(errors) == 2
+        # The failed call is not remembered
+        assert flight.do("key", lambda: "value") == "value"
@@ -0,0 +1,63 @@
+import json
+from unittest import mock
+
+import pytest
+from constance import config
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core import config as core_config
+from core.config import get_config_snapshot
+from test_install_chat.utils import get_constance_value
+
+
+@pytest.mark.django_db
+class TestConfigSnapshot:
+    def test_loads_all_values_in_one_query(self):
+        core_config.snapshot = None
+
+        with CaptureQueriesContext(connection) as queries:
+            snapshot = get_config_snapshot()
+            for key in snapshot.values:
+                get_constance_value(key)
+            assert get_config_snapshot() is snapshot
+
+        assert len(queries) == 1
+        assert snapshot.values["FACEBOOK_URL"] == ""
+
+    def test_json_values_are_parsed_once(self):
+        config.APPLE_SETTINGS = json.dumps({"team_id": "TEAM"})
+
+        with mock.patch("core.config.json.loads", wraps=json.loads) as loads:
+            assert get_constance_value("APPLE_SETTINGS") == {"team_id": "TEAM"}
+            assert get_constance_value("APPLE_SETTINGS") == {"team_id": "TEAM"}
+
+        assert loads.call_count == 1
+        assert get_constance_value("FACEBOOK_URL") == ""
+
+    def test_saving_a_value_refreshes_the_snapshot(self):
+        snapshot = get_config_snapshot()
+
+        config.FACEBOOK_URL = "https://facebook.com/example"
+
+        assert get_config_snapshot() is not snapshot
+        assert get_config_snapshot().values["FACEBOOK_URL"] == (
+            "https://facebook.com/example"
+        )
+
+    def test_version_change_in_another_process(self):
+        snapshot = get_config_snapshot()
+
+        # Another process bumped the shared version
+        core_config.cache.set(core_config.CONFIG_VERSION_CACHE_KEY, "other")
+
+        assert get_config_snapshot() is not snapshot
+
+    def test_snapshot_expires(self):
+        snapshot = get_config_snapshot()
+
+        with mock.patch(
+            "core.config.time.monotonic",
+            return_value=snapshot.loaded_at + core_config.CONFIG_SNAPSHOT_TTL,
+        ):
+            assert get_config_snapshot() is not snapshot
@@ -0,0 +1,123 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.test.client import AsyncClientHandler, ClientHandler
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.handlers import PathDispatchMixin, uses_reduced_middleware
+
+
+class DispatchClientHandler(PathDispatchMixin, ClientHandler):
+    pass
+
+
+class DispatchAsyncClientHandler(PathDispatchMixin, AsyncClientHandler):
+    pass
+
+
+@pytest.fixture
+def dispatch_client():
+    client = APIClient()
+    client.handler = DispatchClientHandler(enforce_csrf_checks=False)
+    return client
+
+
+def uses_full_chain(response):
+    # XFrameOptionsMiddleware is only in the full chain
+    return "X-Frame-Options" in response.headers
+
+
+class TestPathDispatch:
+    @pytest.mark.parametrize(
+        "path, reduced",
+        [
+            ("/health/", True),
+            ("/api/v1/core/constance/", True),
+            ("/api/v1/auth/login/", False),
+            ("/api/v1/oauth2/token/", False),
+            ("/admin/", False),
+            ("/accounts/login/", False),
+            ("/api/docs/", False),
+        ],
+    )
+    def test_paths(self, path, reduced):
+        assert uses_reduced_middleware(path) is reduced
+
+    def test_full_paths_win_over_reduced_prefixes(self, settings):
+        settings.REDUCED_MIDDLEWARE_PATHS = ["/"]
+
+        assert uses_reduced_middleware("/api/v1/core/")
+        assert not uses_reduced_middleware("/admin/login/")
+
+    def test_health_uses_reduced_chain(self, dispatch_client):
+        response = dispatch_client.get(reverse("health"))
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+        assert not uses_full_chain(response)
+        assert "sessionid" not in response.cookies
+
+    @pytest.mark.django_db
+    def test_admin_uses_full_chain(self, dispatch_client):
+        response = dispatch_client.get(reverse("admin:login"))
+
+        assert response.status_code == 200
+        assert uses_full_chain(response)
+
+    @pytest.mark.django_db
+    def test_jwt_request_on_reduced_chain(self, dispatch_client, user):
+        token = RefreshToken.for_user(user).access_token
+        dispatch_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response = dispatch_client.get(reverse("v1:core:social-accounts-list"))
+
+        assert response.status_code == 200
+        assert not uses_full_chain(response)
+
+    @pytest.mark.django_db
+    def test_session_request_on_reduced_chain(self, dispatch_client, user):
+        dispatch_client.force_login(user)
+
+        response = dispatch_client.get(reverse("v1:core:social-accounts-list"))
+
+        assert response.status_code == 200
+        assert not uses_full_chain(response)
+
+    @pytest.mark.django_db
+    def test_session_request_on_reduced_chain_checks_csrf(self, user):
+        client = APIClient(enforce_csrf_checks=True)
+        client.handler = DispatchClientHandler(enforce_csrf_checks=True)
+        client.force_login(user)
+
+        response = client.post(reverse("v1:core:social-accounts-list"))
+
+        assert response.status_code == 403
+        assert "CSRF" in response.json()["detail"]
+
+    @pytest.mark.django_db
+    def test_anonymous_request_on_reduced_chain(self, dispatch_client):
+        response = dispatch_client.get(reverse("v1:core:social-accounts-list"))
+
+        assert response.status_code == 401
+        assert "sessionid" not in response.cookies
+
+    def test_not_found_on_reduced_chain(self, dispatch_client):
+        response = dispatch_client.get("/api/v1/missing/")
+
+        assert response.status_code == 404
+        assert not uses_full_chain(response)
+
+    @pytest.mark.django_db
+    def test_async_handler(self):
+        client = AsyncClient()
+        client.handler = DispatchAsyncClientHandler(enforce_csrf_checks=False)
+
+        response = async_to_sync(client.get)(reverse("health"))
+        assert response.status_code == 200
+        assert not uses_full_chain(response)
+
+        response = async_to_sync(client.get)(reverse("admin:login"))
+        assert response.status_code == 200
+        assert uses_full_chain(response)
@@ -0,0 +1,69 @@
+import datetime
+import io
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+from phonenumber_field.phonenumber import PhoneNumber
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from core.api.parsers import ORJSONParser
+from core.api.renderers import ORJSONRenderer
+
+
+def test_render_matches_json_renderer():
+    data = {
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "created": datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.UTC),
+        "birthday": datetime.date(1990, 1, 2),
+        "amount": Decimal("1.50"),
+        "label": gettext_lazy("Text"),
+        "phone_number": PhoneNumber.from_string("+639171234567"),
+        "results": [{"content": "héllo"}, None],
+        1: "non-string key",
+    }
+
+    rendered = ORJSONRenderer().render(data)
+
+    assert json.loads(rendered) == json.loads(
+        JSONRenderer().render({**data, "phone_number": str(data["phone_number"])})
+    )
+
+
+def test_render_indent():
+    rendered = ORJSONRenderer().render(
+        {"a": [1]}, "application/json; indent=4", {"indent": None}
+    )
+
+    assert rendered == b'{\n  "a": [\n    1\n  ]\n}'
+
+
+def test_render_none():
+    assert ORJSONRenderer().render(None) == b""
+
+
+def test_parse():
+    stream = io.BytesIO('{"content": "héllo", "ids": [1, 2]}'.encode())
+
+    assert ORJSONParser().parse(stream) == {"content": "héllo", "ids": [1, 2]}
+
+
+def test_parse_error():
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b'{"content": '))
+
+
+@pytest.mark.django_db
+def test_api_uses_orjson(client):
+    response = client.post(
+        reverse("v1:rest_login"), "{not json", content_type="application/json"
+    )
+
+    assert response.status_code == 400
+    assert response["Content-Type"] == "application/json"
+    assert response.json()["detail"].startswith("JSON parse error")
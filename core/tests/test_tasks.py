@@ -0,0 +1,166 @@
+import smtplib
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
+
+from core.models import QueuedEmail
+from core.tasks import send_queued_emails
+from core.utils import queue_email
+
+
+def make_email(to="to@example.com", **kwargs):
+    email = EmailMultiAlternatives(
+        subject=kwargs.pop("subject", "subject"),
+        body="body",
+        from_email="from@example.com",
+        to=[to],
+        **kwargs,
+    )
+    email.attach_alternative("<p>body</p>", "text/html")
+    return email
+
+
+@pytest.mark.django_db
+class TestQueueEmail:
+    def test_queues_without_sending(
+        self, mailoutbox, django_capture_on_commit_callbacks
+    ):
+        with mock.patch("core.utils.send_queued_emails.delay") as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                queue_email(make_email())
+                # The worker is only told after the transaction commits
+                delay.assert_not_called()
+
+        delay.assert_called_once_with()
+        assert len(mailoutbox) == 0
+        assert QueuedEmail.objects.get().status == QueuedEmail.StatusType.PENDING
+
+    def test_dispatch_failure_keeps_email(self, django_capture_on_commit_callbacks):
+        with mock.patch(
+            "core.utils.send_queued_emails.delay", side_effect=OSError("no broker")
+        ):
+            with django_capture_on_commit_callbacks(execute=True):
+                queue_email(make_email())
+
+        assert QueuedEmail.objects.due().count() == 1
+
+    def test_round_trip(self):
+        email = make_email(cc=["cc@example.com"], bcc=["bcc@example.com"])
+        email.attach("data.bin", b"\x00\xff", "application/octet-stream")
+        email.attach("notes.txt", "notes", "text/plain")
+        queue_email(email)
+
+        message = QueuedEmail.objects.get().to_message()
+
+        assert message.subject == "subject"
+        assert message.body == "body"
+        assert message.alternatives[0][:2] == ("<p>body</p>", "text/html")
+        assert message.recipients() == [
+            "to@example.com",
+            "cc@example.com",
+            "bcc@example.com",
+        ]
+        assert message.attachments[0][:3] == (
+            "data.bin",
+            b"\x00\xff",
+            "application/octet-stream",
+        )
+        assert message.attachments[1][:3] == ("notes.txt", "notes", "text/plain")
+
+
+@pytest.mark.django_db
+class TestSendQueuedEmails:
+    def test_sends_in_batches_over_one_connection(self, settings, mailoutbox):
+        settings.EMAIL_OUTBOX_BATCH_SIZE = 2
+        for i in range(5):
+            queue_email(make_email(to=f"user{i}@example.com"))
+
+        with mock.patch(
+            "core.tasks.get_connection", wraps=mail.get_connection
+        ) as get_connection:
+            assert send_queued_emails() == 5
+
+        assert get_connection.call_count == 3
+        assert sorted(email.to[0] for email in mailoutbox) == [
+            f"user{i}@example.com" for i in range(5)
+        ]
+        assert not QueuedEmail.objects.exclude(status=QueuedEmail.StatusType.SENT)
+        assert send_queued_emails() == 0
+
+    def test_failed_email_is_retried_with_backoff(self, settings, mailoutbox):
+        settings.EMAIL_OUTBOX_RETRY_DELAY = 60
+        queue_email(make_email(to="bad@example.com"))
+        queue_email(make_email(to="good@example.com"))
+
+        original = mail.backends.locmem.EmailBackend.send_messages
+
+        def send_messages(backend, messages):
+            if messages[0].to == ["bad@example.com"]:
+                raise smtplib.SMTPRecipientsRefused({})
+            return original(backend, messages)
+
+        with mock.patch.object(
+            mail.backends.locmem.EmailBackend, "send_messages", send_messages
+        ):
+            assert send_queued_emails() == 1
+
+        assert [email.to for email in mailoutbox] == [["good@example.com"]]
+        failed = QueuedEmail.objects.get(to=["bad@example.com"])
+        assert failed.status == QueuedEmail.StatusType.PENDING
+        assert failed.attempts == 1
+        assert "SMTPRecipientsRefused" in failed.last_error
+        assert failed.next_attempt_at > timezone.now() + timedelta(seconds=50)
+
+        # Each further failure doubles the delay
+        failed.attempts = 3
+        assert failed.get_retry_delay(60) == timedelta(seconds=240)
+
+        # Once the delay is over the email goes out
+        QueuedEmail.objects.filter(id=failed.id).update(next_attempt_at=timezone.now())
+        assert send_queued_emails() == 1
+        assert mailoutbox[-1].to == ["bad@example.com"]
+
+    def test_gives_up_after_max_attempts(self, settings, mailoutbox):
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        queue_email(make_email())
+        QueuedEmail.objects.update(attempts=1)
+
+        with mock.patch.object(
+            mail.backends.locmem.EmailBackend,
+            "send_messages",
+            side_effect=smtplib.SMTPDataError(554, "rejected"),
+        ):
+            assert send_queued_emails() == 0
+
+        email = QueuedEmail.objects.get()
+        assert email.status == QueuedEmail.StatusType.FAILED
+        assert email.attempts == 2
+        assert len(mailoutbox) == 0
+
+    def test_unreachable_server_retries_task(self, mailoutbox):
+        queue_email(make_email())
+
+        with mock.patch.object(
+            mail.backends.locmem.EmailBackend,
+            "open",
+            side_effect=ConnectionRefusedError,
+        ):
+            # Called directly, `retry` raises the original error
+            with pytest.raises(ConnectionRefusedError):
+                send_queued_emails()
+
+        email = QueuedEmail.objects.get()
+        assert email.status == QueuedEmail.StatusType.PENDING
+        assert email.attempts == 1
+        assert email.next_attempt_at > timezone.now()
+
+    def test_skips_emails_not_due(self, mailoutbox):
+        queue_email(make_email())
+        QueuedEmail.objects.update(next_attempt_at=timezone.now() + timedelta(hours=1))
+
+        assert send_queued_emails() == 0
+        assert len(mailoutbox) == 0
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.test import AsyncClient
+from django.test.client import AsyncClientHandler
+from django.urls import reverse
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.handlers import PathDispatchMixin
+from core.thread_pool import (
+    ThreadPoolViewMixin,
+    ViewThreadPool,
+    get_view_thread_pool,
+    reset_view_thread_pool,
+)
+
+
+class DispatchAsyncClientHandler(PathDispatchMixin, AsyncClientHandler):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def view_thread_pool(settings):
+    settings.VIEW_THREAD_POOL_SIZE = 4
+    reset_view_thread_pool()
+    yield
+    reset_view_thread_pool()
+
+
+def run_concurrently(pool, func, count):
+    async def run():
+        return await asyncio.gather(*(pool.run(func) for _ in range(count)))
+
+    return async_to_sync(run)()
+
+
+class TestViewThreadPool:
+    def test_runs_calls_in_parallel(self):
+        pool = ViewThreadPool(3)
+        # Only passes if all three calls wait at the barrier at the same time
+        barrier = threading.Barrier(3, timeout=5)
+
+        def call():
+            barrier.wait()
+            return threading.current_thread().name
+
+        names = run_concurrently(pool, call, 3)
+
+        assert len(set(names)) == 3
+        assert all(name.startswith("view") for name in names)
+        stats = pool.stats()
+        assert stats["peak_active"] == 3
+        assert stats["saturated"] == 0
+        assert stats["completed"] == 3
+
+    def test_counts_saturation(self):
+        pool = ViewThreadPool(1)
+        release = threading.Event()
+
+        def call():
+            release.wait(5)
+
+        def release_when_queued():
+            while pool.stats()["queued"] < 2:
+                threading.Event().wait(0.01)
+            release.set()
+
+        threading.Thread(target=release_when_queued).start()
+        run_concurrently(pool, call, 3)
+
+        stats = pool.stats()
+        assert stats["submitted"] == stats["completed"] == 3
+        assert stats["saturated"] == 2
+        assert stats["peak_active"] == 1
+        assert stats["peak_queued"] >= 2
+        assert stats["active"] == stats["queued"] == 0
+
+    def test_errors_reach_the_caller(self):
+        pool = ViewThreadPool(1)
+
+        def call():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            run_concurrently(pool, call, 1)
+        assert pool.stats()["active"] == 0
+
+
+class TestPooledViews:
+    def test_view_mixin(self):
+        class View(ThreadPoolViewMixin, APIView):
+            permission_classes = []
+
+            def get(self, request):
+                return Response({"thread": threading.current_thread().name})
+
+        view = View.as_view()
+
+        assert iscoroutinefunction(view)
+        assert view.cls is View
+        assert view.csrf_exempt
+
+    def test_paths_run_on_pool_under_asgi(self, settings):
+        settings.THREAD_POOL_VIEW_PATHS = ["/health/"]
+        client = AsyncClient()
+        client.handler = DispatchAsyncClientHandler(enforce_csrf_checks=False)
+
+        response = async_to_sync(client.get)(reverse("health"))
+
+        assert response.status_code == 200
+        assert get_view_thread_pool().stats()["completed"] == 1
+
+    def test_other_paths_are_not_pooled(self, settings):
+        settings.THREAD_POOL_VIEW_PATHS = ["/api/v1/core/"]
+        client = AsyncClient()
+        client.handler = DispatchAsyncClientHandler(enforce_csrf_checks=False)
+
+        response = async_to_sync(client.get)(reverse("health"))
+
+        assert response.status_code == 200
+        assert get_view_thread_pool().stats()["submitted"] == 0
+
+
+@pytest.mark.django_db
+class TestThreadPoolStatsView:
+    def test_requires_admin(self, authenticated_api_client):
+        response = authenticated_api_client.get(reverse("v1:core:thread_pool_stats"))
+
+        assert response.status_code == 403
+
+    def test_stats(self, api_client, admin_user):
+        api_client.force_authenticate(admin_user)
+
+        response = api_client.get(reverse("v1:core:thread_pool_stats"))
+
+        assert response.status_code == 200
+        assert response.data["max_workers"] == 4
+        assert response.data["saturated"] == 0
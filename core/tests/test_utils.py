@@ -1,5 +1,6 @@
 import pytest
 
+from core.tasks import send_queued_emails
 from core.utils import get_upload_path, send_email
 
 
@@ -13,6 +14,7 @@ def test_send_email(request, mailoutbox):
         "account/email/password_reset_key_message.txt",
         ["to@example.com"],
     )
+    send_queued_emails()
 
     assert len(mailoutbox) == 1
     assert mailoutbox[0].subject == "subject"
@@ -30,6 +32,7 @@ def test_send_email_with_attachment(request, mailoutbox, single_attachment):
         ["to@example.com"],
         attachments=[single_attachment],
     )
+    send_queued_emails()
 
     assert len(mailoutbox) == 1
     assert mailoutbox[0].subject == "subject with attachment"
@@ -53,6 +56,7 @@ def test_send_email_with_multiple_attachments(
         ["to@example.com"],
         attachments=multiple_attachments,
     )
+    send_queued_emails()
 
     assert len(mailoutbox) == 1
     assert mailoutbox[0].subject == "subject with multiple attachments"
@@ -0,0 +1,150 @@
+"""
+A bounded thread pool for thread-safe sync views under ASGI.
+
+Django runs sync views from the async handler with
+`sync_to_async(thread_sensitive=True)`. The ASGI handler gives every
+request its own thread-sensitive context, so each request starts a fresh
+thread, and with it a fresh database connection, with no limit on how
+many run at once. Views opted in here run on a pool of
+`VIEW_THREAD_POOL_SIZE` long-lived threads instead: at most that many run
+at once per worker, the rest queue, and threads and connections are reused.
+
+Opt in per view with `pooled_view` or `ThreadPoolViewMixin`, or by path
+with `THREAD_POOL_VIEW_PATHS` (applied by `core.handlers`). Only opt in
+views that share no unprotected state between requests. Each pool thread
+holds its own database connection, kept for `CONN_MAX_AGE`.
+"""
+
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+pool = None
+pool_lock = threading.Lock()
+
+
+class ViewThreadPool:
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="view")
+        self.lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.peak_active = 0
+        self.peak_queued = 0
+        self.submitted = 0
+        self.completed = 0
+        # Calls that found every thread busy and had to wait
+        self.saturated = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def call(self, submitted_at, func, args, kwargs):
+        started_at = time.monotonic()
+        with self.lock:
+            self.queued -= 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            self.wait_seconds += started_at - submitted_at
+
+        # Same as request_started/request_finished do for the request thread
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            with self.lock:
+                self.active -= 1
+                self.completed += 1
+                self.run_seconds += time.monotonic() - started_at
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run `func` on the pool and return its result.
+        """
+        with self.lock:
+            self.submitted += 1
+            if self.active + self.queued >= self.max_workers:
+                self.saturated += 1
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        return await sync_to_async(
+            self.call, thread_sensitive=False, executor=self.executor
+        )(time.monotonic(), func, args, kwargs)
+
+    def stats(self) -> dict:
+        with self.lock:
+            completed = self.completed or 1
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_active": self.peak_active,
+                "peak_queued": self.peak_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "saturated": self.saturated,
+                "utilization": self.active / self.max_workers,
+                "avg_wait_ms": self.wait_seconds * 1000 / completed,
+                "avg_run_ms": self.run_seconds * 1000 / completed,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def get_view_thread_pool() -> ViewThreadPool:
+    global pool
+
+    if pool is None:
+        with pool_lock:
+            if pool is None:
+                pool = ViewThreadPool(settings.VIEW_THREAD_POOL_SIZE)
+    return pool
+
+
+def reset_view_thread_pool():
+    """
+    Drop the pool, so the next call builds one from the current settings.
+    """
+    global pool
+
+    with pool_lock:
+        current, pool = pool, None
+    if current is not None:
+        current.shutdown()
+
+
+@functools.cache
+def pooled_view(view):
+    """
+    Turn a sync view into an async one that runs on the view thread pool.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await get_view_thread_pool().run(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+def uses_thread_pool(path: str) -> bool:
+    return path.startswith(tuple(settings.THREAD_POOL_VIEW_PATHS))
+
+
+class ThreadPoolViewMixin:
+    """
+    Run a class-based view, such as a DRF view or viewset, on the view
+    thread pool.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        return pooled_view(super().as_view(*args, **kwargs))
@@ -1,14 +1,40 @@
+import logging
 import os
 from typing import Any, Optional
 
 from django.conf import settings
 from django.contrib.sites.models import Site
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.db import transaction
 from django.http import HttpRequest
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.core.exceptions import ValidationError
 
+from core.models import QueuedEmail
+from core.tasks import send_queued_emails
+
+
+logger = logging.getLogger(__name__)
+
+
+def dispatch_queued_emails():
+    try:
+        send_queued_emails.delay()
+    except Exception:
+        # The emails stay queued and the periodic run sends them
+        logger.exception("Could not dispatch the email outbox task")
+
+
+def queue_email(message: EmailMessage):
+    """
+    Store a rendered email in the outbox and have a worker send it once the
+    current transaction commits, instead of talking to the mail server
+    during the request.
+    """
+    QueuedEmail.from_message(message).save()
+    transaction.on_commit(dispatch_queued_emails)
+
 
 def send_email(
     request: HttpRequest,
@@ -19,7 +45,7 @@ def send_email(
     attachments: Optional[list[Any]] = None,
 ):
     """
-    This function sends an email using a selected template.
+    This function queues an email using a selected template.
     Arguments:
         subject: the subject of the email
         template: the template to be used for the email
@@ -34,38 +60,26 @@ def send_email(
     html_content = render_to_string(template, context)
     text_content = strip_tags(html_content)
 
-    if attachments:
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=recipients,
-        )
-        email.attach_alternative(html_content, "text/html")
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=recipients,
+    )
+    email.attach_alternative(html_content, "text/html")
 
-        for attachment in attachments:
-            if hasattr(attachment, "read"):
-                filename = getattr(attachment, "name", "attachment")
-                content = attachment.read()
-                mimetype = getattr(
-                    attachment, "content_type", "application/octet-stream"
-                )
-                email.attach(filename, content, mimetype)
-            elif isinstance(attachment, tuple) and len(attachment) == 3:
-                email.attach(*attachment)
-            else:
-                raise ValidationError(f"Invalid attachment type: {type(attachment)}")
+    for attachment in attachments or []:
+        if hasattr(attachment, "read"):
+            filename = getattr(attachment, "name", "attachment")
+            content = attachment.read()
+            mimetype = getattr(attachment, "content_type", "application/octet-stream")
+            email.attach(filename, content, mimetype)
+        elif isinstance(attachment, tuple) and len(attachment) == 3:
+            email.attach(*attachment)
+        else:
+            raise ValidationError(f"Invalid attachment type: {type(attachment)}")
 
-        email.send(fail_silently=False)
-    else:
-        send_mail(
-            subject=subject,
-            message=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipients,
-            fail_silently=False,
-            html_message=html_content,
-        )
+    queue_email(email)
 
 
 def get_upload_path(instance: object, filename: str) -> str:
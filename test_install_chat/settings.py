@@ -3,14 +3,13 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
-from constance import config
 import environ
 from celery.schedules import crontab
 
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 
-from test_install_chat.utils import lazy_constance_value
+from test_install_chat.utils import ConstanceValue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -106,6 +105,38 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",]
 
+# Paths served through REDUCED_MIDDLEWARE by `core.handlers`, which skips the
+# CSRF, messages and allauth middleware. The session and authentication
+# middleware stay so DRF's SessionAuthentication (which checks CSRF itself)
+# keeps working. FULL_MIDDLEWARE_PATHS keep the whole MIDDLEWARE chain even
+# under a reduced prefix: login, registration and social logins need it, as
+# do the admin and allauth pages.
+REDUCED_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+]
+
+REDUCED_MIDDLEWARE_PATHS = env.list(
+    "REDUCED_MIDDLEWARE_PATHS", default=["/api/v1/", "/health/"]
+)
+
+FULL_MIDDLEWARE_PATHS = [
+    "/admin/",
+    "/accounts/",
+    "/api/v1/auth/",
+    "/api/v1/oauth2/",
+]
+
+# Sync views under these paths run on a pool of VIEW_THREAD_POOL_SIZE threads
+# per ASGI worker instead of a new thread per request (see
+# `core.thread_pool`). Only list paths whose views are thread-safe.
+THREAD_POOL_VIEW_PATHS = env.list("THREAD_POOL_VIEW_PATHS", default=[])
+
+VIEW_THREAD_POOL_SIZE = env.int("VIEW_THREAD_POOL_SIZE", default=8)
+
 ROOT_URLCONF = "test_install_chat.urls"
 
 TEMPLATES = [
@@ -144,6 +175,25 @@ if env.str("DATABASE_URL", default=None):
     DATABASES = {"default": env.db()}
 
 
+# Cache
+# Without Redis every process keeps its own local-memory cache
+
+CACHE_REDIS_URL = env.str("CACHE_REDIS_URL", default=None)
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            # Per-process LRU in front of Redis, invalidated over pub/sub
+            "BACKEND": "core.cache.TwoTierRedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+            "OPTIONS": {
+                "L1_MAX_ENTRIES": env.int("CACHE_L1_MAX_ENTRIES", 10_000),
+                "L1_TIMEOUT": env.int("CACHE_L1_TIMEOUT", 60),
+            },
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -162,6 +212,14 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Bloom filter of breached passwords, built with
+# `python manage.py build_breached_password_filter`
+BREACHED_PASSWORDS_FILTER = env.str("BREACHED_PASSWORDS_FILTER", default=None)
+if BREACHED_PASSWORDS_FILTER:
+    AUTH_PASSWORD_VALIDATORS.append(
+        {"NAME": "users.validators.BreachedPasswordValidator"}
+    )
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
@@ -267,6 +325,12 @@ EMAIL_HOST_PASSWORD = env.str("EMAIL_HOST_PASSWORD", None)
 # if not EMAIL_HOST_USER or not EMAIL_HOST_PASSWORD:
 #     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+# Outbox drained by core.tasks.send_queued_emails
+EMAIL_OUTBOX_BATCH_SIZE = env.int("EMAIL_OUTBOX_BATCH_SIZE", 100)
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int("EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+# Seconds before the first retry, doubled for each failed attempt after it
+EMAIL_OUTBOX_RETRY_DELAY = env.int("EMAIL_OUTBOX_RETRY_DELAY", 60)
+
 
 # Allauth
 
@@ -291,10 +355,19 @@ ACCOUNT_EMAIL_CONFIRMATION_EXPIRE_DAYS = 3
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "oauth2_provider.contrib.rest_framework.OAuth2Authentication",
-        "dj_rest_auth.jwt_auth.JWTCookieAuthentication",
+        "users.authentication.ClaimsJWTCookieAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 
@@ -308,6 +381,7 @@ REST_AUTH = {
     "USER_DETAILS_SERIALIZER": "users.api.v1.serializers.UserDetailSerializer",
     "REGISTER_SERIALIZER": "users.api.v1.serializers.CustomRegisterSerializer",
     "PASSWORD_CHANGE_SERIALIZER": "users.api.v1.serializers.CustomPasswordChangeSerializer",
+    "JWT_TOKEN_CLAIMS_SERIALIZER": "users.api.v1.serializers.TokenClaimsSerializer",
     "OLD_PASSWORD_FIELD_ENABLED": True,
     "USE_JWT": True,
     "JWT_AUTH_COOKIE": "jwt-auth",
@@ -327,6 +401,7 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    "TOKEN_REFRESH_SERIALIZER": "users.api.v1.serializers.TokenClaimsRefreshSerializer",
 }
 
 
@@ -368,7 +443,13 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TIMEZONE = "UTC"
-CELERY_BEAT_SCHEDULE = {}
+CELERY_BEAT_SCHEDULE = {
+    # Retries failed emails and catches emails whose dispatch was lost
+    "send-queued-emails": {
+        "task": "core.tasks.send_queued_emails",
+        "schedule": 60.0,
+    },
+}
 
 # OAUTH2
 
@@ -384,17 +465,18 @@ OAUTH2_PROVIDER = {
 # SOCIAL AUTH
 # This fixes the issue with social sign-in for existing local user
 # https://github.com/pennersr/django-allauth/issues/215
-SOCIALACCOUNT_ADAPTER = "allauth.socialaccount.adapter.DefaultSocialAccountAdapter"
+SOCIALACCOUNT_ADAPTER = "users.adapters.CustomSocialAccountAdapter"
 SOCIALACCOUNT_EMAIL_REQUIRED = True
 SOCIALACCOUNT_QUERY_EMAIL = True
 SOCIALACCOUNT_EMAIL_AUTHENTICATION_AUTO_CONNECT = False
 SOCIALACCOUNT_EMAIL_VERIFICATION = True
+# Credentials are ConstanceValue references, resolved per request by the adapter
 SOCIALACCOUNT_PROVIDERS = {
     "google": {
         "APP": {
-            "client_id": lazy_constance_value("GOOGLE_CLIENT_ID")(),
-            "secret": lazy_constance_value("GOOGLE_CLIENT_SECRET")(),
-            "key": lazy_constance_value("GOOGLE_KEY")(),
+            "client_id": ConstanceValue("GOOGLE_CLIENT_ID"),
+            "secret": ConstanceValue("GOOGLE_CLIENT_SECRET"),
+            "key": ConstanceValue("GOOGLE_KEY"),
         },
         "SCOPE": [
             "profile",
@@ -409,8 +491,8 @@ SOCIALACCOUNT_PROVIDERS = {
     "facebook": {
         "METHOD": "oauth2",
         "APP": {
-            "client_id": lazy_constance_value("FACEBOOK_CLIENT_ID")(),
-            "secret": lazy_constance_value("FACEBOOK_CLIENT_SECRET")(),
+            "client_id": ConstanceValue("FACEBOOK_CLIENT_ID"),
+            "secret": ConstanceValue("FACEBOOK_CLIENT_SECRET"),
         },
         # OPTIONAL if you want to override the default Facebook JavaScript SDK URL
         # "SDK_URL": "//connect.facebook.net/{locale}/sdk.js",
@@ -438,14 +520,14 @@ SOCIALACCOUNT_PROVIDERS = {
         "APPS": [
             {
                 # Your service identifier.
-                "client_id": lazy_constance_value("APPLE_CLIENT_ID")(),
+                "client_id": ConstanceValue("APPLE_CLIENT_ID"),
                 # The Key ID (visible in the "View Key Details" page).
-                "secret": lazy_constance_value("APPLE_SECRET")(),
+                "secret": ConstanceValue("APPLE_SECRET"),
                 # Member ID/App ID Prefix -- you can find it below your name
                 # at the top right corner of the page, or it’s your App ID
                 # Prefix in your App ID.
-                "key": lazy_constance_value("APPLE_KEY")(),
-                "settings": lazy_constance_value("APPLE_SETTINGS")(),
+                "key": ConstanceValue("APPLE_KEY"),
+                "settings": ConstanceValue("APPLE_SETTINGS"),
             }
         ]
     },
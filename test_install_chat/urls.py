@@ -19,12 +19,14 @@ from core.api.v1.views import (
     GoogleLoginView,
     GoogleConnectView,
 )
+from core.views import health
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/v1/oauth2/", include(oauth2_urls, namespace="oauth2_provider")),
     path("accounts/", include("allauth.urls")),
+    path("health/", health, name="health"),
 
     path(
         "password/reset/confirm/<uidb64>/<token>/",
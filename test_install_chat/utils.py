@@ -1,11 +1,8 @@
-import json
 import logging
 
-from constance import config
 from typing import Any
 
 from django.conf import settings
-from django.utils.functional import lazy
 from django.utils.translation import gettext_lazy as _
 
 logger = logging.getLogger(__name__)
@@ -18,16 +15,32 @@ def environment_callback(request):
 
 
 def get_constance_value(key: str) -> Any:
-    constance_value = getattr(config, key)
-    try:
-        parsed_value = json.loads(constance_value)
-        if isinstance(parsed_value, dict):
-            return parsed_value
-    except (json.JSONDecodeError, TypeError) as e:
-        logger.error(f"Error decoding JSON for key {key}: {e}")
-        pass
-    return constance_value
-
-
-def lazy_constance_value(key: str) -> Any:
-    return lazy(lambda: get_constance_value(key), str)
+    from core.config import get_config_snapshot
+
+    # JSON objects come back parsed, any other value as stored
+    return get_config_snapshot().parsed[key]
+
+
+class ConstanceValue:
+    """
+    A reference to a Constance value, for use in settings.
+
+    Settings are imported before apps are ready and by every process that
+    never needs the value, so they must not read the database. The code that
+    consumes the setting calls `resolve()` when it needs the value.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __repr__(self):
+        return f"ConstanceValue({self.key!r})"
+
+    def resolve(self) -> Any:
+        return get_constance_value(self.key)
+
+
+def resolve_constance_value(value: Any) -> Any:
+    if isinstance(value, ConstanceValue):
+        return value.resolve()
+    return value
@@ -2,12 +2,17 @@ from typing import Optional
 
 from allauth.account.adapter import DefaultAccountAdapter
 from allauth.account.models import EmailConfirmation
+from allauth.core import context as allauth_context
+from allauth.socialaccount.adapter import DefaultSocialAccountAdapter
 from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.mail import EmailMultiAlternatives
 from django.http import HttpRequest
 from django.template.loader import render_to_string
 
+from core.utils import queue_email
+from test_install_chat.utils import resolve_constance_value
+
 
 class CustomAccountAdapter(DefaultAccountAdapter):
     def get_email_confirmation_url(
@@ -22,6 +27,17 @@ class CustomAccountAdapter(DefaultAccountAdapter):
         verify_email_url = f"{settings.FRONTEND_URL}/settings/email/verify?token={key}"
         return verify_email_url
 
+    def send_mail(self, template_prefix, email, context):
+        """
+        Queues the mail instead of sending it during the request.
+        """
+        ctx = {
+            "email": email,
+            "current_site": get_current_site(allauth_context.request),
+        }
+        ctx.update(context)
+        queue_email(self.render_mail(template_prefix, email, ctx))
+
     def send_confirmation_mail(self, request, emailconfirmation, signup):
         """
         Sends the email confirmation mail.
@@ -49,4 +65,26 @@ class CustomAccountAdapter(DefaultAccountAdapter):
             to=[emailconfirmation.email_address.email],
         )
         email.attach_alternative(html_content, "text/html")
-        email.send()
+        queue_email(email)
+
+
+class CustomSocialAccountAdapter(DefaultSocialAccountAdapter):
+    # SocialApp fields that settings may fill from Constance
+    CONSTANCE_APP_FIELDS = ("client_id", "secret", "key", "settings")
+
+    def list_apps(self, request, provider=None, client_id=None):
+        """
+        Resolves the Constance credentials of settings-backed apps, which
+        settings only reference so that importing them does no I/O.
+        """
+        apps = super().list_apps(request, provider=provider)
+        for app in apps:
+            # Apps stored in the database hold real values
+            if app.pk is None:
+                for field in self.CONSTANCE_APP_FIELDS:
+                    value = getattr(app, field)
+                    setattr(app, field, resolve_constance_value(value))
+        # Filtered here because the unresolved client ids cannot be compared
+        if client_id:
+            apps = [app for app in apps if app.client_id == client_id]
+        return apps
@@ -1,11 +1,18 @@
 from dj_rest_auth.registration.serializers import RegisterSerializer
+from dj_rest_auth.jwt_auth import CookieTokenRefreshSerializer
 from dj_rest_auth.serializers import PasswordChangeSerializer, PasswordResetSerializer
 from django_restql.mixins import DynamicFieldsMixin
 from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
 
+from core.api.v1.mixins import OptimizedQuerySetMixin
 from users.forms import AllAuthPasswordResetForm
 from users.models import User
+from users.tokens import RefreshToken
 
 
 class PasswordResetSerializer(PasswordResetSerializer):
@@ -37,7 +44,7 @@ class CustomPasswordChangeSerializer(PasswordChangeSerializer):
         max_length=128,
         required=False,
     )
-    
+
     def custom_validation(self, attrs):
         if len(attrs.get("new_password1")) < 8:
             raise serializers.ValidationError(
@@ -71,8 +78,11 @@ class CustomPasswordChangeSerializer(PasswordChangeSerializer):
         return value
 
 
-class UserDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+class UserDetailSerializer(
+    OptimizedQuerySetMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     has_usable_password = serializers.SerializerMethodField()
+    query_columns = {"has_usable_password": ["password"], "email_verified": []}
 
     class Meta:
         model = User
@@ -95,6 +105,12 @@ class UserDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     def get_has_usable_password(self, obj):
         return obj.has_usable_password()
 
+    def optimize_queryset(self, queryset, parsed_query=None, columns=()):
+        queryset = super().optimize_queryset(queryset, parsed_query, columns)
+        if "email_verified" in self.get_selected_fields(parsed_query):
+            queryset = queryset.with_email_verified()
+        return queryset
+
 
 class ProfilePictureSerializer(serializers.ModelSerializer):
     class Meta:
@@ -102,6 +118,30 @@ class ProfilePictureSerializer(serializers.ModelSerializer):
         fields = ["profile_picture"]
 
 
+class TokenClaimsSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class TokenClaimsRefreshSerializer(TokenRefreshSerializer):
+    """
+    Mint tokens with the user's current flags rather than the ones the
+    refresh token was issued with.
+    """
+
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        refresh.refresh_claims()
+        return super().validate({**attrs, "refresh": str(refresh)})
+
+
+class CookieTokenClaimsRefreshSerializer(
+    CookieTokenRefreshSerializer, TokenClaimsRefreshSerializer
+):
+    pass
+
+
 class ContactUsSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=100)
     email = serializers.EmailField()
@@ -10,6 +10,7 @@ from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 
+from core.tasks import send_queued_emails
 from users.models import User
 
 
@@ -170,6 +171,7 @@ class TestCustomVerifyEmailView:
 @pytest.mark.django_db
 class TestConfirmDeletionView:
     def test_confirm_deletion_success(self, authenticated_api_client, user):
+        token_version = user.token_version
         signer = Signer()
         token = signer.sign(user.id)
 
@@ -210,6 +212,7 @@ class TestConfirmDeletionView:
         assert user.last_name == "User"
 
         assert not EmailAddress.objects.filter(user=user).exists()
+        assert user.token_version == token_version + 1
 
     def test_confirm_deletion_invalid_token(self, authenticated_api_client, user):
         url = reverse("v1:confirm_deletion")
@@ -309,6 +312,7 @@ class TestContactUsView:
 
         assert response.status_code == status.HTTP_201_CREATED
 
+        send_queued_emails()
         recipient_emails = [email.to[0] for email in mail.outbox]
         assert inactive_admin.email not in recipient_emails
 
@@ -324,6 +328,7 @@ class TestContactUsView:
 
         assert response.status_code == status.HTTP_201_CREATED
 
+        send_queued_emails()
         email = mail.outbox[0]
         html_content = email.alternatives[0][0]
 
@@ -6,7 +6,6 @@ from allauth.account.models import (
 )
 from allauth.socialaccount.models import SocialAccount
 from dj_rest_auth.jwt_auth import (
-    CookieTokenRefreshSerializer,
     set_jwt_access_cookie,
     set_jwt_refresh_cookie,
 )
@@ -26,23 +25,25 @@ from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from core.utils import queue_email
 from users.api.v1.serializers import (
     ContactUsSerializer,
+    CookieTokenClaimsRefreshSerializer,
     ProfilePictureSerializer,
     UserDetailSerializer,
 )
+from users.authentication import ClaimsJWTAuthentication
 from users.constants import COOKIES_TO_DELETE, MAX_PROFILE_PIC_UPLOAD_SIZE
 from users.models import User
+from users.tokens import RefreshToken
 from users.utils import generate_unique_username
 
 
 class UserDetailView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     @swagger_auto_schema(
         responses={200: UserDetailSerializer(many=False)},
@@ -91,7 +92,7 @@ class UserDetailView(APIView):
             subject, "", settings.DEFAULT_FROM_EMAIL, [user.email]
         )
         email.attach_alternative(html_content, "text/html")
-        email.send()
+        queue_email(email)
 
         return Response(
             {"detail": "A confirmation email has been sent."}, status=status.HTTP_200_OK
@@ -100,7 +101,7 @@ class UserDetailView(APIView):
 
 class ProfilePictureUploadView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request):
@@ -143,7 +144,7 @@ class CustomLoginView(LoginView):
 
 class CustomVerifyEmailView(DjRestVerifyEmailView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -194,7 +195,7 @@ def get_refresh_view():
     from rest_framework_simplejwt.views import TokenRefreshView
 
     class RefreshViewWithCookieSupport(TokenRefreshView):
-        serializer_class = CookieTokenRefreshSerializer
+        serializer_class = CookieTokenClaimsRefreshSerializer
 
         def finalize_response(self, request, response, *args, **kwargs):
             if response.status_code == status.HTTP_200_OK and "access" in response.data:
@@ -217,7 +218,7 @@ def get_refresh_view():
 
 class ConfirmDeletionView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     @swagger_auto_schema(
         manual_parameters=[
@@ -237,7 +238,7 @@ class ConfirmDeletionView(APIView):
             signer = Signer()
             user_id = signer.unsign(token)
             user = User.objects.get(id=user_id)
-            if user != request.user:
+            if user.pk != request.user.pk:
                 return Response(
                     {"detail": "You do not have permission to delete this account."},
                     status=status.HTTP_403_FORBIDDEN,
@@ -258,6 +259,7 @@ class ConfirmDeletionView(APIView):
 
             user.set_unusable_password()
 
+            # Deactivating revokes the access tokens still in flight
             user.save()
 
             OutstandingToken.objects.filter(user=user).delete()
@@ -281,7 +283,7 @@ class ConfirmDeletionView(APIView):
 
 class ContactUsView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     @swagger_auto_schema(
         request_body=openapi.Schema(
@@ -322,7 +324,7 @@ class ContactUsView(APIView):
                 subject, "", settings.DEFAULT_FROM_EMAIL, admin_emails
             )
             email.attach_alternative(html_content, "text/html")
-            email.send()
+            queue_email(email)
 
             return Response(
                 {"detail": "Contact Us submission received."},
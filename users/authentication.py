@@ -0,0 +1,103 @@
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+
+from users.tokens import CLAIMS
+
+
+TOKEN_VERSION_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def token_version_cache_key(user_id) -> str:
+    return f"users:token_version:{user_id}"
+
+
+def get_token_version(user_id):
+    """
+    Return the user's current token version, or None if the user does not
+    exist.
+    """
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            get_user_model()
+            .objects.filter(pk=user_id)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+        if version is not None:
+            cache.set(key, version, TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def set_token_version(user_id, version: int):
+    cache.set(token_version_cache_key(user_id), version, TOKEN_VERSION_CACHE_TIMEOUT)
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    A user built from signed token claims. The id and flags are answered from
+    the claims; touching any other attribute loads the user row once.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, is_staff: bool, is_active: bool):
+        super().__init__(lambda: get_user_model().objects.get(pk=user_id))
+        self.__dict__.update(
+            id=user_id, pk=user_id, is_staff=is_staff, is_active=is_active
+        )
+
+    def __bool__(self):
+        return True
+
+
+class ClaimsUserMixin:
+    """
+    Authenticate from token claims instead of loading the user on every
+    request. Tokens are rejected once the user's token version has moved
+    past the one they were issued with. Tokens issued without the claims
+    fall back to loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in CLAIMS):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = get_token_version(user_id)
+        if version is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if version != validated_token["token_version"]:
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+        if not validated_token["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return ClaimsUser(
+            user_id,
+            is_staff=validated_token["is_staff"],
+            is_active=validated_token["is_active"],
+        )
+
+
+class ClaimsJWTAuthentication(ClaimsUserMixin, JWTAuthentication):
+    pass
+
+
+class ClaimsJWTCookieAuthentication(ClaimsUserMixin, JWTCookieAuthentication):
+    pass
@@ -0,0 +1,65 @@
+"""
+Measure the breached password Bloom filter.
+
+    python -m users.benchmarks.bench_breached_password [items] [false_positive_rate]
+
+Builds a filter of `items` synthetic passwords (1,000,000 by default) in a
+temporary directory, then times opening it, which is what each worker pays
+at startup, and looking up breached and unbreached passwords.
+"""
+
+import os
+import sys
+import tempfile
+
+from core.benchmarks import setup_django, timer
+
+
+LOOKUPS = 200_000
+
+
+def main(items: int, false_positive_rate: float):
+    from users.bloom import BloomFilter, build_bloom_filter, hash_item
+    from users.validators import BreachedPasswordValidator
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "breached.bloom")
+        with timer("build filter (per item)", items):
+            build_bloom_filter(
+                path,
+                (hash_item(f"breached-{i}") for i in range(items)),
+                items,
+                false_positive_rate,
+            )
+        print(f"filter size: {os.path.getsize(path) / 1024 / 1024:.1f} MiB")
+
+        with timer("open filter", 1):
+            bloom_filter = BloomFilter(path)
+
+        breached = [f"breached-{i}" for i in range(LOOKUPS)]
+        clean = [f"clean-{i}" for i in range(LOOKUPS)]
+        with timer("lookup breached password", LOOKUPS):
+            for password in breached:
+                password in bloom_filter
+        with timer("lookup unbreached password", LOOKUPS):
+            false_positives = sum(password in bloom_filter for password in clean)
+        print(f"measured false positive rate: {false_positives / LOOKUPS:.5f}")
+
+        validator = BreachedPasswordValidator(path=path)
+        with timer("validator.validate (unbreached)", LOOKUPS):
+            for password in clean:
+                try:
+                    validator.validate(password)
+                except Exception:
+                    pass
+
+        validator.get_filter().close()
+        bloom_filter.close()
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.001,
+    )
@@ -0,0 +1,42 @@
+"""
+Compare the automaton `CommonPasswordValidator` with the regexes it replaced.
+
+    python -m users.benchmarks.bench_common_password [passwords]
+
+Reports the cost of building each validator, which every process pays once,
+and of validating a corpus of common and uncommon passwords.
+"""
+
+import sys
+
+from core.benchmarks import setup_django, timer
+
+
+def main(count: int):
+    from users.tests.helpers import (
+        LegacyCommonPasswordValidator,
+        build_password_corpus,
+    )
+    from users.validators import CommonPasswordValidator
+
+    corpus = build_password_corpus(count)
+
+    with timer("build regex validator", 1):
+        legacy = LegacyCommonPasswordValidator()
+    with timer("build automaton validator", 1):
+        validator = CommonPasswordValidator()
+
+    with timer("regex validate", count):
+        legacy_results = [legacy.is_common(password) for password in corpus]
+    with timer("automaton validate (cold transitions)", count):
+        results = [validator.is_common(password) for password in corpus]
+    with timer("automaton validate (warm transitions)", count):
+        for password in corpus:
+            validator.is_common(password)
+
+    assert results == legacy_results
+
+
+if __name__ == "__main__":
+    setup_django()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
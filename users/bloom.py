@@ -0,0 +1,138 @@
+"""
+A Bloom filter stored in a flat file and read through `mmap`.
+
+Opening a filter maps the file instead of reading it, so startup does not
+depend on its size and every process that maps the same file shares its
+pages through the OS page cache.
+
+File layout: a fixed header (magic, number of bits, number of hash functions,
+number of items) followed by the bit array. Items are hashed with SHA-1 so a
+filter can be built from plain-text lists or from SHA-1 hash lists such as
+Have I Been Pwned's.
+
+The filter is blocked: all bits of an item fall in one 64-byte block chosen
+by the digest, so a lookup touches a single cache line and a single page of
+the file however many hash functions there are. Bit positions inside the
+block are derived from the digest by double hashing.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+
+
+MAGIC = b"PWBLOOM1"
+HEADER = struct.Struct("<8sQIQ")
+BLOCK_BITS = 512
+# Blocking skews how bits are spread, which costs a little accuracy; make up
+# for it with extra bits
+BLOCK_OVERHEAD = 1.5
+
+
+def get_filter_size(items: int, false_positive_rate: float):
+    """
+    Return the number of bits and hash functions that keep the false positive
+    rate at `false_positive_rate` for `items` items.
+    """
+    if not 0 < false_positive_rate < 1:
+        raise ValueError("The false positive rate must be between 0 and 1.")
+
+    items = max(items, 1)
+    optimal_bits = -items * math.log(false_positive_rate) / math.log(2) ** 2
+    num_hashes = max(1, round(optimal_bits / items * math.log(2)))
+    num_blocks = math.ceil(optimal_bits * BLOCK_OVERHEAD / BLOCK_BITS)
+    return num_blocks * BLOCK_BITS, num_hashes
+
+
+def get_positions(digest: bytes, num_bits: int, num_hashes: int):
+    """
+    Return the bit positions of a digest, all inside the same block.
+    """
+    block = int.from_bytes(digest[:8], "little") % (num_bits // BLOCK_BITS)
+    first = int.from_bytes(digest[8:12], "little")
+    second = int.from_bytes(digest[12:16], "little") | 1
+    start = block * BLOCK_BITS
+    return [start + (first + i * second) % BLOCK_BITS for i in range(num_hashes)]
+
+
+def hash_item(item: str) -> bytes:
+    return hashlib.sha1(item.encode("utf-8")).digest()
+
+
+class BloomFilter:
+    """
+    A read-only Bloom filter backed by a memory-mapped file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.num_bits, self.num_hashes, self.items = HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a Bloom filter file.")
+        if len(self._mmap) < HEADER.size + self.num_bits // 8:
+            self._mmap.close()
+            raise ValueError(f"{path} is truncated.")
+        self._num_blocks = self.num_bits // BLOCK_BITS
+
+    def __contains__(self, item: str) -> bool:
+        return self.contains_digest(hash_item(item))
+
+    def contains_digest(self, digest: bytes) -> bool:
+        # `get_positions` inlined: this runs on every lookup
+        block = int.from_bytes(digest[:8], "little") % self._num_blocks
+        offset = HEADER.size + block * (BLOCK_BITS // 8)
+        end = offset + BLOCK_BITS // 8
+        bits = self._mmap[offset:end]
+        position = int.from_bytes(digest[8:12], "little")
+        step = int.from_bytes(digest[12:16], "little") | 1
+        for _ in range(self.num_hashes):
+            bit = position % BLOCK_BITS
+            if not bits[bit >> 3] & (1 << (bit & 7)):
+                return False
+            position += step
+        return True
+
+    def close(self):
+        self._mmap.close()
+
+
+def build_bloom_filter(path, digests, items: int, false_positive_rate: float):
+    """
+    Write a filter holding the SHA-1 `digests` to `path`. `items` is the
+    number of digests, which sizes the filter. The file is written next to
+    `path` and moved into place, so processes that mapped the previous
+    filter keep reading a consistent file.
+    """
+    num_bits, num_hashes = get_filter_size(items, false_positive_rate)
+    size = HEADER.size + num_bits // 8
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "r+b") as file:
+            file.truncate(size)
+            with mmap.mmap(file.fileno(), size) as data:
+                added = 0
+                for digest in digests:
+                    for position in get_positions(digest, num_bits, num_hashes):
+                        index = HEADER.size + (position >> 3)
+                        data[index] |= 1 << (position & 7)
+                    added += 1
+                HEADER.pack_into(data, 0, MAGIC, num_bits, num_hashes, added)
+                data.flush()
+        # mkstemp creates the file private to its owner
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return num_bits, num_hashes, added
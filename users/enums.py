@@ -5,4 +5,8 @@ from django.utils.translation import gettext_lazy as _
 
 class PasswordValidationErrors(Enum):
     TOO_COMMON = _("This password is too common.")
-    HELP_TEXT = _("Your password cannot be a commonly used password.") 
\ No newline at end of file
+    HELP_TEXT = _("Your password cannot be a commonly used password.")
+    BREACHED = _("This password has appeared in a data breach.")
+    BREACHED_HELP_TEXT = _(
+        "Your password cannot be one that has appeared in a data breach."
+    ) 
\ No newline at end of file
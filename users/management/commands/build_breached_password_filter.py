@@ -0,0 +1,96 @@
+import binascii
+import hashlib
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.bloom import build_bloom_filter
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the Bloom filter read by BreachedPasswordValidator from a local "
+        "list of breached passwords, one per line"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", type=str, help="Path of the password list")
+        parser.add_argument("output", type=str, help="Path of the filter to write")
+        parser.add_argument(
+            "--format",
+            choices=["text", "sha1"],
+            default="text",
+            help=(
+                "text: one plain-text password per line. sha1: one hex SHA-1 "
+                "hash per line, optionally followed by ':<count>' as in the "
+                "Have I Been Pwned downloads"
+            ),
+        )
+        parser.add_argument(
+            "--false-positive-rate",
+            type=float,
+            default=0.001,
+            help="Share of unbreached passwords the filter may reject",
+        )
+        parser.add_argument(
+            "--expected-items",
+            type=int,
+            help="Number of entries in the list; counted with an extra pass if omitted",
+        )
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        false_positive_rate = options["false_positive_rate"]
+        if not 0 < false_positive_rate < 1:
+            raise CommandError("--false-positive-rate must be between 0 and 1.")
+
+        items = options["expected_items"]
+        if items is None:
+            items = sum(1 for _ in self.read_digests(source, options["format"]))
+
+        try:
+            num_bits, num_hashes, added = build_bloom_filter(
+                options["output"],
+                self.read_digests(source, options["format"]),
+                items,
+                false_positive_rate,
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {added} passwords to {options['output']} "
+                f"({num_bits // 8 // 1024 // 1024} MiB, {num_hashes} hash functions)"
+            )
+        )
+        if added > items:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"The list has more entries than --expected-items ({items}), "
+                    "so the false positive rate is higher than requested."
+                )
+            )
+
+    def read_digests(self, source, format):
+        try:
+            with open(source, "rb") as file:
+                for line_number, line in enumerate(file, start=1):
+                    line = line.rstrip(b"\r\n")
+                    if not line:
+                        continue
+                    if format == "text":
+                        yield hashlib.sha1(line).digest()
+                        continue
+                    try:
+                        digest = binascii.unhexlify(line.split(b":", 1)[0].strip())
+                    except binascii.Error:
+                        digest = None
+                    # Hex of another length, such as an NTLM list, would
+                    # build a filter that never matches
+                    if digest is None or len(digest) != 20:
+                        raise CommandError(
+                            f"Line {line_number} is not a hex SHA-1 hash."
+                        )
+                    yield digest
+        except OSError as e:
+            raise CommandError(e)
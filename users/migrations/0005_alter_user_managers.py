@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 00:45
+
+import users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0004_user_profile_picture"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", users.models.UserManager()),
+            ],
+        ),
+    ]
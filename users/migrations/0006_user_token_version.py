@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-18 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0005_alter_user_managers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Tokens issued with an older version are rejected",
+                verbose_name="Token Version",
+            ),
+        ),
+    ]
@@ -1,11 +1,32 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
 from django.db import models
+from django.db.models import Exists, F, OuterRef
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
 
 from users.storages import UniqueFileStorage
 
 
+class UserQuerySet(models.QuerySet):
+    def with_email_verified(self):
+        """
+        Annotate whether the user has a verified email address, so
+        `User.email_verified` does not query per user.
+        """
+        from allauth.account.models import EmailAddress
+
+        return self.annotate(
+            has_verified_email=Exists(
+                EmailAddress.objects.filter(user=OuterRef("pk"), verified=True)
+            )
+        )
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     phone_number = PhoneNumberField(
         _("Phone Number"),
@@ -19,7 +40,63 @@ class User(AbstractUser):
     profile_picture = models.ImageField(
         null=True, blank=True, storage=UniqueFileStorage()
     )
+    token_version = models.PositiveIntegerField(
+        _("Token Version"),
+        default=0,
+        editable=False,
+        help_text=_("Tokens issued with an older version are rejected"),
+    )
+
+    objects = UserManager()
+
+    # Changing any of these revokes the tokens issued so far, since
+    # `ClaimsJWTAuthentication` trusts the flags copied into them
+    TOKEN_FIELDS = ("is_active", "is_staff", "is_superuser", "password")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._loaded_token_fields = user.get_token_fields()
+        return user
+
+    def get_token_fields(self) -> dict:
+        deferred = self.get_deferred_fields()
+        return {
+            field: getattr(self, field)
+            for field in self.TOKEN_FIELDS
+            if field not in deferred
+        }
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, "_loaded_token_fields", None)
+        super().save(*args, **kwargs)
+
+        current = self.get_token_fields()
+        update_fields = kwargs.get("update_fields")
+        changed = loaded is not None and any(
+            field in loaded
+            and loaded[field] != value
+            and (update_fields is None or field in update_fields)
+            for field, value in current.items()
+        )
+        self._loaded_token_fields = current
+        if changed:
+            self.revoke_tokens()
 
     @property
     def email_verified(self) -> bool:
+        if hasattr(self, "has_verified_email"):
+            return self.has_verified_email
         return self.emailaddress_set.filter(verified=True).exists()
+
+    def revoke_tokens(self):
+        """
+        Reject every access token issued to the user so far.
+        """
+        from users.authentication import set_token_version
+        from users.signals import tokens_revoked
+
+        User.objects.filter(pk=self.pk).update(token_version=F("token_version") + 1)
+        self.refresh_from_db(fields=["token_version"])
+        set_token_version(self.pk, self.token_version)
+        tokens_revoked.send(sender=User, user=self)
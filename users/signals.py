@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+
+# Sent with `user` after `User.revoke_tokens`, which bypasses `post_save`
+tokens_revoked = Signal()
@@ -1,5 +1,11 @@
+import random
+import re
+import string
+
 import pytest
 from django.core.exceptions import ValidationError
+from users.constants import (COMMON_PASSWORD_BASES, KEYBOARD_PATTERNS,
+                             LEET_SUBSTITUTIONS)
 from users.enums import PasswordValidationErrors
 
 
@@ -11,4 +17,111 @@ def assert_password_common(validator, password):
 
 def assert_password_valid(validator, password):
     """Helper function to assert that a password is valid"""
-    validator.validate(password) 
\ No newline at end of file
+    validator.validate(password)
+
+
+class LegacyCommonPasswordValidator:
+    """
+    The regex implementation `CommonPasswordValidator` replaced, kept as the
+    reference its results must match. It compiles two patterns per base and
+    per pair of bases, so building it takes several seconds.
+    """
+
+    def __init__(self):
+        self.common_bases = COMMON_PASSWORD_BASES + KEYBOARD_PATTERNS
+        self.leet_substitutions = LEET_SUBSTITUTIONS
+        self.patterns = self.compile_patterns()
+
+    def _get_char_pattern(self, char):
+        if char in self.leet_substitutions:
+            chars = [char] + self.leet_substitutions[char]
+            return f'[{"".join(chars)}]'
+        return f"[{char}{char.upper()}]"
+
+    def _create_base_pattern(self, base):
+        pattern = "".join(map(self._get_char_pattern, base))
+        non_alpha = r"[^a-zA-Z]"
+        return [
+            r"^" + non_alpha + r"*" + pattern + non_alpha + r"*$",
+            non_alpha + pattern + non_alpha,
+        ]
+
+    def compile_patterns(self):
+        pattern_strings = [
+            pattern
+            for base in self.common_bases
+            for pattern in self._create_base_pattern(base)
+        ]
+        for base1 in self.common_bases:
+            for base2 in self.common_bases:
+                if len(base1) >= 3 and len(base2) >= 3:
+                    pattern_strings.extend(self._create_base_pattern(f"{base1}{base2}"))
+        return [re.compile(p, re.IGNORECASE) for p in pattern_strings]
+
+    def is_common(self, password):
+        if any(pattern.search(password) for pattern in self.patterns):
+            return True
+        base_password = re.sub(r"[^a-zA-Z]", "", password.lower())
+        return any(
+            len(base) >= 3 and base in base_password for base in self.common_bases
+        )
+
+
+def build_password_corpus(size=2000, seed=0):
+    """
+    Build a reproducible mix of passwords around the common bases: l33t and
+    case variations, padding, combinations, near misses and random strings,
+    including characters with unusual case folding.
+    """
+    rng = random.Random(seed)
+    bases = COMMON_PASSWORD_BASES + KEYBOARD_PATTERNS
+    padding = "!@#$%^&*()_-+=|.,?~ 0123456789\n"
+    unusual = "KſİıßΣéÿⅣ"
+    alphabet = string.ascii_letters + string.digits + padding + unusual
+
+    def mutate(base):
+        chars = []
+        for char in base:
+            roll = rng.random()
+            if roll < 0.25 and char in LEET_SUBSTITUTIONS:
+                chars.append(rng.choice(LEET_SUBSTITUTIONS[char]))
+            elif roll < 0.45:
+                chars.append(char.upper())
+            elif roll < 0.5:
+                chars.append(rng.choice(alphabet))
+            else:
+                chars.append(char)
+        return "".join(chars)
+
+    def pad():
+        return "".join(
+            rng.choice(padding + string.ascii_letters)
+            for _ in range(rng.choice([0, 0, 1, 2, 3]))
+        )
+
+    corpus = [
+        "",
+        "Tr0ub4dor&3",
+        "correcthorsebatterystaple",
+        "MyDog8MyHomework!",
+        "Butterfly$123Garden",
+    ]
+    while len(corpus) < size:
+        kind = rng.random()
+        if kind < 0.4:
+            password = pad() + mutate(rng.choice(bases)) + pad()
+        elif kind < 0.7:
+            separator = rng.choice(["", "", rng.choice(padding)])
+            password = (
+                pad()
+                + mutate(rng.choice(bases))
+                + separator
+                + mutate(rng.choice(bases))
+                + pad()
+            )
+        else:
+            password = "".join(
+                rng.choice(alphabet) for _ in range(rng.randint(1, 20))
+            )
+        corpus.append(password)
+    return corpus
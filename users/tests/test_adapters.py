@@ -0,0 +1,53 @@
+import json
+
+import pytest
+from allauth.socialaccount.adapter import get_adapter
+from allauth.socialaccount.models import SocialApp
+from constance import config
+from django.conf import settings
+from django.contrib.sites.models import Site
+
+from test_install_chat.utils import ConstanceValue
+
+
+def test_settings_only_reference_constance():
+    app = settings.SOCIALACCOUNT_PROVIDERS["google"]["APP"]
+    assert isinstance(app["client_id"], ConstanceValue)
+    assert app["client_id"].key == "GOOGLE_CLIENT_ID"
+
+
+@pytest.mark.django_db
+class TestCustomSocialAccountAdapter:
+    def test_resolves_settings_apps(self, rf):
+        config.GOOGLE_CLIENT_ID = "google-client"
+        config.GOOGLE_CLIENT_SECRET = "google-secret"
+
+        app = get_adapter().get_app(rf.get("/"), "google")
+
+        assert app.client_id == "google-client"
+        assert app.secret == "google-secret"
+
+    def test_resolves_json_settings(self, rf):
+        config.APPLE_SETTINGS = json.dumps({"certificate_key": "KEY"})
+
+        app = get_adapter().get_app(rf.get("/"), "apple")
+
+        assert app.settings == {"certificate_key": "KEY"}
+
+    def test_filters_by_resolved_client_id(self, rf):
+        config.FACEBOOK_CLIENT_ID = "facebook-client"
+        adapter = get_adapter()
+
+        apps = adapter.list_apps(rf.get("/"), client_id="facebook-client")
+        assert [app.provider for app in apps] == ["facebook"]
+        assert adapter.list_apps(rf.get("/"), client_id="other") == []
+
+    def test_database_apps_are_kept(self, rf):
+        app = SocialApp.objects.create(
+            provider="github", name="GitHub", client_id="github-client"
+        )
+        app.sites.add(Site.objects.get_current())
+
+        apps = get_adapter().list_apps(rf.get("/"), provider="github")
+
+        assert [app.client_id for app in apps] == ["github-client"]
@@ -0,0 +1,163 @@
+import pytest
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from users.authentication import ClaimsJWTAuthentication, ClaimsUser
+from users.models import User
+from users.tokens import RefreshToken
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestClaimsJWTAuthentication:
+    def authenticate(self, token):
+        authentication = ClaimsJWTAuthentication()
+        return authentication.get_user(authentication.get_validated_token(str(token)))
+
+    def test_user_is_built_from_claims(self, user, django_assert_num_queries):
+        token = RefreshToken.for_user(user).access_token
+        # Warm the token version cache
+        self.authenticate(token)
+
+        with django_assert_num_queries(0):
+            authenticated = self.authenticate(token)
+            assert authenticated.id == user.id
+            assert authenticated.pk == user.id
+            assert authenticated.is_authenticated
+            assert not authenticated.is_staff
+            assert authenticated
+
+        assert isinstance(authenticated, ClaimsUser)
+
+    def test_user_row_loads_on_demand(self, user, django_assert_num_queries):
+        authenticated = self.authenticate(RefreshToken.for_user(user).access_token)
+
+        with django_assert_num_queries(1):
+            assert authenticated.username == user.username
+            assert authenticated.email == user.email
+
+    def test_revoked_token_is_rejected(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.authenticate(token)
+
+        user.revoke_tokens()
+
+        with pytest.raises(AuthenticationFailed):
+            self.authenticate(token)
+        assert self.authenticate(RefreshToken.for_user(user).access_token)
+
+    def test_token_without_claims_loads_user(self, user):
+        authenticated = self.authenticate(AccessToken.for_user(user))
+
+        assert not isinstance(authenticated, ClaimsUser)
+        assert authenticated == user
+
+
+@pytest.mark.django_db
+class TestClaimsJWTCookieAuthentication:
+    def test_deletion_revokes_access_token(self, api_client, user):
+        """
+        Test that an access token stops working as soon as the account is
+        deleted, without waiting for it to expire.
+        """
+        token = RefreshToken.for_user(user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        url = reverse("v1:user_detail")
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+
+        user.revoke_tokens()
+
+        assert api_client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_deactivation_revokes_access_token(self, api_client, user):
+        token = RefreshToken.for_user(user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        url = reverse("v1:user_detail")
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+
+        user.is_active = False
+        user.save()
+
+        assert api_client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestTokenVersion:
+    @pytest.mark.parametrize(
+        "field, value",
+        [
+            ("is_active", False),
+            ("is_staff", True),
+            ("is_superuser", True),
+            ("password", "pbkdf2_sha256$changed"),
+        ],
+    )
+    def test_flag_changes_revoke_tokens(self, user, field, value):
+        user = User.objects.get(pk=user.pk)
+        version = user.token_version
+
+        setattr(user, field, value)
+        user.save(update_fields=[field])
+
+        assert User.objects.get(pk=user.pk).token_version == version + 1
+
+    def test_other_changes_keep_tokens(self, user):
+        user = User.objects.get(pk=user.pk)
+        version = user.token_version
+
+        user.first_name = "Renamed"
+        user.save()
+        user.is_staff = True
+        # Not saved by this call
+        user.save(update_fields=["first_name"])
+
+        assert User.objects.get(pk=user.pk).token_version == version
+
+
+@pytest.mark.django_db
+class TestTokenRefresh:
+    url = "v1:token_refresh"
+
+    def refresh(self, api_client, refresh):
+        return api_client.post(reverse(self.url), {"refresh": str(refresh)})
+
+    def test_demotion_is_reflected_in_refreshed_token(self, api_client, user):
+        user.is_staff = True
+        user.save()
+        refresh = RefreshToken.for_user(User.objects.get(pk=user.pk))
+
+        # A change outside `User.save` keeps the token version
+        User.objects.filter(pk=user.pk).update(is_staff=False)
+        response = self.refresh(api_client, refresh)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert AccessToken(response.data["access"])["is_staff"] is False
+
+    def test_demotion_revokes_refresh_token(self, api_client, user):
+        user.is_staff = True
+        user.save()
+        user = User.objects.get(pk=user.pk)
+        refresh = RefreshToken.for_user(user)
+
+        user.is_staff = False
+        user.save()
+
+        response = self.refresh(api_client, refresh)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_deactivated_user_cannot_refresh(self, api_client, user):
+        refresh = RefreshToken.for_user(user)
+        User.objects.filter(pk=user.pk).update(is_active=False)
+
+        response = self.refresh(api_client, refresh)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,157 @@
+import hashlib
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import CommandError, call_command
+
+from users.bloom import (
+    BLOCK_BITS,
+    BloomFilter,
+    build_bloom_filter,
+    get_filter_size,
+    hash_item,
+)
+from users.enums import PasswordValidationErrors
+from users.validators import BreachedPasswordValidator, bloom_filters
+
+BREACHED = ["hunter2", "correcthorse", "Tr0ub4dor&3", "pässwörd"]
+
+
+@pytest.fixture(autouse=True)
+def clear_bloom_filters():
+    yield
+    for bloom_filter in bloom_filters.values():
+        bloom_filter.close()
+    bloom_filters.clear()
+
+
+@pytest.fixture
+def filter_path(tmp_path):
+    path = tmp_path / "breached.bloom"
+    build_bloom_filter(path, map(hash_item, BREACHED), len(BREACHED), 0.001)
+    return str(path)
+
+
+class TestBloomFilter:
+    def test_contains_added_items(self, filter_path):
+        bloom_filter = BloomFilter(filter_path)
+        assert all(password in bloom_filter for password in BREACHED)
+        assert "not breached" not in bloom_filter
+        assert bloom_filter.items == len(BREACHED)
+        bloom_filter.close()
+
+    def test_false_positive_rate(self, tmp_path):
+        """The measured false positive rate stays near the requested one"""
+        path = tmp_path / "large.bloom"
+        items = [f"breached-{i}" for i in range(20_000)]
+        build_bloom_filter(path, map(hash_item, items), len(items), 0.01)
+
+        bloom_filter = BloomFilter(path)
+        assert all(item in bloom_filter for item in items)
+        false_positives = sum(f"clean-{i}" in bloom_filter for i in range(20_000))
+        assert false_positives / 20_000 < 0.02
+        bloom_filter.close()
+
+    def test_filter_size(self):
+        num_bits, num_hashes = get_filter_size(1_000_000, 0.001)
+        # The optimal 14.4M bits, plus the allowance for blocking
+        assert 21_000_000 < num_bits < 22_000_000
+        assert num_bits % BLOCK_BITS == 0
+        assert num_hashes == 10
+
+        with pytest.raises(ValueError):
+            get_filter_size(1_000, 0)
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"\0" * 64)
+        with pytest.raises(ValueError):
+            BloomFilter(path)
+
+
+class TestBreachedPasswordValidator:
+    def test_rejects_breached_password(self, filter_path):
+        validator = BreachedPasswordValidator(path=filter_path)
+        with pytest.raises(ValidationError) as exc_info:
+            validator.validate("hunter2")
+        assert exc_info.value.messages[0] == str(
+            PasswordValidationErrors.BREACHED.value
+        )
+
+    def test_accepts_other_password(self, filter_path):
+        BreachedPasswordValidator(path=filter_path).validate("a unique passphrase")
+
+    def test_path_from_settings(self, settings, filter_path):
+        settings.BREACHED_PASSWORDS_FILTER = filter_path
+        with pytest.raises(ValidationError):
+            BreachedPasswordValidator().validate("correcthorse")
+
+    def test_filter_is_shared(self, filter_path):
+        first = BreachedPasswordValidator(path=filter_path)
+        second = BreachedPasswordValidator(path=filter_path)
+        assert first.get_filter() is second.get_filter()
+
+    def test_missing_filter(self, tmp_path):
+        validator = BreachedPasswordValidator(path=str(tmp_path / "missing.bloom"))
+        with pytest.raises(ImproperlyConfigured):
+            validator.validate("hunter2")
+
+
+class TestBuildBreachedPasswordFilterCommand:
+    def test_build_from_text(self, tmp_path):
+        source = tmp_path / "passwords.txt"
+        source.write_text("\n".join(BREACHED) + "\n\n", encoding="utf-8")
+        output = tmp_path / "breached.bloom"
+
+        call_command("build_breached_password_filter", str(source), str(output))
+
+        bloom_filter = BloomFilter(output)
+        assert all(password in bloom_filter for password in BREACHED)
+        assert bloom_filter.items == len(BREACHED)
+        bloom_filter.close()
+
+    def test_build_from_sha1_list(self, tmp_path):
+        source = tmp_path / "pwned.txt"
+        source.write_text(
+            "".join(
+                f"{hashlib.sha1(password.encode()).hexdigest().upper()}:{count}\r\n"
+                for count, password in enumerate(BREACHED, start=1)
+            )
+        )
+        output = tmp_path / "breached.bloom"
+
+        call_command(
+            "build_breached_password_filter",
+            str(source),
+            str(output),
+            format="sha1",
+            false_positive_rate=0.0001,
+            expected_items=10,
+        )
+
+        bloom_filter = BloomFilter(output)
+        assert all(password in bloom_filter for password in BREACHED)
+        bloom_filter.close()
+
+    @pytest.mark.parametrize(
+        "line",
+        [
+            "not-a-hash",
+            # An NTLM hash
+            "8846F7EAEE8FB117AD06BDD830B7586C:3",
+            # A truncated SHA-1 hash
+            "5BAA61E4C9B93F3F0682250B6CF8331B:3",
+        ],
+    )
+    def test_invalid_sha1_line(self, tmp_path, line):
+        source = tmp_path / "pwned.txt"
+        source.write_text(f"{line}\n")
+
+        with pytest.raises(CommandError):
+            call_command(
+                "build_breached_password_filter",
+                str(source),
+                str(tmp_path / "breached.bloom"),
+                format="sha1",
+            )
+        assert not list(tmp_path.glob("*.tmp"))
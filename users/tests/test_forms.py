@@ -1,6 +1,7 @@
 import pytest
 from django.test import override_settings
 
+from core.tasks import send_queued_emails
 from users.forms import AllAuthPasswordResetForm
 
 
@@ -18,6 +19,7 @@ class TestAllAuthPasswordResetForm:
         assert form.is_valid()
 
         email = form.save(request=request)
+        send_queued_emails()
 
         # checks if email sent
         assert len(mailoutbox) == 1
@@ -32,6 +34,7 @@ class TestAllAuthPasswordResetForm:
         assert form.is_valid()
 
         email = form.save(request=request)
+        send_queued_emails()
 
         # checks if email sent
         assert len(mailoutbox) == 1
@@ -0,0 +1,31 @@
+import pytest
+from allauth.account.models import EmailAddress
+
+from users.models import User
+from users.tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestUserQuerySet:
+    def test_with_email_verified(self, django_assert_num_queries):
+        verified_user = UserFactory()
+        EmailAddress.objects.create(
+            user=verified_user, email=verified_user.email, verified=True
+        )
+        unverified_user = UserFactory()
+        EmailAddress.objects.create(
+            user=unverified_user, email=unverified_user.email, verified=False
+        )
+        UserFactory()
+
+        with django_assert_num_queries(1):
+            email_verified = {
+                user.id: user.email_verified
+                for user in User.objects.with_email_verified()
+            }
+
+        assert email_verified == {
+            user.id: user.email_verified for user in User.objects.all()
+        }
+        assert email_verified[verified_user.id]
+        assert not email_verified[unverified_user.id]
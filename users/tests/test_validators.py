@@ -1,5 +1,12 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
-from users.tests.helpers import assert_password_common, assert_password_valid
+from users.tests.helpers import (LegacyCommonPasswordValidator,
+                                 assert_password_common, assert_password_valid,
+                                 build_password_corpus)
+from users.validators import CommonPasswordValidator
 
 
 class TestCommonPasswordValidator:
@@ -69,4 +76,63 @@ class TestCommonPasswordValidator:
         if should_fail or any(base in password.lower() for base in password_validator.common_bases):
             assert_password_common(password_validator, password)
         else:
-            assert_password_valid(password_validator, password)  
\ No newline at end of file
+            assert_password_valid(password_validator, password)
+
+
+@pytest.fixture(scope="module")
+def legacy_password_validator():
+    return LegacyCommonPasswordValidator()
+
+
+class TestCommonPasswordValidatorEquivalence:
+    def test_matches_legacy_regexes(self, password_validator, legacy_password_validator):
+        """The automaton accepts and rejects exactly what the regexes did"""
+        corpus = build_password_corpus()
+        mismatches = [
+            password
+            for password in corpus
+            if password_validator.is_common(password)
+            != legacy_password_validator.is_common(password)
+        ]
+        assert mismatches == []
+        # The corpus exercises both outcomes
+        results = {password_validator.is_common(password) for password in corpus}
+        assert results == {True, False}
+
+    def test_automaton_reset_keeps_results(self, password_validator, monkeypatch):
+        """Results do not change when the cached automaton is discarded"""
+        monkeypatch.setattr("users.validators.MAX_CACHED_STATES", 5)
+        corpus = build_password_corpus(200)
+        first = [password_validator.is_common(password) for password in corpus]
+        second = [password_validator.is_common(password) for password in corpus]
+        assert first == second
+        state_sets, _, _ = password_validator.automaton
+        assert len(state_sets) <= 5 + max(map(len, corpus)) + 1
+
+    def test_concurrent_validation(self, legacy_password_validator, monkeypatch):
+        """Threads sharing a validator get the same results while it grows and resets"""
+        monkeypatch.setattr("users.validators.MAX_CACHED_STATES", 50)
+        corpus = build_password_corpus(500)
+        expected = [legacy_password_validator.is_common(password) for password in corpus]
+        validator = CommonPasswordValidator()
+        threads = 8
+        barrier = threading.Barrier(threads)
+
+        def validate_corpus(offset):
+            barrier.wait()
+            # Start at different points so threads build different states
+            order = corpus[offset:] + corpus[:offset]
+            return [validator.is_common(password) for password in order]
+
+        offsets = [i * len(corpus) // threads for i in range(threads)]
+        switch_interval = sys.getswitchinterval()
+        # Switch threads often so they interleave inside is_common
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                runs = list(executor.map(validate_corpus, offsets))
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        for offset, results in zip(offsets, runs):
+            assert results == expected[offset:] + expected[:offset]
@@ -0,0 +1,50 @@
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+
+
+CLAIMS = ("is_staff", "is_active", "token_version")
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token carrying the claims `ClaimsJWTAuthentication` needs to
+    authenticate without loading the user. Access tokens minted from it
+    copy these claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["is_staff"] = user.is_staff
+        token["is_active"] = user.is_active
+        token["token_version"] = user.token_version
+        return token
+
+    def refresh_claims(self):
+        """
+        Replace the claims with the user's current flags, so access tokens
+        minted from this refresh token never carry stale ones. Tokens of
+        missing or inactive users, and revoked tokens, are rejected.
+        """
+        claims = (
+            get_user_model()
+            .objects.filter(pk=self[api_settings.USER_ID_CLAIM])
+            .values(*CLAIMS)
+            .first()
+        )
+        if claims is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not claims["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if (
+            self.get("token_version", claims["token_version"])
+            != claims["token_version"]
+        ):
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+        self.payload.update(claims)
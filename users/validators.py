@@ -1,16 +1,56 @@
 import re
+import string
+import threading
 
-from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.utils.translation import gettext_lazy as _
-from users.constants import (COMMON_PASSWORD_BASES, KEYBOARD_PATTERNS,
-                             LEET_SUBSTITUTIONS)
+
+from users.bloom import BloomFilter
+from users.constants import COMMON_PASSWORD_BASES, KEYBOARD_PATTERNS, LEET_SUBSTITUTIONS
 from users.enums import PasswordValidationErrors
 
 
+# Minimum length of a base that counts on its own in a combination
+# ("adminpassword") and in the letters-only check
+MIN_COMBINED_BASE_LENGTH = 3
+
+# The determinized automaton grows with the variety of passwords it sees;
+# start over once it gets this large
+MAX_CACHED_STATES = 20_000
+
+NON_ALPHA = re.compile(r"[^a-zA-Z]", re.IGNORECASE)
+
+# Bloom filters by path, shared by every validator in the process
+bloom_filters = {}
+
+# Automaton states besides the trie walks
+PREFIX = "prefix"  # inside the non-letter run before a whole-password match
+PREFIX_END = "prefix_end"  # a whole-password match needs only non-letters now
+ANYWHERE = "anywhere"  # before a delimited match inside the password
+ANYWHERE_END = "anywhere_end"  # a delimited match needs one more non-letter
+ACCEPT = "accept"
+
+
 class CommonPasswordValidator:
     """
     Validate that the password isn't a simple common pattern.
     Rejects passwords based on common words, even with character substitutions.
+
+    A password is rejected when, ignoring case and allowing l33t substitutions,
+    a common base or a combination of two bases is either the whole password
+    apart from non-letter padding, or appears delimited by a non-letter on
+    each side. It is also rejected when its letters alone contain a base.
+
+    All bases share one trie, and the checks run as a single automaton over
+    the password that is determinized lazily. Password characters are first
+    reduced to a small normalized alphabet (the base characters they can stand
+    for, and whether they are letters), so each character costs one cached
+    transition.
+
+    Validators are shared between threads. Lookups read the cached automaton
+    without locking; building new states and resetting take a lock, and a
+    reset publishes fresh tables with a single assignment.
     """
 
     def __init__(self):
@@ -20,8 +60,26 @@ class CommonPasswordValidator:
         # L33t speak substitutions
         self.leet_substitutions = LEET_SUBSTITUTIONS
 
-        # Pre-compile patterns for better performance
-        self.patterns = self.compile_patterns()
+        self.build_trie()
+        self.char_patterns = {
+            char: re.compile(self._get_char_pattern(char), re.IGNORECASE)
+            for char in set("".join(self.common_bases))
+        }
+        self.lock = threading.Lock()
+        self.reset_automaton()
+
+    def reset_automaton(self):
+        """Forget every determinized state but the start and accept states"""
+        self.symbols = {}
+        state_sets, state_ids = [], {}
+        self.start = self._get_state(
+            state_sets,
+            state_ids,
+            self._closure({PREFIX, ANYWHERE, ("letters", 0)}),
+        )
+        self.accept = self._get_state(state_sets, state_ids, frozenset([ACCEPT]))
+        # (state sets, state ids, transitions), swapped as a whole
+        self.automaton = (state_sets, state_ids, {})
 
     def _get_char_pattern(self, char):
         """Helper method to generate pattern for a single character"""
@@ -30,62 +88,197 @@ class CommonPasswordValidator:
             return f'[{"".join(chars)}]'
         return f"[{char}{char.upper()}]"
 
-    def _create_base_pattern(self, base):
-        """Helper method to create pattern parts for a password base"""
-        pattern_parts = map(self._get_char_pattern, base)
-        pattern = "".join(pattern_parts)
-
-        # Recurring Patterns
-        non_alpha = r"[^a-zA-Z]"
-        non_alpha_start = r"^" + non_alpha + r"*"
-        non_alpha_end = non_alpha + r"*$"
-
-        return [
-            (non_alpha_start + pattern + non_alpha_end),
-            (non_alpha + pattern + non_alpha),
-        ]
-
-    def compile_patterns(self):
-        """Generate regex patterns including common variations."""
-        # Generate all patterns using list comprehension and flatten the result
-        pattern_strings = [
-            pattern
-            for base in self.common_bases
-            for pattern in self._create_base_pattern(base)
-        ]
-
-        # Add patterns for combinations of common bases
-        for base1 in self.common_bases:
-            for base2 in self.common_bases:
-                if len(base1) >= 3 and len(base2) >= 3:
-                    combined = f"{base1}{base2}"
-                    pattern_strings.extend(self._create_base_pattern(combined))
-
-        # Compile all patterns
-        return [re.compile(p, re.IGNORECASE) for p in pattern_strings]
+    def build_trie(self):
+        """Store every base in a trie of (children, length of the base ending here)."""
+        self.trie = [({}, 0)]
+        for base in self.common_bases:
+            node = 0
+            for char in base:
+                children = self.trie[node][0]
+                if char not in children:
+                    children[char] = len(self.trie)
+                    self.trie.append(({}, 0))
+                node = children[char]
+            self.trie[node] = (self.trie[node][0], len(base))
+
+    def _get_symbol(self, char):
+        """Reduce a password character to its normalized alphabet symbol"""
+        symbol = self.symbols.get(char)
+        if symbol is None:
+            symbol = (
+                # Base characters this character can stand for
+                frozenset(
+                    base_char
+                    for base_char, pattern in self.char_patterns.items()
+                    if pattern.fullmatch(char)
+                ),
+                bool(NON_ALPHA.fullmatch(char)),
+                # What it leaves behind once the password is lowercased and
+                # stripped to ASCII letters
+                "".join(c for c in char.lower() if c in string.ascii_letters),
+            )
+            self.symbols[char] = symbol
+        return symbol
+
+    def _closure(self, states):
+        """Follow the transitions that consume no character"""
+        pending = list(states)
+        states = set(states)
+        while pending:
+            state = pending.pop()
+            if state == PREFIX:
+                reached = [("whole", 1, 0)]
+            elif isinstance(state, tuple) and state[0] != "letters":
+                mode, part, node = state
+                length = self.trie[node][1]
+                end = PREFIX_END if mode == "whole" else ANYWHERE_END
+                reached = []
+                if length and part == 1:
+                    reached.append(end)
+                if length >= MIN_COMBINED_BASE_LENGTH:
+                    # Start the second base of a combination
+                    reached.append((mode, 2, 0) if part == 1 else end)
+            else:
+                reached = []
+
+            for new_state in reached:
+                if new_state not in states:
+                    states.add(new_state)
+                    pending.append(new_state)
+        return frozenset(states)
+
+    def _step(self, states, symbol):
+        """Consume one character from every state in the set"""
+        base_chars, non_alpha, letters = symbol
+        reached = set()
+        letter_nodes = {0}
+        for state in states:
+            if state == ACCEPT:
+                return frozenset([ACCEPT])
+            elif state in (PREFIX, PREFIX_END):
+                if non_alpha:
+                    reached.add(state)
+            elif state == ANYWHERE:
+                reached.add(ANYWHERE)
+                if non_alpha:
+                    reached.add(("delimited", 1, 0))
+            elif state == ANYWHERE_END:
+                if non_alpha:
+                    return frozenset([ACCEPT])
+            elif state[0] == "letters":
+                letter_nodes.add(state[1])
+            else:
+                mode, part, node = state
+                children = self.trie[node][0]
+                for char in base_chars:
+                    if char in children:
+                        reached.add((mode, part, children[char]))
+
+        for letter in letters:
+            letter_nodes = {0} | {
+                self.trie[node][0][letter]
+                for node in letter_nodes
+                if letter in self.trie[node][0]
+            }
+            if any(
+                self.trie[node][1] >= MIN_COMBINED_BASE_LENGTH for node in letter_nodes
+            ):
+                return frozenset([ACCEPT])
+        reached.update(("letters", node) for node in letter_nodes)
+
+        return self._closure(reached)
+
+    def _get_state(self, state_sets, state_ids, states):
+        """Return the id of a determinized state"""
+        state = state_ids.get(states)
+        if state is None:
+            state = state_ids[states] = len(state_sets)
+            state_sets.append(states)
+        return state
+
+    def is_common(self, password):
+        """Return whether the password is a common pattern"""
+        automaton = self.automaton
+        if len(automaton[0]) > MAX_CACHED_STATES:
+            with self.lock:
+                # Another thread may have reset it already
+                if self.automaton is automaton:
+                    self.reset_automaton()
+                automaton = self.automaton
+        # Keep using this snapshot even if another thread resets meanwhile
+        state_sets, state_ids, transitions = automaton
+
+        state = self.start
+        for char in password:
+            symbol = self._get_symbol(char)
+            next_state = transitions.get((state, symbol))
+            if next_state is None:
+                with self.lock:
+                    next_state = transitions.get((state, symbol))
+                    if next_state is None:
+                        next_state = self._get_state(
+                            state_sets,
+                            state_ids,
+                            self._step(state_sets[state], symbol),
+                        )
+                        transitions[(state, symbol)] = next_state
+            state = next_state
+            if state == self.accept:
+                return True
+        return PREFIX_END in state_sets[state]
 
     def validate(self, password, user=None):
         """
         Validate that the password is not a common pattern, even with modifications.
         Always raises the same error message for consistency.
         """
-        # First check: direct pattern matching
-        if any(pattern.search(password) for pattern in self.patterns):
+        if self.is_common(password):
             raise ValidationError(
                 PasswordValidationErrors.TOO_COMMON.value,
                 code="password_too_common",
             )
 
-        # Second check: exact match after stripping non-letters
-        base_password = re.sub(r"[^a-zA-Z]", "", password.lower())
+    def get_help_text(self):
+        return PasswordValidationErrors.HELP_TEXT.value
 
-        # Check if the base password contains any common base
-        for base in self.common_bases:
-            if len(base) >= 3 and base in base_password:
-                raise ValidationError(
-                    PasswordValidationErrors.TOO_COMMON.value,
-                    code="password_too_common",
+
+class BreachedPasswordValidator:
+    """
+    Validate that the password does not appear in a breached password corpus.
+
+    Passwords are looked up in a Bloom filter file built with the
+    `build_breached_password_filter` management command. The file is
+    memory-mapped on first use, so worker processes share its pages. A Bloom
+    filter has no false negatives, but rejects a small, configurable share of
+    passwords that were never breached.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, "BREACHED_PASSWORDS_FILTER", None)
+
+    def get_filter(self):
+        """Return the mapped filter, opening it on first use"""
+        bloom_filter = bloom_filters.get(self.path)
+        if bloom_filter is None:
+            if not self.path:
+                raise ImproperlyConfigured(
+                    "BreachedPasswordValidator requires a filter path."
                 )
+            try:
+                bloom_filter = BloomFilter(self.path)
+            except (OSError, ValueError) as e:
+                raise ImproperlyConfigured(
+                    f"Cannot open the breached password filter: {e}"
+                ) from e
+            bloom_filters[self.path] = bloom_filter
+        return bloom_filter
+
+    def validate(self, password, user=None):
+        if password in self.get_filter():
+            raise ValidationError(
+                PasswordValidationErrors.BREACHED.value,
+                code="password_breached",
+            )
 
     def get_help_text(self):
-        return PasswordValidationErrors.HELP_TEXT.value
\ No newline at end of file
+        return PasswordValidationErrors.BREACHED_HELP_TEXT.value